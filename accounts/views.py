@@ -5,10 +5,18 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django.db.models import Q
 from django.http import JsonResponse
 from holder.models import Holder
 from tool.models import Tool
+from lookup.services.tool.search import search_tools
+from lookup.services.holder.search import search_holders
+
+
+def _ranked(model, hits):
+    """Map kết quả index [{id, score, ...}] -> instance, giữ nguyên thứ tự xếp hạng."""
+    objs = model.objects.in_bulk([h["id"] for h in hits])
+    return [objs[h["id"]] for h in hits if h["id"] in objs]
+
 
 def login_view(request):
 
@@ -43,17 +51,9 @@ def home(request):
     tool_results = []
 
     if q:
-        holder_results = Holder.objects.filter(
-            Q(ten_thiet_bi__icontains=q)
-            | Q(ma_noi_bo__icontains=q)
-            | Q(ma_nha_sx__icontains=q)
-        )[:20]
-
-        tool_results = Tool.objects.filter(
-            Q(ten_tool__icontains=q)
-            | Q(ma_tool__icontains=q)
-            | Q(ma_nha_sx__icontains=q)
-        )[:20]
+        # cùng ranking với chatbot lookup (exact mã > prefix > token > substring > fuzzy)
+        holder_results = _ranked(Holder, search_holders(q, limit=20))
+        tool_results = _ranked(Tool, search_tools(q, limit=20))
 
     context = {
         "q": q,
@@ -92,15 +92,8 @@ def search_suggest(request):
         return JsonResponse({"tools": [], "holders": []})
 
     # Lấy ít thôi, ví dụ 5 kết quả mỗi loại
-    tools_qs = Tool.objects.filter(
-        Q(ten_tool__icontains=q) |
-        Q(ma_tool__icontains=q)
-    )[:5]
-
-    holders_qs = Holder.objects.filter(
-        Q(ten_thiet_bi__icontains=q) |
-        Q(ma_noi_bo__icontains=q)
-    )[:5]
+    tools_qs = _ranked(Tool, search_tools(q, limit=5))
+    holders_qs = _ranked(Holder, search_holders(q, limit=5))
 
     data = {
         "tools": [
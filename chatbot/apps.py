@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
+
+    def ready(self):
+        # load classifier intent 1 lần lúc khởi động (không có file model -> router chỉ dùng rule)
+        from .services.conversation.classifier import get_classifier
+        get_classifier()
@@ -0,0 +1,2 @@
+# chatbot/management/__init__.py
+# Để Django nhận đây là package Python
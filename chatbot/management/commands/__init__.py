@@ -0,0 +1,2 @@
+# chatbot/management/commands/__init__.py
+# Để Django load được các lệnh custom (train_intent_model, ...)
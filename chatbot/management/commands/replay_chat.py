@@ -0,0 +1,249 @@
+# chatbot/management/commands/replay_chat.py
+
+import json
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import RequestFactory
+
+from chatbot.services.conversation.classifier import record_labels
+from chatbot.services.conversation.orchestrator import handle_message
+from chatbot.services.conversation.store import ConversationStore, set_store
+from chatbot.services.llm.admission import get_admission
+from chatbot.services.llm.cache import ResponseCache, set_response_cache
+from chatbot.services.llm.client import OllamaClient, set_client
+from chatbot.services.tracing import percentile
+from lookup.services.shared.debug import count_queries
+
+
+def _fake_ollama_handler(latency_ms: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            time.sleep(latency_ms / 1000.0)
+            text = f"<b>[fake {body.get('model')}]</b> ok"
+            if body.get("stream"):
+                lines = [json.dumps({"response": w + " ", "done": False}) for w in text.split()]
+                lines.append(json.dumps({"response": "", "done": True}))
+                raw = ("\n".join(lines) + "\n").encode("utf-8")
+                ctype = "application/x-ndjson"
+            else:
+                raw = json.dumps({"response": text, "done": True}).encode("utf-8")
+                ctype = "application/json"
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay corpus JSONL (log traffic chat) qua orchestrator.handle_message, LLM thay bằng fake server local. "
+        "Báo cáo latency theo intent, số query DB, quyết định routing so với nhãn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("corpus", nargs="*", help="File JSONL {message, model?, explain_fuzzy?, intent?, domain?, session?} "
+                                                      "(mặc định settings.CHATBOT_TRAFFIC_LOG)")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--limit", type=int, default=0, help="Chỉ replay N dòng đầu (0 = hết)")
+        parser.add_argument("--shuffle", action="store_true")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--llm", choices=["fake", "real"], default="fake",
+                            help="fake: server Ollama giả trên 127.0.0.1 (mặc định); real: gọi Ollama thật")
+        parser.add_argument("--fake-latency", type=float, default=300.0, help="ms mỗi lượt LLM giả")
+        parser.add_argument("--show-mismatch", type=int, default=10, help="In N câu routing khác nhãn")
+        parser.add_argument("--json", dest="json_out", default=None, help="Ghi báo cáo JSON ra file")
+
+    # ---------- corpus ----------
+    def _load(self, paths):
+        if not paths:
+            default = getattr(settings, "CHATBOT_TRAFFIC_LOG", None)
+            if not default:
+                raise CommandError("Không có corpus: truyền file JSONL hoặc set settings.CHATBOT_TRAFFIC_LOG.")
+            paths = [default]
+
+        records = []
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            rec = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if isinstance(rec, dict) and (rec.get("message") or "").strip():
+                            records.append(rec)
+            except OSError as e:
+                raise CommandError(f"Không đọc được {path}: {e}")
+        if not records:
+            raise CommandError("Corpus không có dòng nào có 'message'.")
+        return records
+
+    def handle(self, *args, **options):
+        records = self._load(options["corpus"])
+        if options["shuffle"]:
+            random.Random(options["seed"]).shuffle(records)
+        if options["limit"]:
+            records = records[:options["limit"]]
+
+        # state / cache riêng cho lần replay: không ghi đè state + cache LLM thật
+        tmpdir = tempfile.TemporaryDirectory(prefix="replay_chat_")
+        old_store = set_store(ConversationStore(Path(tmpdir.name) / "state.sqlite3"))
+        old_cache = set_response_cache(ResponseCache(path=None))
+        old_client = server = None
+        if options["llm"] == "fake":
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _fake_ollama_handler(options["fake_latency"]))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            fake_url = f"http://127.0.0.1:{server.server_address[1]}"
+            old_client = set_client(OllamaClient(base_url=fake_url, default_concurrency=max(options["concurrency"], 1)))
+            self.stdout.write(f"[REPLAY] fake Ollama at {fake_url} latency={options['fake_latency']:.0f} ms")
+
+        adm0 = get_admission().snapshot()
+        sessions = defaultdict(SessionStore)
+        sessions_lock = threading.Lock()
+        rf = RequestFactory()
+
+        def replay_one(i_rec):
+            i, rec = i_rec
+            skey = rec.get("session") or f"line-{i}"
+            with sessions_lock:
+                session = sessions[skey]
+            request = rf.post("/chatbot/", data=json.dumps({"message": rec["message"]}), content_type="application/json")
+            request.session = session
+            request.user = AnonymousUser()
+            ctx = {
+                "model": rec.get("model") or "gemma3:4b",
+                "explain_fuzzy": bool(rec.get("explain_fuzzy")),
+                "request_id": f"replay{i}",
+            }
+            t0 = time.perf_counter()
+            error = None
+            try:
+                with count_queries() as qc:
+                    handle_message(request, rec["message"], ctx)
+            except Exception as e:
+                error = repr(e)
+            finally:
+                close_old_connections()
+            route = ctx.get("route") or {}
+            labels = record_labels(rec)
+            return {
+                "i": i,
+                "message": rec["message"],
+                "intent": route.get("intent") or "ERROR",
+                "domain": route.get("domain") or "",
+                "source": route.get("source"),
+                "ms": (time.perf_counter() - t0) * 1000.0,
+                "queries": qc["queries"],
+                "label_intent": labels[1] if labels else None,
+                "label_domain": labels[2] if labels else None,
+                "error": error,
+            }
+
+        t_all = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=max(options["concurrency"], 1)) as pool:
+                results = list(pool.map(replay_one, enumerate(records)))
+        finally:
+            set_store(old_store)
+            set_response_cache(old_cache)
+            if server is not None:
+                set_client(old_client)
+                server.shutdown()
+            tmpdir.cleanup()
+        wall_s = time.perf_counter() - t_all
+
+        report = self._report(results, wall_s, options, adm0, get_admission().snapshot())
+        if options["json_out"]:
+            Path(options["json_out"]).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(f"[REPLAY] report -> {options['json_out']}")
+
+    # ---------- report ----------
+    def _report(self, results, wall_s, options, adm0, adm1):
+        def dist(rows):
+            ms = sorted(r["ms"] for r in rows)
+            q = [r["queries"] for r in rows]
+            return {
+                "n": len(rows),
+                "p50": round(percentile(ms, 50), 2),
+                "p95": round(percentile(ms, 95), 2),
+                "p99": round(percentile(ms, 99), 2),
+                "max": round(ms[-1], 2),
+                "avg_queries": round(sum(q) / len(q), 2),
+                "max_queries": max(q),
+            }
+
+        by_intent = defaultdict(list)
+        for r in results:
+            by_intent[r["intent"]].append(r)
+
+        labelled = [r for r in results if r["label_intent"]]
+        intent_ok = [r for r in labelled if r["intent"] == r["label_intent"]]
+        domain_ok = [r for r in labelled if (r["domain"] or "none") == r["label_domain"]]
+        confusion = Counter(f"{r['label_intent']}->{r['intent']}" for r in labelled if r["intent"] != r["label_intent"])
+        errors = [r for r in results if r["error"]]
+
+        report = {
+            "n": len(results),
+            "concurrency": options["concurrency"],
+            "llm": options["llm"],
+            "wall_s": round(wall_s, 3),
+            "throughput_rps": round(len(results) / wall_s, 2) if wall_s else None,
+            "all": dist(results),
+            "by_intent": {k: dist(v) for k, v in sorted(by_intent.items())},
+            "routing": {
+                "source": dict(Counter(r["source"] for r in results)),
+                "labelled": len(labelled),
+                "intent_acc": round(len(intent_ok) / len(labelled), 4) if labelled else None,
+                "domain_acc": round(len(domain_ok) / len(labelled), 4) if labelled else None,
+                "confusion": dict(confusion),
+            },
+            "llm_shed": {
+                k: adm1["shed"][k] - adm0["shed"][k] for k in adm1["shed"]
+            },
+            "errors": len(errors),
+        }
+
+        w = self.stdout.write
+        w(f"[REPLAY] {report['n']} lượt, concurrency={report['concurrency']}, "
+          f"{report['wall_s']} s, {report['throughput_rps']} req/s, llm={report['llm']}")
+        w(f"{'intent':<10}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'avg_q':>8}{'max_q':>7}")
+        for name, d in [("ALL", report["all"]), *report["by_intent"].items()]:
+            w(f"{name:<10}{d['n']:>6}{d['p50']:>10.1f}{d['p95']:>10.1f}{d['p99']:>10.1f}"
+              f"{d['max']:>10.1f}{d['avg_queries']:>8.1f}{d['max_queries']:>7}")
+        rt = report["routing"]
+        w(f"[ROUTING] source={rt['source']}")
+        if labelled:
+            w(f"[ROUTING] labelled={rt['labelled']} intent_acc={rt['intent_acc']:.3f} domain_acc={rt['domain_acc']:.3f} "
+              f"confusion={rt['confusion']}")
+            mismatches = [r for r in labelled if r["intent"] != r["label_intent"]][:options["show_mismatch"]]
+            for r in mismatches:
+                w(f"  ✗ {r['label_intent']}->{r['intent']} ({r['source']}): {r['message'][:80]}")
+        if any(report["llm_shed"].values()):
+            w(f"[ADMISSION] shed={report['llm_shed']}")
+        if errors:
+            w(self.style.WARNING(f"[REPLAY] {len(errors)} lỗi, vd: {errors[0]['error']}"))
+        return report
@@ -0,0 +1,73 @@
+# chatbot/management/commands/train_intent_model.py
+
+import json
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.services.conversation.classifier import (
+    model_path, record_labels, reset_classifier, train,
+)
+
+
+class Command(BaseCommand):
+    help = "Train classifier intent/domain cho chatbot router từ corpus JSONL (log traffic chat)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("corpus", nargs="+", help="File JSONL: mỗi dòng {message, intent, domain} hoặc label_intent/label_domain")
+        parser.add_argument("--out", default=None, help="File model JSON (mặc định settings.CHATBOT_INTENT_MODEL_PATH)")
+        parser.add_argument("--holdout", type=float, default=0.1, help="Tỉ lệ giữ lại để đo accuracy (0 = không đo)")
+        parser.add_argument("--alpha", type=float, default=0.5, help="Laplace smoothing")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        records = []
+        for path in options["corpus"]:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            rec = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if record_labels(rec):
+                            records.append(rec)
+            except OSError as e:
+                raise CommandError(f"Không đọc được {path}: {e}")
+
+        if not records:
+            raise CommandError("Corpus không có dòng hợp lệ (cần message + intent).")
+
+        random.Random(options["seed"]).shuffle(records)
+        n_hold = int(len(records) * options["holdout"])
+        hold, train_set = records[:n_hold], records[n_hold:]
+
+        t0 = time.perf_counter()
+        clf = train(train_set, alpha=options["alpha"])
+        self.stdout.write(f"[TRAIN] {len(train_set)} mẫu trong {(time.perf_counter() - t0) * 1000:.1f} ms")
+        self.stdout.write(f"[TRAIN] intent: {dict(Counter(record_labels(r)[1] for r in train_set))}")
+
+        if hold:
+            ok_intent = ok_domain = 0
+            t0 = time.perf_counter()
+            for rec in hold:
+                msg, intent, domain = record_labels(rec)
+                pred = clf.predict(msg)
+                ok_intent += pred["intent"] == intent
+                ok_domain += (pred["domain"] or "none") == domain
+            per_ms = (time.perf_counter() - t0) * 1000 / len(hold)
+            self.stdout.write(
+                f"[EVAL] holdout={len(hold)} intent_acc={ok_intent / len(hold):.3f} "
+                f"domain_acc={ok_domain / len(hold):.3f} predict={per_ms:.3f} ms/msg"
+            )
+
+        clf.meta.update({"trained_at": int(time.time()), "holdout": len(hold)})
+        out = options["out"] or model_path()
+        clf.save(out)
+        reset_classifier()
+        self.stdout.write(self.style.SUCCESS(f"[TRAIN] saved -> {out}"))
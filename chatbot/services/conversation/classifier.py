@@ -0,0 +1,210 @@
+"""
+Classifier intent/domain nhẹ (CPU, thuần Python) cho router.
+
+- Feature: hashed n-gram (từ đơn, cặp từ, 3-gram ký tự) trên text đã bỏ dấu
+- Model: Multinomial Naive Bayes, 2 head: intent (LOOKUP|FUZZY|CHAT) và domain (tool|holder|none)
+- Train từ corpus JSONL log chat (xem traffic.py + lệnh `manage.py train_intent_model`)
+- Serialize JSON, load 1 lần / process. Không có file model -> router dùng rule như cũ.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lookup.services.shared.rules import fold_text
+
+logger = logging.getLogger("chatbot")
+
+N_BUCKETS = 1 << 18
+MODEL_VERSION = 1
+
+_WORD_RE = re.compile(r"[0-9a-zø]+")
+
+
+def hashed_features(text: str) -> Counter:
+    t = fold_text(text)
+    words = _WORD_RE.findall(t)
+    feats: List[str] = []
+    feats.extend("w:" + w for w in words)
+    feats.extend("b:" + a + "_" + b for a, b in zip(words, words[1:]))
+    for w in words:
+        padded = f"<{w}>"
+        feats.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    # crc32 thay cho hash(): ổn định giữa các process/lần chạy
+    return Counter(zlib.crc32(f.encode("utf-8")) % N_BUCKETS for f in feats)
+
+
+class NaiveBayesHead:
+    """1 head phân lớp (multinomial NB, Laplace smoothing)."""
+
+    def __init__(self, log_prior: Dict[str, float], log_prob: Dict[str, Dict[int, float]],
+                 log_unseen: Dict[str, float]):
+        self.log_prior = log_prior
+        self.log_prob = log_prob
+        self.log_unseen = log_unseen
+
+    @classmethod
+    def fit(cls, samples: Iterable[Tuple[Counter, str]], alpha: float = 0.5) -> "NaiveBayesHead":
+        class_docs: Counter = Counter()
+        class_feats: Dict[str, Counter] = defaultdict(Counter)
+        for feats, label in samples:
+            class_docs[label] += 1
+            class_feats[label].update(feats)
+
+        n_docs = sum(class_docs.values())
+        vocab = set()
+        for c in class_feats.values():
+            vocab.update(c)
+        v = max(len(vocab), 1)
+
+        log_prior, log_prob, log_unseen = {}, {}, {}
+        for label, n in class_docs.items():
+            total = sum(class_feats[label].values())
+            denom = total + alpha * v
+            log_prior[label] = math.log(n / n_docs)
+            log_prob[label] = {f: math.log((cnt + alpha) / denom) for f, cnt in class_feats[label].items()}
+            log_unseen[label] = math.log(alpha / denom)
+        return cls(log_prior, log_prob, log_unseen)
+
+    def predict(self, feats: Counter) -> Tuple[str, float]:
+        scores = {}
+        for label, prior in self.log_prior.items():
+            lp = self.log_prob[label]
+            unseen = self.log_unseen[label]
+            scores[label] = prior + sum(cnt * lp.get(f, unseen) for f, cnt in feats.items())
+        best = max(scores, key=scores.get)
+        # softmax -> độ tự tin của nhãn thắng
+        m = scores[best]
+        z = sum(math.exp(s - m) for s in scores.values())
+        return best, 1.0 / z
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "log_prior": self.log_prior,
+            "log_prob": {k: {str(f): p for f, p in v.items()} for k, v in self.log_prob.items()},
+            "log_unseen": self.log_unseen,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "NaiveBayesHead":
+        return cls(
+            d["log_prior"],
+            {k: {int(f): p for f, p in v.items()} for k, v in d["log_prob"].items()},
+            d["log_unseen"],
+        )
+
+
+class IntentClassifier:
+    def __init__(self, intent_head: NaiveBayesHead, domain_head: NaiveBayesHead, meta: Optional[Dict[str, Any]] = None):
+        self.intent_head = intent_head
+        self.domain_head = domain_head
+        self.meta = meta or {}
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        feats = hashed_features(text)
+        intent, intent_conf = self.intent_head.predict(feats)
+        domain, domain_conf = self.domain_head.predict(feats)
+        return {
+            "intent": intent,
+            "intent_conf": round(intent_conf, 4),
+            "domain": "" if domain == "none" else domain,
+            "domain_conf": round(domain_conf, 4),
+        }
+
+    def save(self, path) -> None:
+        data = {
+            "version": MODEL_VERSION,
+            "n_buckets": N_BUCKETS,
+            "meta": self.meta,
+            "intent": self.intent_head.to_dict(),
+            "domain": self.domain_head.to_dict(),
+        }
+        Path(path).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path) -> "IntentClassifier":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != MODEL_VERSION or data.get("n_buckets") != N_BUCKETS:
+            raise ValueError(f"intent model incompatible: version={data.get('version')} n_buckets={data.get('n_buckets')}")
+        return cls(NaiveBayesHead.from_dict(data["intent"]), NaiveBayesHead.from_dict(data["domain"]), data.get("meta"))
+
+
+def record_labels(rec: Dict[str, Any]) -> Optional[Tuple[str, str, str]]:
+    """
+    1 dòng corpus -> (message, intent, domain).
+    Ưu tiên nhãn người sửa tay (label_intent/label_domain), không có thì lấy quyết định router đã log.
+    """
+    msg = (rec.get("message") or "").strip()
+    intent = rec.get("label_intent") or rec.get("intent")
+    domain = rec.get("label_domain", rec.get("domain")) or "none"
+    if not msg or intent not in ("LOOKUP", "FUZZY", "CHAT"):
+        return None
+    return msg, intent, domain
+
+
+def train(records: Iterable[Dict[str, Any]], alpha: float = 0.5) -> IntentClassifier:
+    intent_samples, domain_samples = [], []
+    for rec in records:
+        lab = record_labels(rec)
+        if not lab:
+            continue
+        msg, intent, domain = lab
+        feats = hashed_features(msg)
+        intent_samples.append((feats, intent))
+        domain_samples.append((feats, domain))
+    if not intent_samples:
+        raise ValueError("corpus rỗng: không có dòng nào có message + intent hợp lệ")
+    return IntentClassifier(
+        NaiveBayesHead.fit(intent_samples, alpha=alpha),
+        NaiveBayesHead.fit(domain_samples, alpha=alpha),
+        meta={"n_samples": len(intent_samples)},
+    )
+
+
+# ===================== Singleton (load 1 lần) =====================
+_lock = threading.Lock()
+_loaded = False
+_classifier: Optional[IntentClassifier] = None
+
+
+def model_path() -> Path:
+    from django.conf import settings
+    return Path(getattr(settings, "CHATBOT_INTENT_MODEL_PATH", Path(settings.BASE_DIR) / "chatbot" / "intent_model.json"))
+
+
+def min_confidence() -> float:
+    from django.conf import settings
+    return float(getattr(settings, "CHATBOT_INTENT_MIN_CONFIDENCE", 0.85))
+
+
+def get_classifier() -> Optional[IntentClassifier]:
+    global _loaded, _classifier
+    if _loaded:
+        return _classifier
+    with _lock:
+        if not _loaded:
+            path = model_path()
+            try:
+                _classifier = IntentClassifier.load(path) if path.exists() else None
+                if _classifier:
+                    logger.info(f"[INTENT] classifier loaded from {path} meta={_classifier.meta}")
+            except Exception:
+                logger.exception(f"[INTENT] cannot load classifier {path} -> rules only")
+                _classifier = None
+            _loaded = True
+    return _classifier
+
+
+def reset_classifier() -> None:
+    """Cho lệnh train / test: lần gọi sau sẽ load lại file model."""
+    global _loaded, _classifier
+    with _lock:
+        _loaded = False
+        _classifier = None
@@ -1,21 +1,28 @@
 from typing import Dict, Any, Optional
+import asyncio
 import logging
-import json
-from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
 
 from .router import route
 from .state import get_state, set_state, set_fuzzy_last
 from ..response.formatters import html_paragraphs, system_note
+from ..tracing import span
 
 logger = logging.getLogger("chatbot")
 
 # ===================== LLM (optional) =====================
 LLM_READY = False
-TPL = ""
+CHAT_TEMPLATE = "chat_response"
 
 try:
-    from chatbot.services.llm.client import ollama_chat, build_prompt  # bạn tự implement
-    TPL = Path("chatbot/services/llm/prompts/chat_response.md").read_text(encoding="utf-8")
+    from chatbot.services.llm.client import LLMUnavailable, ollama_chat
+    from chatbot.services.llm.admission import get_admission
+    from chatbot.services.llm.cache import cache_key, get_response_cache
+    from chatbot.services.llm.registry import get_prompt
+    from chatbot.services.llm.payload import compact_fuzzy_payload, compact_lookup_payload
+    get_prompt(CHAT_TEMPLATE)   # load registry + kiểm tra template tồn tại
     LLM_READY = True
 except Exception:
     LLM_READY = False
@@ -47,19 +54,19 @@ def _looks_like_code_only(msg: str) -> bool:
     return (len(s) >= 6) and (" " not in s)
 
 
-def handle_message(request, message: str, ctx: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    ctx: { model, explain_fuzzy, request_id }
-    return: { reply: "<html...>" }
-    """
+def _route_message(request, message: str, ctx: Dict[str, Any]):
+    """Route + cập nhật session state. return (intent, domain)"""
     rid = ctx.get("request_id", "noid")
-    state = get_state(request)
+    ctx.setdefault("user_message", message)
+    with span("state.read"):
+        state = get_state(request)
 
-    r = route(message, state_domain=state.get("domain"))
+    with span("route"):
+        r = route(message, state_domain=state.get("domain"))
     domain = r.get("domain") or None
     intent = r.get("intent")
 
-    logger.debug(f"[{rid}] ROUTE_RESULT intent={intent} domain={domain} state_domain={state.get('domain')}")
+    logger.debug(f"[{rid}] ROUTE_RESULT intent={intent} domain={domain} source={r.get('source')} state_domain={state.get('domain')}")
     logger.debug(f"[{rid}] READY lookup={LOOKUP_READY} fuzzy={FUZZY_READY} llm={LLM_READY}")
 
     # Escape hatch: mã hàng thì LOOKUP luôn
@@ -67,25 +74,26 @@ def handle_message(request, message: str, ctx: Dict[str, Any]) -> Dict[str, Any]
         intent = "LOOKUP"
         logger.debug(f"[{rid}] ESCAPE_HATCH: force intent=LOOKUP for code-like input")
 
+    ctx["route"] = {"intent": intent, "domain": domain or "", "source": r.get("source")}
+
     if domain:
         set_state(request, domain=domain)
+    return intent, domain
 
-    if intent == "LOOKUP":
-        return _handle_lookup(request, message, domain, ctx, rid)
 
-    if intent == "FUZZY":
-        if not domain:
-            set_state(request, pending_intent="FUZZY", missing_fields=["domain"])
-            return {
-                "reply": html_paragraphs([
-                    "Ok 😄 Bạn muốn mình <b>đề xuất fuzzy</b> cho <b>Tool</b> hay <b>Holder</b>?",
-                    "• <b>Tool</b> (dao, mũi khoan, taro...)",
-                    "• <b>Holder</b> (bầu kẹp, chuẩn gá, collet...)",
-                    system_note("Gợi ý: gõ 'tool: ...' hoặc 'holder: ...' để mình hiểu ngay."),
-                ])
-            }
-        return _handle_fuzzy(request, message, domain, ctx, rid)
+def _ask_fuzzy_domain(request) -> Dict[str, Any]:
+    set_state(request, pending_intent="FUZZY", missing_fields=["domain"])
+    return {
+        "reply": html_paragraphs([
+            "Ok 😄 Bạn muốn mình <b>đề xuất fuzzy</b> cho <b>Tool</b> hay <b>Holder</b>?",
+            "• <b>Tool</b> (dao, mũi khoan, taro...)",
+            "• <b>Holder</b> (bầu kẹp, chuẩn gá, collet...)",
+            system_note("Gợi ý: gõ 'tool: ...' hoặc 'holder: ...' để mình hiểu ngay."),
+        ])
+    }
 
+
+def _chat_reply() -> Dict[str, Any]:
     # CHAT fallback (thân thiện)
     return {
         "reply": html_paragraphs([
@@ -99,6 +107,61 @@ def handle_message(request, message: str, ctx: Dict[str, Any]) -> Dict[str, Any]
     }
 
 
+def handle_message(request, message: str, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ctx: { model, explain_fuzzy, request_id, stream? }
+    return: { reply: "<html...>", stream?: {model, prompt} }
+    """
+    rid = ctx.get("request_id", "noid")
+    intent, domain = _route_message(request, message, ctx)
+
+    if intent == "LOOKUP":
+        return _handle_lookup(request, message, domain, ctx, rid)
+
+    if intent == "FUZZY":
+        if not domain:
+            return _ask_fuzzy_domain(request)
+        return _handle_fuzzy(request, message, domain, ctx, rid)
+
+    return _chat_reply()
+
+
+async def handle_message_async(request, message: str, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bản async của handle_message (cho view ASGI):
+    - ORM / session / Ollama (requests) vẫn là code sync -> chạy qua sync_to_async
+    - LOOKUP: tra tool + holder song song, domain ưu tiên có kết quả là gọi LLM ngay,
+      không chờ domain còn lại
+    """
+    rid = ctx.get("request_id", "noid")
+    intent, domain = await sync_to_async(_route_message)(request, message, ctx)
+
+    if intent == "LOOKUP":
+        return await _handle_lookup_async(request, message, domain, ctx, rid)
+
+    if intent == "FUZZY":
+        if not domain:
+            return await sync_to_async(_ask_fuzzy_domain)(request)
+        return await _in_thread(_handle_fuzzy, request, message, domain, ctx, rid)
+
+    return _chat_reply()
+
+
+async def _in_thread(fn, *args):
+    """
+    Chạy code sync (ORM, HTTP) ở thread pool riêng, không khoá thread "sync" chung của Django
+    -> nhiều request chat chạy song song được. Đóng connection cũ trước/sau như request thường.
+    """
+    def call():
+        close_old_connections()
+        try:
+            return fn(*args)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(call, thread_sensitive=False)()
+
+
 def _handle_lookup(request, message: str, domain: Optional[str], ctx: Dict[str, Any], rid: str) -> Dict[str, Any]:
     if not LOOKUP_READY:
         logger.debug(f"[{rid}] LOOKUP not ready -> stub reply")
@@ -116,22 +179,24 @@ def _handle_lookup(request, message: str, domain: Optional[str], ctx: Dict[str,
     logger.debug(f"[{rid}] LOOKUP start domain={domain} want_similar={want_similar} text='{text}'")
 
     def run_tool():
-        return similar_tool_by_code(text) if want_similar else lookup_tool_by_name(text)
+        with span("lookup.tool"):
+            return similar_tool_by_code(text) if want_similar else lookup_tool_by_name(text)
 
     def run_holder():
-        return similar_holder_by_code(text) if want_similar else lookup_holder_by_name(text)
+        with span("lookup.holder"):
+            return similar_holder_by_code(text) if want_similar else lookup_holder_by_name(text)
 
     # domain rõ -> chạy đúng
 # domain rõ -> chạy đúng (nhưng có fallback khi đoán nhầm)
     if domain == "tool":
         data = run_tool()
-        logger.debug(f"[{rid}] LOOKUP tool found={data.get('found')} query={data.get('query')}")
+        logger.debug(f"[{rid}] LOOKUP tool found={data.get('found')} query={data.get('query')} debug={data.get('debug')}")
         if data.get("found"):
             return _render_lookup_with_llm(data, ctx, rid)
 
         # FALLBACK: tool không thấy -> thử holder
         data2 = run_holder()
-        logger.debug(f"[{rid}] LOOKUP fallback holder found={data2.get('found')} query={data2.get('query')}")
+        logger.debug(f"[{rid}] LOOKUP fallback holder found={data2.get('found')} query={data2.get('query')} debug={data2.get('debug')}")
         if data2.get("found"):
             set_state(request, domain="holder")  # cập nhật state cho lần sau
             return _render_lookup_with_llm(data2, ctx, rid)
@@ -141,13 +206,13 @@ def _handle_lookup(request, message: str, domain: Optional[str], ctx: Dict[str,
 
     if domain == "holder":
         data = run_holder()
-        logger.debug(f"[{rid}] LOOKUP holder found={data.get('found')} query={data.get('query')}")
+        logger.debug(f"[{rid}] LOOKUP holder found={data.get('found')} query={data.get('query')} debug={data.get('debug')}")
         if data.get("found"):
             return _render_lookup_with_llm(data, ctx, rid)
 
         # FALLBACK: holder không thấy -> thử tool
         data2 = run_tool()
-        logger.debug(f"[{rid}] LOOKUP fallback tool found={data2.get('found')} query={data2.get('query')}")
+        logger.debug(f"[{rid}] LOOKUP fallback tool found={data2.get('found')} query={data2.get('query')} debug={data2.get('debug')}")
         if data2.get("found"):
             set_state(request, domain="tool")
             return _render_lookup_with_llm(data2, ctx, rid)
@@ -156,17 +221,21 @@ def _handle_lookup(request, message: str, domain: Optional[str], ctx: Dict[str,
 
     # domain chưa rõ -> thử tool rồi holder
     data1 = run_tool()
-    logger.debug(f"[{rid}] LOOKUP auto tool found={data1.get('found')} query={data1.get('query')}")
+    logger.debug(f"[{rid}] LOOKUP auto tool found={data1.get('found')} query={data1.get('query')} debug={data1.get('debug')}")
     if data1.get("found"):
         set_state(request, domain="tool")
         return _render_lookup_with_llm(data1, ctx, rid)
 
     data2 = run_holder()
-    logger.debug(f"[{rid}] LOOKUP auto holder found={data2.get('found')} query={data2.get('query')}")
+    logger.debug(f"[{rid}] LOOKUP auto holder found={data2.get('found')} query={data2.get('query')} debug={data2.get('debug')}")
     if data2.get("found"):
         set_state(request, domain="holder")
         return _render_lookup_with_llm(data2, ctx, rid)
 
+    return _lookup_not_found_reply()
+
+
+def _lookup_not_found_reply() -> Dict[str, Any]:
     return {
         "reply": html_paragraphs([
             "Mình chưa tìm thấy mã/tên này trong <b>Tool</b> và <b>Holder</b> 😅",
@@ -178,6 +247,55 @@ def _handle_lookup(request, message: str, domain: Optional[str], ctx: Dict[str,
         ])
     }
 
+def _traced(name: str, fn, *args):
+    with span(name):
+        return fn(*args)
+
+
+def _cancel_pending(tasks) -> None:
+    for t in tasks:
+        if not t.done():
+            t.cancel()
+
+
+async def _handle_lookup_async(request, message: str, domain: Optional[str], ctx: Dict[str, Any], rid: str) -> Dict[str, Any]:
+    """Cùng thứ tự ưu tiên / fallback như _handle_lookup, nhưng 2 domain tra song song."""
+    if not LOOKUP_READY:
+        return await sync_to_async(_handle_lookup)(request, message, domain, ctx, rid)
+
+    text = (message or "").strip()
+    lower = text.lower()
+    want_similar = ("tương tự" in lower) or ("similar" in lower)
+
+    tool_fn = similar_tool_by_code if want_similar else lookup_tool_by_name
+    holder_fn = similar_holder_by_code if want_similar else lookup_holder_by_name
+
+    order = ["holder", "tool"] if domain == "holder" else ["tool", "holder"]
+    tasks = {
+        "tool": asyncio.ensure_future(_in_thread(_traced, "lookup.tool", tool_fn, text)),
+        "holder": asyncio.ensure_future(_in_thread(_traced, "lookup.holder", holder_fn, text)),
+    }
+    logger.debug(f"[{rid}] LOOKUP async start domain={domain} order={order} want_similar={want_similar}")
+
+    results: Dict[str, dict] = {}
+    try:
+        for name in order:
+            data = results[name] = await tasks[name]
+            logger.debug(f"[{rid}] LOOKUP async {name} found={data.get('found')} query={data.get('query')} debug={data.get('debug')}")
+            if data.get("found"):
+                if name != domain:
+                    await sync_to_async(set_state)(request, domain=name)
+                # gọi LLM ngay, domain còn lại (nếu chưa xong) bỏ qua
+                _cancel_pending(tasks.values())
+                return await _in_thread(_render_lookup_with_llm, data, ctx, rid)
+    finally:
+        _cancel_pending(tasks.values())
+
+    if domain:
+        return _render_lookup_with_llm(results[domain], ctx, rid)   # not found: không gọi LLM
+    return _lookup_not_found_reply()
+
+
 def normalize_lookup_text(text: str) -> str:
     """
     Giữ nguyên nội dung, chỉ chuẩn hoá xuống dòng cho dễ đọc
@@ -223,22 +341,60 @@ def _render_lookup_with_llm(data: dict, ctx: Dict[str, Any], rid: str) -> Dict[s
     if not LLM_READY:
         return {"reply": base_reply}
 
+    # chỉ gửi field LLM cần (card/similar + link), bỏ debug/ranking -> ít token, key cache ổn định
+    payload_json, payload, stats = compact_lookup_payload(data)
+    logger.debug(f"[{rid}] LOOKUP payload tokens~{stats['tokens']} (raw~{stats['raw_tokens']}, budget {stats['budget']})")
+    domain = str(ctx.get("domain_override") or data.get("domain") or "unknown")
+    tpl = get_prompt(CHAT_TEMPLATE)
+    prompt = tpl.render(
+        user_message=str(ctx.get("user_message", "")) or "",
+        mode="LOOKUP",
+        domain=domain,
+        explain_fuzzy="0",
+        payload_json=payload_json,
+    )
+    # LLM chỉ viết lại card tĩnh -> cùng (model, template, payload) thì dùng lại câu trả lời
+    return _llm_reply(prompt, base_reply, ctx, rid, "lookup",
+                      cache_payload={"mode": "LOOKUP", "domain": domain, "data": payload},
+                      template_sha=tpl.sha)
+
+
+def _llm_reply(prompt: str, fallback: str, ctx: Dict[str, Any], rid: str, tag: str,
+               cache_payload: Optional[Dict[str, Any]] = None, template_sha: str = "") -> Dict[str, Any]:
+    """
+    Gọi LLM viết lại reply cho thân thiện; lỗi / rỗng -> fallback static.
+    ctx["stream"]: không gọi LLM ở đây mà trả kèm {"stream": {model, prompt, cache_key}}
+    để view relay token về widget (SSE), fallback vẫn nằm sẵn trong "reply".
+    cache_payload: có thì tra / ghi cache response (xem llm/cache.py).
+    """
+    model = (ctx.get("model") or "gemma3:4b").strip()
+
+    key = None
+    if cache_payload is not None:
+        key = cache_key(model, template_sha, cache_payload)
+        with span("llm.cache"):
+            cached = get_response_cache().get(key)
+        if cached:
+            logger.debug(f"[{rid}] LLM {tag} cache HIT key={key[:12]}")
+            return {"reply": cached, "cached": True}
+
+    if ctx.get("stream"):
+        return {"reply": fallback, "stream": {"model": model, "prompt": prompt, "tag": tag, "cache_key": key}}
+
     try:
-        prompt = build_prompt(
-            TPL,
-            user_message=str(ctx.get("user_message", "")) or "",
-            mode="LOOKUP",
-            domain=str(ctx.get("domain_override") or "unknown"),
-            explain_fuzzy="0",
-            payload_json=json.dumps(data, ensure_ascii=False),
-        )
-        model = (ctx.get("model") or "gemma3:4b").strip()
-        ai_reply = ollama_chat(model, prompt)
-        logger.debug(f"[{rid}] LLM lookup reply_len={len(ai_reply or '')}")
-        return {"reply": ai_reply or base_reply}
+        # admission: giới hạn số worker chờ LLM, LOOKUP ưu tiên hơn FUZZY; bị shed -> LLMUnavailable
+        with span("llm"), get_admission().admit(tag.upper()):
+            ai_reply = ollama_chat(model, prompt)
+        logger.debug(f"[{rid}] LLM {tag} reply_len={len(ai_reply or '')}")
+        if key and ai_reply:
+            get_response_cache().set(key, ai_reply)
+        return {"reply": ai_reply or fallback}
+    except LLMUnavailable as e:
+        logger.warning(f"[{rid}] LLM {tag} unavailable ({e}) -> fallback static")
+        return {"reply": fallback}
     except Exception:
-        logger.exception(f"[{rid}] LLM lookup failed -> fallback static")
-        return {"reply": base_reply}
+        logger.exception(f"[{rid}] LLM {tag} failed -> fallback static")
+        return {"reply": fallback}
 
 
 def _handle_fuzzy(request, message: str, domain: str, ctx: Dict[str, Any], rid: str) -> Dict[str, Any]:
@@ -247,26 +403,26 @@ def _handle_fuzzy(request, message: str, domain: str, ctx: Dict[str, Any], rid:
 
     logger.debug(f"[{rid}] FUZZY start domain={domain} model={model} explain={explain_fuzzy}")
 
-    parse = _stub_parse_to_scores(message, domain)
+    with span("fuzzy.parse"):
+        parse = _stub_parse_to_scores(message, domain)
     logger.debug(f"[{rid}] FUZZY parse_status={parse.get('status')} inputs={parse.get('inputs')}")
 
     if parse["status"] == "need_more_info":
         set_state(request, pending_intent="FUZZY", missing_fields=parse.get("missing_fields", []))
         return {"reply": parse["clarifying_question"]}
 
-    if FUZZY_READY:
-        fuzzy_out = score_tool_candidates(parse["inputs"]) if domain == "tool" else score_holder_candidates(parse["inputs"])
-        logger.debug(f"[{rid}] FUZZY engine={fuzzy_out.get('engine_version')}")
-    else:
-        fuzzy_out = _demo_fuzzy_score(parse["inputs"], domain)
-        logger.debug(f"[{rid}] FUZZY fallback demo")
+    with span("fuzzy.score"):
+        if FUZZY_READY:
+            fuzzy_out = score_tool_candidates(parse["inputs"]) if domain == "tool" else score_holder_candidates(parse["inputs"])
+            logger.debug(f"[{rid}] FUZZY engine={fuzzy_out.get('engine_version')}")
+        else:
+            fuzzy_out = _demo_fuzzy_score(parse["inputs"], domain)
+            logger.debug(f"[{rid}] FUZZY fallback demo")
 
     top3 = (fuzzy_out.get("ranked") or [])[:3]
     logger.debug(f"[{rid}] FUZZY top3={[(x.get('code'), x.get('score')) for x in top3]}")
     logger.debug(f"[{rid}] FUZZY rules={fuzzy_out.get('rules_fired')}")
 
-    payload = {"parse": parse, "fuzzy": fuzzy_out}
-
     set_fuzzy_last(request, {
         "domain": domain,
         "model": model,
@@ -275,24 +431,6 @@ def _handle_fuzzy(request, message: str, domain: str, ctx: Dict[str, Any], rid:
         "fuzzy": fuzzy_out,
     })
 
-    # Nếu có LLM thì để LLM giải thích cho mượt
-    if LLM_READY:
-        try:
-            prompt = build_prompt(
-                TPL,
-                user_message=message,
-                mode="FUZZY",
-                domain=domain,
-                explain_fuzzy="1" if explain_fuzzy else "0",
-                payload_json=json.dumps(payload, ensure_ascii=False),
-            )
-            ai_reply = ollama_chat(model, prompt)
-            logger.debug(f"[{rid}] LLM fuzzy reply_len={len(ai_reply or '')}")
-            if ai_reply:
-                return {"reply": ai_reply}
-        except Exception:
-            logger.exception(f"[{rid}] LLM fuzzy failed -> fallback static")
-
     # fallback static
     reply_lines = [
         f"Ok, mình đã chạy fuzzy cho <b>{domain.upper()}</b> ✅",
@@ -305,7 +443,22 @@ def _handle_fuzzy(request, message: str, domain: str, ctx: Dict[str, Any], rid:
         "",
         system_note("Bấm icon 📈 để xem JSON fuzzy gần nhất (debug)."),
     ]
-    return {"reply": html_paragraphs(reply_lines)}
+    static_reply = html_paragraphs(reply_lines)
+
+    # Nếu có LLM thì để LLM giải thích cho mượt
+    if not LLM_READY:
+        return {"reply": static_reply}
+
+    payload_json, _, stats = compact_fuzzy_payload(parse, fuzzy_out, explain=explain_fuzzy)
+    logger.debug(f"[{rid}] FUZZY payload tokens~{stats['tokens']} (raw~{stats['raw_tokens']}, budget {stats['budget']})")
+    prompt = get_prompt(CHAT_TEMPLATE).render(
+        user_message=message,
+        mode="FUZZY",
+        domain=domain,
+        explain_fuzzy="1" if explain_fuzzy else "0",
+        payload_json=payload_json,
+    )
+    return _llm_reply(prompt, static_reply, ctx, rid, "fuzzy")
 
 
 # ===================== Stub parse & demo =====================
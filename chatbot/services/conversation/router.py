@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from typing import Dict, Optional, Tuple
 import re
+import unicodedata
+
+from lookup.services.shared.rules import fold_text
+from .classifier import get_classifier, min_confidence
 
 # ----------------------------
 # HINTS / KEYWORDS
@@ -56,24 +60,95 @@ def _looks_like_code_only(text: str) -> bool:
 
 
 # ----------------------------
-# SCORING / GUESSING
+# KEYWORD SCANNER (1 pass)
 # ----------------------------
 
-def _count_hits(t: str, keywords: list[str]) -> int:
-    return sum(1 for k in keywords if k in t)
+# Từ chỉ "đồ vật tool" dùng kèm MACHINING_HINTS
+TOOL_OBJECT_HINTS = ["tool", "dao", "mũi", "endmill", "drill", "khoan", "phay"]
+
+KEYWORD_FAMILIES = {
+    "tool": TOOL_HINTS,
+    "holder": HOLDER_HINTS,
+    "lookup": LOOKUP_HINTS,
+    "fuzzy": FUZZY_HINTS,
+    "machining": MACHINING_HINTS,
+    "tool_object": TOOL_OBJECT_HINTS,
+}
+
+
+# Dạng bỏ dấu trùng với từ thông dụng khác nghĩa -> chỉ khớp khi user gõ đúng dấu
+# ("ảnh"/"anh", "mã"/"mà", "đắt"/"đặt", "bền"/"bên", "tiện"/"tiền")
+AMBIGUOUS_FOLDED = {"anh", "ma", "dat", "ben", "tien"}
+
+
+def _norm(text: str) -> str:
+    return unicodedata.normalize("NFC", (text or "").lower())
+
+
+def _compile_scanner(families: Dict[str, list]) -> Tuple["re.Pattern[str]", Dict[str, str], Dict[str, frozenset]]:
+    """
+    Gom toàn bộ keyword thành 1 regex alternation, quét trên text lowercase GIỮ dấu.
+    - Keyword có dấu khớp thêm dạng bỏ dấu ("mui" cho "mũi") -> vẫn nhận text gõ không dấu,
+      vì quét trên text gốc nên dạng bỏ dấu chỉ khớp chữ cũng không dấu ("cắt" không thành "cat")
+    - Bỏ dạng bỏ dấu nếu trùng keyword khác hoặc từ thông dụng (AMBIGUOUS_FOLDED)
+    - Biên là "không phải chữ cái" (số vẫn tính là biên) -> "bt40", "d10", "10mm" vẫn khớp,
+      nhưng "d"/"r"/"bt" không còn khớp bừa bên trong từ khác.
+    - Keyword dài đặt trước để "end mill" thắng "mill".
+    """
+    owners: Dict[str, set] = {}
+    for fam, words in families.items():
+        for w in words:
+            owners.setdefault(_norm(w).strip(), set()).add(fam)
+
+    variants: Dict[str, str] = {k: k for k in owners}          # chuỗi khớp -> keyword gốc
+    for k in owners:
+        folded = fold_text(k)
+        if folded != k and folded not in owners and folded not in AMBIGUOUS_FOLDED:
+            variants.setdefault(folded, k)
+
+    alts = sorted(variants, key=len, reverse=True)
+    pattern = re.compile(
+        r"(?<![^\W\d_])(" + "|".join(re.escape(k) for k in alts) + r")(?![^\W\d_])"
+    )
+    return pattern, variants, {k: frozenset(v) for k, v in owners.items()}
 
-def guess_domain(text: str, default: Optional[str] = None) -> Optional[str]:
-    t = (text or "").lower()
 
-    tool_score = _count_hits(t, TOOL_HINTS)
-    holder_score = _count_hits(t, HOLDER_HINTS)
+_SCANNER_RE, _KEYWORD_VARIANTS, _KEYWORD_OWNERS = _compile_scanner(KEYWORD_FAMILIES)
+
+
+def scan_keywords(text: str) -> Dict[str, int]:
+    """
+    1 lượt quét -> số keyword (khác nhau) trúng theo từng họ.
+    vd: {"tool": 2, "holder": 0, "lookup": 1, "fuzzy": 0, "machining": 1, "tool_object": 1}
+    """
+    hits = {fam: 0 for fam in KEYWORD_FAMILIES}
+    seen = set()
+    for m in _SCANNER_RE.finditer(_norm(text)):
+        kw = _KEYWORD_VARIANTS[m.group(1)]
+        if kw in seen:
+            continue
+        seen.add(kw)
+        for fam in _KEYWORD_OWNERS[kw]:
+            hits[fam] += 1
+    return hits
+
+
+# ----------------------------
+# SCORING / GUESSING
+# ----------------------------
+
+def guess_domain(text: str, default: Optional[str] = None, hits: Optional[Dict[str, int]] = None) -> Optional[str]:
+    hits = hits if hits is not None else scan_keywords(text)
+
+    tool_score = hits["tool"]
+    holder_score = hits["holder"]
 
     if tool_score == 0 and holder_score == 0:
         return default
 
     return "tool" if tool_score >= holder_score else "holder"
 
-def guess_intent(text: str) -> str:
+def guess_intent(text: str, hits: Optional[Dict[str, int]] = None) -> str:
     """
     Priority:
     1) Explicit lookup signals
@@ -81,16 +156,16 @@ def guess_intent(text: str) -> str:
     3) If it smells like machining request -> FUZZY (because often user asks "tool nào gia công X")
     4) else CHAT
     """
-    t = (text or "").lower()
+    hits = hits if hits is not None else scan_keywords(text)
 
-    if any(k in t for k in LOOKUP_HINTS):
+    if hits["lookup"]:
         return "LOOKUP"
 
-    if any(k in t for k in FUZZY_HINTS):
+    if hits["fuzzy"]:
         return "FUZZY"
 
     # If the user is clearly asking about machining/material but didn't say "đề xuất"
-    if any(k in t for k in MACHINING_HINTS) and any(k in t for k in ["tool", "dao", "mũi", "endmill", "drill", "khoan", "phay"]):
+    if hits["machining"] and hits["tool_object"]:
         return "FUZZY"
 
     return "CHAT"
@@ -106,6 +181,7 @@ def route(text: str, state_domain: Optional[str] = None) -> Dict[str, str]:
       - intent: LOOKUP | FUZZY | CHAT
       - domain: tool | holder | "" (unknown)
       - (optional) norm_text: text cleaned from prefix (handy for orchestrator)
+      - source: prefix | rules | classifier
     """
 
     raw = text or ""
@@ -131,13 +207,26 @@ def route(text: str, state_domain: Optional[str] = None) -> Dict[str, str]:
         else:
             # If the tail contains lookup hints (catalog, datasheet...) keep LOOKUP
             # else default to FUZZY because prefix indicates "work context"
-            intent = "LOOKUP" if any(k in tail.lower() for k in LOOKUP_HINTS) else "FUZZY"
-
-        return {"domain": domain, "intent": intent, "norm_text": tail}
-
-    # 1) No prefix: normal guessing
-    domain = guess_domain(t, default=state_domain)
-    intent = guess_intent(t)
+            intent = "LOOKUP" if scan_keywords(tail)["lookup"] else "FUZZY"
+
+        return {"domain": domain, "intent": intent, "norm_text": tail, "source": "prefix"}
+
+    # 1) No prefix: normal guessing (1 lượt quét cho mọi họ keyword)
+    hits = scan_keywords(t)
+    domain = guess_domain(t, default=state_domain, hits=hits)
+    intent = guess_intent(t, hits=hits)
+    source = "rules"
+
+    # 1b) Classifier đã train (nếu có): chỉ ghi đè khi đủ tự tin, còn lại giữ rule
+    clf = get_classifier()
+    if clf is not None:
+        pred = clf.predict(t)
+        threshold = min_confidence()
+        if pred["intent_conf"] >= threshold:
+            intent = pred["intent"]
+            source = "classifier"
+        if pred["domain"] and pred["domain_conf"] >= threshold:
+            domain = pred["domain"]
 
     # 2) Safety refinement: if intent is LOOKUP but domain unknown -> keep domain from state if any
     #    (you said orchestrator can ask back if still empty)
@@ -148,4 +237,4 @@ def route(text: str, state_domain: Optional[str] = None) -> Dict[str, str]:
     if intent == "CHAT" and _looks_like_code_only(t):
         intent = "LOOKUP"
 
-    return {"domain": domain or "", "intent": intent, "norm_text": t}
+    return {"domain": domain or "", "intent": intent, "norm_text": t, "source": source}
@@ -1,30 +1,67 @@
+import uuid
 from typing import Any, Dict, Optional
 
+from ..tracing import span
+from .store import get_store
+
+# key cũ trong request.session (trước khi tách store) -> chỉ đọc để chuyển state sang store
 SESSION_KEY = "tms_chatbot_state"
 FUZZY_LAST_KEY = "tms_fuzzy_last"
 
+STATE_NS = "state"
+FUZZY_NS = "fuzzy"
+
+
+def _default_state() -> Dict[str, Any]:
+    return {
+        "domain": None,          # "tool" | "holder" | None
+        "pending_intent": None,  # ví dụ: "fuzzy" khi đang hỏi thiếu thông tin
+        "missing_fields": [],
+        "fuzzy_last_ref": None,  # id bản fuzzy gần nhất trong store (không nhét JSON vào state)
+    }
+
+
+def _session_key(request) -> str:
+    session = request.session
+    if not session.session_key:
+        session.save()   # khách mới chưa có session -> tạo 1 lần để có key
+    return session.session_key
+
+
 def get_state(request) -> Dict[str, Any]:
-    state = request.session.get(SESSION_KEY)
+    key = _session_key(request)
+    state = get_store().get(STATE_NS, key)
     if not isinstance(state, dict):
-        state = {
-            "domain": None,          # "tool" | "holder" | None
-            "pending_intent": None,  # ví dụ: "fuzzy" khi đang hỏi thiếu thông tin
-            "missing_fields": [],
-        }
-        request.session[SESSION_KEY] = state
+        legacy = request.session.get(SESSION_KEY)
+        state = {**_default_state(), **(legacy if isinstance(legacy, dict) else {})}
     return state
 
+
 def set_state(request, **kwargs) -> Dict[str, Any]:
-    state = get_state(request)
-    state.update(kwargs)
-    request.session[SESSION_KEY] = state
-    request.session.modified = True
-    return state
+    key = _session_key(request)
+    stored = get_store().get(STATE_NS, key)
+    state = stored if isinstance(stored, dict) else get_state(request)
+    new_state = {**state, **kwargs}
+    # đa số lượt chat set lại đúng domain cũ -> không ghi
+    if new_state != stored:
+        with span("state.write"):
+            get_store().set(STATE_NS, key, new_state)
+    return new_state
+
 
 def set_fuzzy_last(request, payload: Dict[str, Any]) -> None:
-    request.session[FUZZY_LAST_KEY] = payload
-    request.session.modified = True
+    store = get_store()
+    old_ref = get_state(request).get("fuzzy_last_ref")
+    ref = uuid.uuid4().hex
+    with span("state.write"):
+        stored = store.set(FUZZY_NS, ref, payload)
+    if stored:
+        set_state(request, fuzzy_last_ref=ref)
+        if old_ref:
+            store.delete(FUZZY_NS, old_ref)
+
 
 def get_fuzzy_last_for_debug(request) -> Optional[Dict[str, Any]]:
-    data = request.session.get(FUZZY_LAST_KEY)
+    ref = get_state(request).get("fuzzy_last_ref")
+    data = get_store().get(FUZZY_NS, ref) if ref else request.session.get(FUZZY_LAST_KEY)
     return data if isinstance(data, dict) else None
@@ -0,0 +1,165 @@
+"""
+Kho state hội thoại chatbot, tách khỏi Django session (DB session trên SQLite = 1 UPDATE
+blob pickle có khoá ghi mỗi lượt chat).
+
+- Key = (namespace, session_key): "state" cho dict state nhỏ, "fuzzy" cho JSON fuzzy gần nhất
+- Tầng 1: LRU in-process; entry chỉ tin trong vài giây (nhiều worker cùng phục vụ 1 session)
+- Tầng 2: SQLite WAL riêng (chat_state.sqlite3): đọc không chặn ghi, ghi không đụng bảng session
+- Giới hạn: số entry LRU, kích thước 1 value, số dòng SQLite, TTL
+  (mỗi purge_every lần ghi: xoá dòng hết hạn + dòng cũ nhất vượt max_rows)
+
+Settings:
+  CHATBOT_STATE_PATH        .sqlite3 (mặc định BASE_DIR/chatbot/chat_state.sqlite3)
+  CHATBOT_STATE_TTL         giây (mặc định 7 ngày)
+  CHATBOT_STATE_MAX_ITEMS   số entry LRU (mặc định 2000)
+  CHATBOT_STATE_MAX_BYTES   kích thước tối đa 1 value JSON (mặc định 512 KB)
+  CHATBOT_STATE_MAX_ROWS    số dòng tối đa trong SQLite (mặc định 20000)
+  CHATBOT_STATE_PURGE_EVERY dọn SQLite sau mỗi N lần ghi (mặc định 200)
+  CHATBOT_STATE_MEMORY_TTL  giây LRU được dùng mà không đọc lại SQLite (mặc định 5)
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger("chatbot")
+
+
+class ConversationStore:
+    def __init__(self, path: Path, max_items: int = 2000, ttl: float = 7 * 86400,
+                 max_value_bytes: int = 512 * 1024, memory_ttl: float = 5.0,
+                 max_rows: int = 20000, purge_every: int = 200):
+        self.path = Path(path)
+        self.max_items = max(max_items, 1)
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self.memory_ttl = memory_ttl
+        self.max_rows = max(max_rows, 1)
+        self.purge_every = max(purge_every, 1)
+        self._writes = self.purge_every      # lần ghi đầu tiên của process dọn luôn
+        self._mem: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=2.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_state ("
+                " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (ns, key))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS chat_state_updated ON chat_state (updated_at)")
+            self._db = db
+        return self._db
+
+    def get(self, ns: str, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get((ns, key))
+            if hit is not None and now - hit[1] < self.memory_ttl:
+                self._mem.move_to_end((ns, key))
+                return hit[0]
+            try:
+                row = self._conn().execute(
+                    "SELECT value, updated_at FROM chat_state WHERE ns = ? AND key = ?", (ns, key)
+                ).fetchone()
+            except sqlite3.Error:
+                logger.exception(f"[STATE] read failed ns={ns}")
+                return hit[0] if hit else None
+            if not row or now - row[1] >= self.ttl:
+                self._mem.pop((ns, key), None)
+                return None
+            value = json.loads(row[0])
+            self._remember((ns, key), value, now)
+            return value
+
+    def set(self, ns: str, key: str, value: Any) -> bool:
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+        if len(raw.encode("utf-8")) > self.max_value_bytes:
+            logger.warning(f"[STATE] value too large ns={ns} ({len(raw)} chars) -> not stored")
+            return False
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn().execute(
+                    "INSERT OR REPLACE INTO chat_state (ns, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                    (ns, key, raw, now),
+                )
+                self._writes += 1
+                if self._writes >= self.purge_every:
+                    self._writes = 0
+                    self._trim(now)
+            except sqlite3.Error:
+                logger.exception(f"[STATE] write failed ns={ns}")
+                return False
+            self._remember((ns, key), value, now)
+        return True
+
+    def delete(self, ns: str, key: str) -> None:
+        with self._lock:
+            self._mem.pop((ns, key), None)
+            try:
+                self._conn().execute("DELETE FROM chat_state WHERE ns = ? AND key = ?", (ns, key))
+            except sqlite3.Error:
+                logger.exception(f"[STATE] delete failed ns={ns}")
+
+    def purge_expired(self) -> int:
+        """Xoá dòng hết hạn + dòng cũ nhất vượt max_rows. return số dòng xoá."""
+        with self._lock:
+            return self._trim(time.time())
+
+    def _trim(self, now: float) -> int:
+        db = self._conn()
+        n = db.execute("DELETE FROM chat_state WHERE updated_at < ?", (now - self.ttl,)).rowcount
+        over = db.execute("SELECT COUNT(*) FROM chat_state").fetchone()[0] - self.max_rows
+        if over > 0:
+            n += db.execute(
+                "DELETE FROM chat_state WHERE rowid IN"
+                " (SELECT rowid FROM chat_state ORDER BY updated_at LIMIT ?)", (over,)
+            ).rowcount
+        return n
+
+    def _remember(self, k: tuple, value: Any, ts: float) -> None:
+        self._mem[k] = (value, ts)
+        self._mem.move_to_end(k)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+
+# ===================== Singleton =====================
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from django.conf import settings
+                _store = ConversationStore(
+                    path=getattr(settings, "CHATBOT_STATE_PATH", Path(settings.BASE_DIR) / "chatbot" / "chat_state.sqlite3"),
+                    max_items=int(getattr(settings, "CHATBOT_STATE_MAX_ITEMS", 2000)),
+                    ttl=float(getattr(settings, "CHATBOT_STATE_TTL", 7 * 86400)),
+                    max_value_bytes=int(getattr(settings, "CHATBOT_STATE_MAX_BYTES", 512 * 1024)),
+                    memory_ttl=float(getattr(settings, "CHATBOT_STATE_MEMORY_TTL", 5.0)),
+                    max_rows=int(getattr(settings, "CHATBOT_STATE_MAX_ROWS", 20000)),
+                    purge_every=int(getattr(settings, "CHATBOT_STATE_PURGE_EVERY", 200)),
+                )
+    return _store
+
+
+def set_store(store: Optional[ConversationStore]) -> Optional[ConversationStore]:
+    """Thay store mặc định (vd replay dùng file tạm). return store cũ."""
+    global _store
+    with _store_lock:
+        old, _store = _store, store
+    return old
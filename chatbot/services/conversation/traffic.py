@@ -0,0 +1,37 @@
+"""
+Ghi log traffic chat ra JSONL (1 dòng / lượt) làm corpus train classifier + replay.
+
+Bật bằng settings.CHATBOT_TRAFFIC_LOG = "<đường dẫn .jsonl>" (mặc định tắt).
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from django.conf import settings
+
+logger = logging.getLogger("chatbot")
+
+_lock = threading.Lock()
+
+
+def traffic_log_path():
+    path = getattr(settings, "CHATBOT_TRAFFIC_LOG", None)
+    return Path(path) if path else None
+
+
+def log_chat_turn(record: Dict[str, Any]) -> None:
+    path = traffic_log_path()
+    if not path:
+        return
+    rec = {"ts": round(time.time(), 3), **record}
+    line = json.dumps(rec, ensure_ascii=False, default=str)
+    try:
+        with _lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError:
+        logger.exception(f"[TRAFFIC] cannot append to {path}")
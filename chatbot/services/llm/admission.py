@@ -0,0 +1,139 @@
+"""
+Admission control cho các lượt chat cần LLM (mọi model, toàn process).
+
+Burst chat dồn hết worker Django vào ollama_chat -> trang thường / mượn trả bị đói worker.
+- Tối đa `capacity` lượt gọi LLM cùng lúc, phần dư vào hàng đợi có giới hạn
+- Hàng đợi ưu tiên: LOOKUP (viết lại card, ngắn) trước FUZZY (giải thích, dài); cùng mức thì FIFO
+- Hàng đợi đầy / chờ quá max_wait -> LLMShed (subclass LLMUnavailable) -> caller trả reply static
+- Khác semaphore per-model trong OllamaClient: cái đó giới hạn kết nối tới Ollama,
+  cái này giới hạn số worker được phép chờ LLM
+
+Settings:
+  CHATBOT_LLM_MAX_INFLIGHT  (mặc định 4)
+  CHATBOT_LLM_MAX_QUEUE     (mặc định 8)
+  CHATBOT_LLM_MAX_WAIT      {"LOOKUP": 2.0, "FUZZY": 1.0} giây
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from .client import LLMUnavailable
+
+logger = logging.getLogger("chatbot")
+
+PRIORITY = {"LOOKUP": 0, "FUZZY": 1}
+DEFAULT_MAX_WAIT = {"LOOKUP": 2.0, "FUZZY": 1.0}
+
+
+class LLMShed(LLMUnavailable):
+    """Bị từ chối ở cửa admission (hàng đợi đầy / chờ quá lâu)."""
+
+
+class AdmissionController:
+    def __init__(self, capacity: int = 4, max_queue: int = 8, max_wait: Optional[Dict[str, float]] = None):
+        self.capacity = max(capacity, 1)
+        self.max_queue = max(max_queue, 0)
+        self.max_wait = {**DEFAULT_MAX_WAIT, **(max_wait or {})}
+
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._queue: list = []          # heap [priority, seq, granted]
+        self._seq = itertools.count()
+
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.max_depth = 0
+        self._waits_ms = deque(maxlen=1000)
+
+    @contextmanager
+    def admit(self, kind: str):
+        self._acquire(kind)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, kind: str) -> None:
+        prio = PRIORITY.get(kind, max(PRIORITY.values()) + 1)
+        t0 = time.monotonic()
+        deadline = t0 + float(self.max_wait.get(kind, min(self.max_wait.values())))
+
+        with self._cond:
+            if self._inflight < self.capacity and not self._queue:
+                self._inflight += 1
+                self.admitted += 1
+                self._waits_ms.append(0.0)
+                return
+
+            if len(self._queue) >= self.max_queue:
+                self.shed_queue_full += 1
+                raise LLMShed(f"LLM queue full ({len(self._queue)}/{self.max_queue})")
+
+            entry = [prio, next(self._seq), False]
+            heapq.heappush(self._queue, entry)
+            self.max_depth = max(self.max_depth, len(self._queue))
+
+            while not entry[2]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self.shed_timeout += 1
+                    raise LLMShed(f"LLM queue wait > {self.max_wait.get(kind)}s ({kind})")
+                self._cond.wait(remaining)
+
+            self.admitted += 1
+            self._waits_ms.append((time.monotonic() - t0) * 1000.0)
+
+    def _release(self) -> None:
+        with self._cond:
+            self._inflight -= 1
+            # trao slot trực tiếp cho người chờ ưu tiên nhất (không để request mới chen ngang)
+            while self._inflight < self.capacity and self._queue:
+                entry = heapq.heappop(self._queue)
+                entry[2] = True
+                self._inflight += 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits_ms)
+            n = len(waits)
+            return {
+                "capacity": self.capacity,
+                "inflight": self._inflight,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "max_depth_seen": self.max_depth,
+                "admitted": self.admitted,
+                "shed": {"queue_full": self.shed_queue_full, "timeout": self.shed_timeout},
+                "wait_ms": {
+                    "p50": round(waits[n // 2], 2) if n else None,
+                    "p95": round(waits[min(int(n * 0.95), n - 1)], 2) if n else None,
+                },
+            }
+
+
+# ===================== Singleton =====================
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                from django.conf import settings
+                _controller = AdmissionController(
+                    capacity=int(getattr(settings, "CHATBOT_LLM_MAX_INFLIGHT", 4)),
+                    max_queue=int(getattr(settings, "CHATBOT_LLM_MAX_QUEUE", 8)),
+                    max_wait=getattr(settings, "CHATBOT_LLM_MAX_WAIT", None),
+                )
+    return _controller
@@ -0,0 +1,183 @@
+"""
+Cache câu trả lời LLM cho LOOKUP (LLM chỉ viết lại 1 card tĩnh -> cùng input thì dùng lại được).
+
+- Key = sha256(model, sha template prompt, payload JSON đã sort key)
+- Tầng 1: LRU in-memory có TTL (mỗi process)
+- Tầng 2: SQLite (WAL) trên đĩa, sống qua restart + dùng chung giữa các worker;
+  mỗi purge_every lần ghi: xoá entry hết hạn + entry cũ nhất vượt max_rows
+
+Settings:
+  CHATBOT_LLM_CACHE_PATH   đường dẫn .sqlite3 (mặc định BASE_DIR/chatbot/llm_cache.sqlite3, "" = tắt tầng đĩa)
+  CHATBOT_LLM_CACHE_TTL    giây (mặc định 1 ngày)
+  CHATBOT_LLM_CACHE_SIZE   số entry in-memory (mặc định 512)
+  CHATBOT_LLM_CACHE_ROWS   số entry tối đa trên đĩa (mặc định 20000)
+  CHATBOT_LLM_CACHE_PURGE_EVERY  dọn tầng đĩa sau mỗi N lần ghi (mặc định 200)
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger("chatbot")
+
+
+def cache_key(model: str, template_sha: str, payload: Any) -> str:
+    """template_sha: PromptTemplate.sha (registry.py) -> sửa prompt là key đổi."""
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    raw = "\x1f".join([model, template_sha, body])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_items: int = 512, ttl: float = 86400.0, path: Optional[Path] = None,
+                 max_rows: int = 20000, purge_every: int = 200):
+        self.max_items = max(max_items, 1)
+        self.max_rows = max(max_rows, 1)
+        self.purge_every = max(purge_every, 1)
+        self._writes = self.purge_every      # lần ghi đầu tiên của process dọn luôn
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- SQLite tier ----------
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._db is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(str(self.path), timeout=1.0, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created_at)")
+                self._db = db
+            except sqlite3.Error:
+                logger.exception(f"[LLM_CACHE] cannot open {self.path} -> memory only")
+                self.path = None
+                return None
+        return self._db
+
+    # ---------- API ----------
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                value, created_at = hit
+                if now - created_at < self.ttl:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._mem[key]
+
+            db = self._conn()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error:
+                    logger.exception("[LLM_CACHE] read failed")
+                    row = None
+                if row and now - row[1] < self.ttl:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        if not value:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._conn()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, value, now),
+                    )
+                    self._writes += 1
+                    if self._writes >= self.purge_every:
+                        self._writes = 0
+                        self._trim(db, now)
+                except sqlite3.Error:
+                    logger.exception("[LLM_CACHE] write failed")
+
+    def purge_expired(self) -> int:
+        """Xoá entry hết hạn + entry cũ nhất vượt max_rows trên đĩa (set() tự gọi định kỳ)."""
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return 0
+            return self._trim(db, time.time())
+
+    def _trim(self, db: sqlite3.Connection, now: float) -> int:
+        n = db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        over = db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_rows
+        if over > 0:
+            n += db.execute(
+                "DELETE FROM llm_cache WHERE key IN"
+                " (SELECT key FROM llm_cache ORDER BY created_at LIMIT ?)", (over,)
+            ).rowcount
+        return n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            db = self._conn()
+            if db is not None:
+                db.execute("DELETE FROM llm_cache")
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._mem[key] = (value, created_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+
+# ===================== Singleton =====================
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from django.conf import settings
+                path = getattr(settings, "CHATBOT_LLM_CACHE_PATH",
+                               Path(settings.BASE_DIR) / "chatbot" / "llm_cache.sqlite3")
+                _cache = ResponseCache(
+                    max_items=int(getattr(settings, "CHATBOT_LLM_CACHE_SIZE", 512)),
+                    ttl=float(getattr(settings, "CHATBOT_LLM_CACHE_TTL", 86400)),
+                    path=Path(path) if path else None,
+                    max_rows=int(getattr(settings, "CHATBOT_LLM_CACHE_ROWS", 20000)),
+                    purge_every=int(getattr(settings, "CHATBOT_LLM_CACHE_PURGE_EVERY", 200)),
+                )
+    return _cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> Optional[ResponseCache]:
+    """Thay cache mặc định (vd replay không ghi vào cache thật). return cache cũ."""
+    global _cache
+    with _cache_lock:
+        old, _cache = _cache, cache
+    return old
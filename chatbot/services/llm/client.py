@@ -1,22 +1,239 @@
 import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from .registry import PromptTemplate
+
+logger = logging.getLogger("chatbot")
+
+# ===================== Config (env) =====================
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434").rstrip("/")
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "2.0"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "60"))
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))
+# số request đồng thời / model; override từng model: "gemma3:4b=1,gpt-oss:120b-cloud=4"
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_MODEL_CONCURRENCY = os.getenv("OLLAMA_MODEL_CONCURRENCY", "")
+# chờ slot tối đa bao lâu trước khi bỏ cuộc -> reply static
+OLLAMA_ACQUIRE_TIMEOUT = float(os.getenv("OLLAMA_ACQUIRE_TIMEOUT", "0.5"))
+# circuit breaker: lỗi liên tiếp -> mở mạch trong cooldown giây
+OLLAMA_BREAKER_FAILURES = int(os.getenv("OLLAMA_BREAKER_FAILURES", "3"))
+OLLAMA_BREAKER_COOLDOWN = float(os.getenv("OLLAMA_BREAKER_COOLDOWN", "30"))
+
+
+class LLMUnavailable(RuntimeError):
+    """LLM đang quá tải / down (mạch mở, hết slot) -> caller dùng reply static ngay."""
+
+
+def _parse_model_limits(spec: str) -> Dict[str, int]:
+    out = {}
+    for part in (spec or "").split(","):
+        name, sep, n = part.strip().rpartition("=")
+        if sep and name:
+            try:
+                out[name.strip()] = max(int(n), 1)
+            except ValueError:
+                logger.warning(f"[LLM] bad OLLAMA_MODEL_CONCURRENCY entry: {part!r}")
+    return out
+
+
+class CircuitBreaker:
+    """
+    closed -> (N lỗi liên tiếp) -> open -> (hết cooldown) -> half-open: cho 1 request thử
+    thử OK -> closed, thử lỗi -> open lại.
+    """
+
+    def __init__(self, max_failures: int, cooldown: float):
+        self.max_failures = max(max_failures, 1)
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Request thử kết thúc mà không có kết quả rõ (bận, 4xx, client ngắt) -> cho thử lại."""
+        with self._lock:
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.max_failures:
+                if self._opened_at is None or self._probing:
+                    logger.warning(f"[LLM] circuit OPEN after {self._failures} failures (cooldown {self.cooldown}s)")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class OllamaClient:
+    """
+    Client Ollama dùng chung trong process:
+    - 1 requests.Session (keep-alive, pool kết nối tới localhost:11434)
+    - giới hạn số request đồng thời theo model (semaphore, chờ có hạn)
+    - timeout connect / read tách riêng
+    - circuit breaker: Ollama down/treo thì fail nhanh thay vì giữ worker Django 60s
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+                 read_timeout: float = OLLAMA_READ_TIMEOUT, pool_size: int = OLLAMA_POOL_SIZE,
+                 default_concurrency: int = OLLAMA_MAX_CONCURRENCY,
+                 model_concurrency: Optional[Dict[str, int]] = None,
+                 acquire_timeout: float = OLLAMA_ACQUIRE_TIMEOUT,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.default_concurrency = max(default_concurrency, 1)
+        self.model_concurrency = dict(model_concurrency or {})
+        self.acquire_timeout = acquire_timeout
+        self.breaker = breaker or CircuitBreaker(OLLAMA_BREAKER_FAILURES, OLLAMA_BREAKER_COOLDOWN)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+    def _semaphore(self, model: str) -> threading.BoundedSemaphore:
+        sem = self._slots.get(model)
+        if sem is None:
+            with self._slots_lock:
+                sem = self._slots.get(model)
+                if sem is None:
+                    n = self.model_concurrency.get(model, self.default_concurrency)
+                    sem = self._slots[model] = threading.BoundedSemaphore(n)
+        return sem
+
+    @contextmanager
+    def _slot(self, model: str):
+        if not self.breaker.allow():
+            raise LLMUnavailable(f"circuit open for {self.base_url}")
+        sem = self._semaphore(model)
+        if not sem.acquire(timeout=self.acquire_timeout):
+            # không tính là lỗi breaker: Ollama vẫn sống, chỉ đang bận
+            self.breaker.release_probe()
+            raise LLMUnavailable(f"model '{model}' busy (no slot in {self.acquire_timeout}s)")
+        try:
+            yield
+        finally:
+            sem.release()
+            self.breaker.release_probe()
+
+    def _post(self, model: str, prompt: str, stream: bool) -> requests.Response:
+        try:
+            r = self.session.post(f"{self.base_url}/api/generate", json={
+                "model": model,
+                "prompt": prompt,
+                "stream": stream,
+            }, timeout=self.timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            self.breaker.failure()
+            raise
+        if r.status_code >= 500:
+            self.breaker.failure()
+            r.close()
+        r.raise_for_status()
+        return r
+
+    def generate(self, model: str, prompt: str) -> str:
+        with self._slot(model):
+            r = self._post(model, prompt, stream=False)
+            text = r.json().get("response", "").strip()
+            self.breaker.success()
+            return text
+
+    def generate_stream(self, model: str, prompt: str) -> Iterator[str]:
+        with self._slot(model):
+            with self._post(model, prompt, stream=True) as r:
+                try:
+                    for line in r.iter_lines():
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        chunk = data.get("response", "")
+                        if chunk:
+                            yield chunk
+                        if data.get("done"):
+                            break
+                except (requests.ConnectionError, requests.Timeout):
+                    self.breaker.failure()
+                    raise
+            self.breaker.success()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: Optional[OllamaClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = OllamaClient(model_concurrency=_parse_model_limits(OLLAMA_MODEL_CONCURRENCY))
+    return _default_client
+
+
+def set_client(client: Optional[OllamaClient]) -> Optional[OllamaClient]:
+    """Thay client mặc định (vd replay_chat trỏ sang fake server). return client cũ để trả lại."""
+    global _default_client
+    with _default_lock:
+        old, _default_client = _default_client, client
+    return old
+
 
 def ollama_chat(model: str, prompt: str) -> str:
     """
-    Gọi Ollama (local) / hoặc bạn đổi endpoint theo server bạn đang chạy.
+    Gọi Ollama (local) / hoặc bạn đổi endpoint qua env OLLAMA_URL.
+    Raise LLMUnavailable nếu đang quá tải / mạch mở.
+    """
+    return get_client().generate(model, prompt)
+
+
+def ollama_chat_stream(model: str, prompt: str):
+    """
+    Như ollama_chat nhưng stream: yield từng mảnh text ngay khi Ollama sinh ra
+    (Ollama trả NDJSON, mỗi dòng {"response": "...", "done": false}).
     """
-    url = "http://localhost:11434/api/generate"
-    r = requests.post(url, json={
-        "model": model,
-        "prompt": prompt,
-        "stream": False,
-    }, timeout=60)
-    r.raise_for_status()
-    return r.json().get("response", "").strip()
+    return get_client().generate_stream(model, prompt)
 
 
 def build_prompt(template: str, **kwargs) -> str:
-    s = template
-    for k, v in kwargs.items():
-        s = s.replace("{{" + k + "}}", str(v))
-    return s
+    """Render template string tuỳ ý; template trong prompts/ thì dùng registry.get_prompt(name).render()."""
+    return PromptTemplate("inline", template).render(**kwargs)
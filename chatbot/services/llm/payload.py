@@ -0,0 +1,136 @@
+"""
+Thu gọn payload_json trước khi nhét vào prompt (chat_response.md).
+
+LLM chỉ cần đủ dữ kiện để viết lại câu trả lời: card / danh sách + điểm + link.
+Không gửi membership_defs, fuzzified, breakdown.notes, ranking/debug... (chỉ để UI / log)
+-> ít token hơn, LLM trả lời nhanh hơn.
+
+- project_lookup / project_fuzzy: chỉ giữ field template dùng, bỏ giá trị rỗng
+- dumps_compact: JSON không khoảng trắng
+- budget theo mode (ước lượng token), vượt thì cắt bớt danh sách từ cuối
+"""
+import json
+import logging
+import math
+import re
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger("chatbot")
+
+# ước lượng token (tiếng Việt có dấu ~ 4 byte UTF-8 / token với tokenizer Llama/Gemma)
+BYTES_PER_TOKEN = 4.0
+
+DEFAULT_BUDGETS = {
+    "LOOKUP": 400,
+    "FUZZY": 500,
+    "FUZZY_EXPLAIN": 800,
+}
+
+LOOKUP_SIMILAR_MAX = 8
+FUZZY_RANKED_MAX = 5
+
+_HREF_RE = re.compile(r"href=['\"]([^'\"]+)['\"]")
+
+
+def estimate_tokens(s: str) -> int:
+    return int(math.ceil(len(s.encode("utf-8")) / BYTES_PER_TOKEN))
+
+
+def dumps_compact(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _prune(d: Dict[str, Any], drop: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    return {k: v for k, v in d.items() if k not in drop and v not in (None, "", [], {})}
+
+
+def _budget(mode: str) -> int:
+    from django.conf import settings
+    budgets = {**DEFAULT_BUDGETS, **getattr(settings, "CHATBOT_PROMPT_BUDGETS", {})}
+    return int(budgets.get(mode, budgets["LOOKUP"]))
+
+
+# ===================== Projections =====================
+def project_lookup(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Kết quả lookup app (ok_reply / not_found_reply) -> dữ kiện cho LLM."""
+    links: List[str] = _HREF_RE.findall(data.get("reply") or "")
+    out: Dict[str, Any] = {
+        "found": bool(data.get("found")),
+        "domain": data.get("domain"),
+        "query": data.get("query"),
+    }
+
+    item = data.get("item")
+    if item:
+        card = _prune(item, drop=("id",))
+        if links:
+            card["link"] = links[0]
+        out["item"] = card
+
+    similar = data.get("similar") or []
+    if similar:
+        # reply similar: dòng 1 là tiêu đề, mỗi card 1 link theo đúng thứ tự
+        cards = []
+        for i, c in enumerate(similar[:LOOKUP_SIMILAR_MAX]):
+            card = _prune(c, drop=("id", "ghi_chu"))
+            if not item and i < len(links):
+                card["link"] = links[i]
+            cards.append(card)
+        out["similar"] = cards
+    return _prune(out)
+
+
+def project_fuzzy(parse: Dict[str, Any], fuzzy: Dict[str, Any], explain: bool = False) -> Dict[str, Any]:
+    """{parse, fuzzy} của _handle_fuzzy -> nhu cầu + top ứng viên (+ lý do nếu explain_fuzzy)."""
+    ranked = []
+    for r in (fuzzy.get("ranked") or [])[:FUZZY_RANKED_MAX]:
+        row = {"code": r.get("code"), "name": r.get("name"), "score": r.get("score")}
+        row.update(_prune(r.get("meta") or {}))
+        ranked.append(_prune(row))
+
+    out: Dict[str, Any] = {
+        "inputs": parse.get("inputs"),
+        "decision": fuzzy.get("decision"),
+        "ranked": ranked,
+        "rules_fired": fuzzy.get("rules_fired"),
+    }
+
+    if explain:
+        breakdown = fuzzy.get("breakdown") or {}
+        out["weights"] = breakdown.get("weights")
+        out["user_preference"] = breakdown.get("user_preference")
+        out["fuzzified"] = fuzzy.get("fuzzified")
+    return _prune(out)
+
+
+# ===================== Budget =====================
+def _fit(payload: Dict[str, Any], list_key: str, budget: int, optional: Tuple[str, ...] = ()) -> Tuple[str, Dict[str, Any]]:
+    s = dumps_compact(payload)
+    # 1) bỏ dần phần tử cuối danh sách (điểm thấp nhất)
+    while estimate_tokens(s) > budget and len(payload.get(list_key) or []) > 1:
+        payload[list_key] = payload[list_key][:-1]
+        s = dumps_compact(payload)
+    # 2) vẫn vượt -> bỏ các khối giải thích phụ
+    for key in optional:
+        if estimate_tokens(s) <= budget:
+            break
+        if payload.pop(key, None) is not None:
+            s = dumps_compact(payload)
+    return s, payload
+
+
+def compact_lookup_payload(data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, int]]:
+    """return (payload_json, payload đã cắt, stats)"""
+    raw_tokens = estimate_tokens(dumps_compact(data))
+    budget = _budget("LOOKUP")
+    s, payload = _fit(project_lookup(data), "similar", budget)
+    return s, payload, {"budget": budget, "raw_tokens": raw_tokens, "tokens": estimate_tokens(s)}
+
+
+def compact_fuzzy_payload(parse: Dict[str, Any], fuzzy: Dict[str, Any],
+                          explain: bool = False) -> Tuple[str, Dict[str, Any], Dict[str, int]]:
+    raw_tokens = estimate_tokens(dumps_compact({"parse": parse, "fuzzy": fuzzy}))
+    budget = _budget("FUZZY_EXPLAIN" if explain else "FUZZY")
+    s, payload = _fit(project_fuzzy(parse, fuzzy, explain), "ranked", budget,
+                      optional=("fuzzified", "user_preference", "weights", "rules_fired"))
+    return s, payload, {"budget": budget, "raw_tokens": raw_tokens, "tokens": estimate_tokens(s)}
@@ -0,0 +1,106 @@
+"""
+Registry prompt template (chatbot/services/llm/prompts/*.md).
+
+- Load tất cả template 1 lần theo đường dẫn tuyệt đối (không phụ thuộc cwd lúc chạy server)
+- Mỗi template tách sẵn thành [text, slot, text, slot, ...] -> render = 1 lần "".join
+- DEBUG=True: sửa file .md là có hiệu lực ngay (check mtime khi get), production thì không stat
+"""
+import hashlib
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("chatbot")
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+_SLOT_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+class PromptTemplate:
+    def __init__(self, name: str, source: str, mtime: float = 0.0):
+        self.name = name
+        self.source = source
+        self.mtime = mtime
+        self.sha = hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+        # split với 1 group -> [text, slot, text, slot, ..., text]
+        parts = _SLOT_RE.split(source)
+        self.texts: List[str] = parts[0::2]
+        self.slots: List[str] = parts[1::2]
+
+    def render(self, **kwargs) -> str:
+        out = [self.texts[0]]
+        for slot, text in zip(self.slots, self.texts[1:]):
+            v = kwargs.get(slot)
+            # slot không truyền -> giữ nguyên {{slot}} như build_prompt cũ
+            out.append("{{" + slot + "}}" if v is None else str(v))
+            out.append(text)
+        return "".join(out)
+
+
+class PromptRegistry:
+    def __init__(self, directory: Path = PROMPTS_DIR, auto_reload: bool = False):
+        self.directory = Path(directory)
+        self.auto_reload = auto_reload
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+        self.load_all()
+
+    def load_all(self) -> None:
+        with self._lock:
+            for path in sorted(self.directory.glob("*.md")):
+                self._templates[path.stem] = self._read(path)
+        logger.debug(f"[PROMPTS] loaded {sorted(self._templates)} from {self.directory}")
+
+    def names(self) -> List[str]:
+        return sorted(self._templates)
+
+    def get(self, name: str) -> PromptTemplate:
+        tpl = self._templates.get(name)
+        if tpl is None or self.auto_reload:
+            tpl = self._reload_if_changed(name, tpl)
+        if tpl is None:
+            raise KeyError(f"prompt template '{name}' not found in {self.directory}")
+        return tpl
+
+    def render(self, name: str, **kwargs) -> str:
+        return self.get(name).render(**kwargs)
+
+    def _reload_if_changed(self, name: str, tpl: Optional[PromptTemplate]) -> Optional[PromptTemplate]:
+        path = self.directory / f"{name}.md"
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return tpl
+        if tpl is not None and tpl.mtime == mtime:
+            return tpl
+        with self._lock:
+            tpl = self._templates[name] = self._read(path)
+        logger.info(f"[PROMPTS] reloaded {path.name}")
+        return tpl
+
+    @staticmethod
+    def _read(path: Path) -> PromptTemplate:
+        return PromptTemplate(path.stem, path.read_text(encoding="utf-8"), path.stat().st_mtime)
+
+
+# ===================== Singleton =====================
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PromptRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from django.conf import settings
+                _registry = PromptRegistry(auto_reload=bool(getattr(settings, "DEBUG", False)))
+    return _registry
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return get_registry().get(name)
@@ -0,0 +1,178 @@
+"""
+Tracing cho 1 lượt chat: span theo từng giai đoạn (route, lookup, fuzzy, state, llm...),
+gắn với request_id sẵn có, ghi thời gian + số query SQL.
+
+- Bật bằng settings.CHATBOT_TRACING = True (mặc định tắt: span() trả nullcontext, gần như 0 chi phí)
+- Trace hiện tại nằm trong ContextVar -> sync_to_async / thread pool của asgiref vẫn thấy
+- Lưu N trace gần nhất (ring buffer) + mẫu thời gian theo stage / model để tính p50/p95/p99
+  (xem GET /chatbot/metrics/)
+
+    trace = start_trace(rid, model=model)
+    with span("route"):
+        ...
+    finish_trace(trace, intent="LOOKUP")
+"""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from lookup.services.shared.debug import count_queries
+
+RING_SIZE = 200
+SAMPLES_PER_KEY = 1000
+# stage tách riêng theo model (còn lại không phụ thuộc model)
+MODEL_STAGES = ("llm", "llm.first_token", "llm.stream")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("chatbot_trace", default=None)
+_NULL = nullcontext()
+
+
+def tracing_enabled() -> bool:
+    from django.conf import settings
+    return bool(getattr(settings, "CHATBOT_TRACING", False))
+
+
+class Trace:
+    def __init__(self, rid: str, **tags):
+        self.rid = rid
+        self.tags: Dict[str, Any] = dict(tags)
+        self.spans: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self._token = None
+
+    def add(self, name: str, ms: float, queries: int = 0) -> None:
+        # list.append an toàn giữa các thread (span chạy trong thread pool khi async)
+        self.spans.append({"name": name, "ms": round(ms, 2), "queries": queries})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rid": self.rid,
+            "ts": round(self.started_at, 3),
+            "total_ms": self.total_ms,
+            "tags": self.tags,
+            "spans": self.spans,
+        }
+
+
+@contextmanager
+def _span(trace: Trace, name: str):
+    t0 = time.perf_counter()
+    with count_queries() as qc:
+        try:
+            yield
+        finally:
+            trace.add(name, (time.perf_counter() - t0) * 1000.0, qc["queries"])
+
+
+def span(name: str):
+    trace = _current.get()
+    if trace is None:
+        return _NULL
+    return _span(trace, name)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def start_trace(rid: str, **tags) -> Optional[Trace]:
+    if not tracing_enabled():
+        return None
+    trace = Trace(rid, **tags)
+    trace._token = _current.set(trace)
+    return trace
+
+
+def detach_trace(trace: Optional[Trace]) -> None:
+    """Gỡ trace khỏi context hiện tại nhưng chưa ghi (vd SSE: phần còn lại chạy trong generator)."""
+    if trace is not None and trace._token is not None:
+        try:
+            _current.reset(trace._token)
+        except ValueError:
+            _current.set(None)
+        trace._token = None
+
+
+def finish_trace(trace: Optional[Trace], **tags) -> None:
+    if trace is None:
+        return
+    trace.total_ms = round((time.perf_counter() - trace._t0) * 1000.0, 2)
+    trace.tags.update(tags)
+    detach_trace(trace)
+    recorder.record(trace)
+
+
+# ===================== Ring buffer + percentile =====================
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    k = max(math.ceil(p / 100.0 * len(sorted_values)) - 1, 0)   # nearest-rank
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+
+def _summary(ms: List[float], queries: Optional[List[int]] = None) -> Dict[str, Any]:
+    s = sorted(ms)
+    out = {
+        "count": len(s),
+        "p50": percentile(s, 50),
+        "p95": percentile(s, 95),
+        "p99": percentile(s, 99),
+        "max": s[-1] if s else None,
+    }
+    if queries:
+        out["avg_queries"] = round(sum(queries) / len(queries), 2)
+    return out
+
+
+class TraceRecorder:
+    def __init__(self, ring_size: int = RING_SIZE, samples_per_key: int = SAMPLES_PER_KEY):
+        self._ring = deque(maxlen=ring_size)
+        self._stage_ms = defaultdict(lambda: deque(maxlen=samples_per_key))
+        self._stage_q = defaultdict(lambda: deque(maxlen=samples_per_key))
+        self._model_ms = defaultdict(lambda: deque(maxlen=samples_per_key))
+        self._lock = threading.Lock()
+
+    def record(self, trace: Trace) -> None:
+        with self._lock:
+            self._ring.append(trace.to_dict())
+            # 1 stage lặp nhiều lần trong 1 request (vd state.write) -> cộng dồn
+            per_stage: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+            for sp in trace.spans:
+                acc = per_stage[sp["name"]]
+                acc[0] += sp["ms"]
+                acc[1] += sp["queries"]
+            for name, (ms, q) in per_stage.items():
+                self._stage_ms[name].append(ms)
+                self._stage_q[name].append(q)
+            self._stage_ms["total"].append(trace.total_ms or 0.0)
+            model = trace.tags.get("model")
+            if model:
+                self._model_ms[(model, "total")].append(trace.total_ms or 0.0)
+                for name in MODEL_STAGES:
+                    if name in per_stage:
+                        self._model_ms[(model, name)].append(per_stage[name][0])
+
+    def snapshot(self, recent: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            stages = {k: _summary(list(v), list(self._stage_q.get(k) or [])) for k, v in self._stage_ms.items()}
+            models: Dict[str, Dict[str, Any]] = defaultdict(dict)
+            for (model, name), v in self._model_ms.items():
+                models[model][name] = _summary(list(v))
+            ring = list(self._ring)[-recent:] if recent > 0 else []
+        return {"stages": stages, "models": dict(models), "recent": ring}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ring.clear()
+            self._stage_ms.clear()
+            self._stage_q.clear()
+            self._model_ms.clear()
+
+
+recorder = TraceRecorder()
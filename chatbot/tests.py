@@ -1,3 +1,27 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from chatbot.services.conversation.router import guess_domain, guess_intent, scan_keywords
+
+
+def _rules(text):
+    hits = scan_keywords(text)
+    return guess_intent(text, hits=hits), guess_domain(text, hits=hits)
+
+
+class RouterKeywordTests(SimpleTestCase):
+    """Dạng bỏ dấu không được làm trùng các từ khác nghĩa (ảnh/anh, mã/mà, cắt/cat, đắt/đặt, bền/bên)."""
+
+    def test_anh_is_not_anh_photo(self):
+        self.assertEqual(_rules("anh ơi tư vấn dao phay cho thép"), ("FUZZY", "tool"))
+
+    def test_ma_is_not_ma_code(self):
+        self.assertEqual(_rules("dao nào mà bền")[0], "FUZZY")
+
+    def test_cat_is_not_cat_taper(self):
+        self.assertNotEqual(_rules("cắt nhôm dùng gì")[1], "holder")
+
+    def test_dat_hang_is_chat(self):
+        self.assertEqual(_rules("em cần đặt hàng")[0], "CHAT")
+
+    def test_unaccented_input_still_matches(self):
+        self.assertEqual(_rules("mui khoan phi 10 la gi"), ("LOOKUP", "tool"))
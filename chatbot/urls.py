@@ -3,5 +3,8 @@ from . import views
 
 urlpatterns = [
     path("", views.chat_api, name="chatbot_api"),               # POST /chatbot/
+    path("async/", views.chat_api_async, name="chatbot_api_async"),  # POST /chatbot/async/ (ASGI)
+    path("stream/", views.chat_stream_api, name="chatbot_stream"),  # POST /chatbot/stream/ (SSE)
+    path("metrics/", views.chat_metrics_view, name="chatbot_metrics"),  # GET /chatbot/metrics/ (tracing)
     path("fuzzy/last/", views.fuzzy_last_view, name="fuzzy_last"),  # GET /chatbot/fuzzy/last/
 ]
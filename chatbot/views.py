@@ -2,46 +2,38 @@ import json
 import time
 import uuid
 import logging
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from .services.conversation.orchestrator import handle_message
+from .services.conversation.orchestrator import handle_message, handle_message_async
 from .services.conversation.state import get_fuzzy_last_for_debug
+from .services.conversation.traffic import log_chat_turn
+from .services.llm.admission import get_admission
+from .services.llm.cache import get_response_cache
+from .services.tracing import detach_trace, finish_trace, recorder, start_trace, tracing_enabled
+from .services.llm.client import LLMUnavailable, ollama_chat_stream
 
 logger = logging.getLogger("chatbot")
 
 
-@csrf_exempt
-def chat_api(request):
+def _parse_chat_request(request, rid: str):
     """
-    Endpoint chính cho chatbot widget
-    POST /chatbot/
-    Payload:
-      {
-        message: string,
-        model: string,
-        explain_fuzzy: 0 | 1
-      }
+    Parse + validate payload chung cho chat_api / chat_stream_api.
+    return: (message, model, explain_fuzzy, None) hoặc (None, None, None, JsonResponse lỗi)
     """
-
-    rid = uuid.uuid4().hex[:8]   # request id ngắn cho dễ đọc log
-    t0 = time.perf_counter()
-
-    logger.debug("=" * 80)
-    logger.debug(f"[{rid}] CHATBOT REQUEST START")
-
     if request.method != "POST":
         logger.warning(f"[{rid}] Invalid method: {request.method}")
-        return JsonResponse({"reply": "POST only."}, status=405)
+        return None, None, None, JsonResponse({"reply": "POST only."}, status=405)
 
     # ---------- Parse JSON ----------
     try:
         payload = json.loads(request.body or "{}")
     except Exception as e:
         logger.exception(f"[{rid}] JSON parse error")
-        return JsonResponse({"reply": "Payload JSON không hợp lệ."}, status=400)
+        return None, None, None, JsonResponse({"reply": "Payload JSON không hợp lệ."}, status=400)
 
     message = (payload.get("message") or "").strip()
     model = (payload.get("model") or "gpt-oss:120b-cloud").strip()
@@ -52,15 +44,56 @@ def chat_api(request):
 
     if not message:
         logger.warning(f"[{rid}] Empty message")
-        return JsonResponse({"reply": "Bạn chưa nhập tin nhắn."}, status=400)
+        return None, None, None, JsonResponse({"reply": "Bạn chưa nhập tin nhắn."}, status=400)
 
     if len(message) > 2000:
         logger.warning(f"[{rid}] Message too long ({len(message)} chars)")
-        return JsonResponse(
+        return None, None, None, JsonResponse(
             {"reply": "Tin nhắn quá dài, rút gọn dưới 2000 ký tự nhé."},
             status=400,
         )
 
+    return message, model, explain_fuzzy, None
+
+
+def _log_turn(rid, message, model, explain_fuzzy, ctx, dt_ms, **extra):
+    route_info = ctx.get("route") or {}
+    log_chat_turn({
+        "rid": rid,
+        "message": message,
+        "model": model,
+        "explain_fuzzy": explain_fuzzy,
+        "intent": route_info.get("intent"),
+        "domain": route_info.get("domain"),
+        "source": route_info.get("source"),
+        "dt_ms": round(dt_ms, 2),
+        **extra,
+    })
+
+
+@csrf_exempt
+def chat_api(request):
+    """
+    Endpoint chính cho chatbot widget
+    POST /chatbot/
+    Payload:
+      {
+        message: string,
+        model: string,
+        explain_fuzzy: 0 | 1
+      }
+    """
+
+    rid = uuid.uuid4().hex[:8]   # request id ngắn cho dễ đọc log
+    t0 = time.perf_counter()
+
+    logger.debug("=" * 80)
+    logger.debug(f"[{rid}] CHATBOT REQUEST START")
+
+    message, model, explain_fuzzy, error = _parse_chat_request(request, rid)
+    if error is not None:
+        return error
+
     # ---------- Context cho orchestrator ----------
     ctx = {
         "model": model,
@@ -68,12 +101,15 @@ def chat_api(request):
         "request_id": rid,   # truyền xuống để log xuyên suốt
     }
 
+    trace = start_trace(rid, model=model, path="sync")
+
     # ---------- Handle message ----------
     try:
         logger.debug(f"[{rid}] Calling orchestrator.handle_message()")
         result = handle_message(request, message, ctx)
     except Exception:
         logger.exception(f"[{rid}] ERROR in handle_message")
+        finish_trace(trace, error=True)
         return JsonResponse(
             {"reply": "Có lỗi nội bộ khi xử lý yêu cầu. Xem terminal để debug."},
             status=500,
@@ -84,6 +120,9 @@ def chat_api(request):
     # ---------- Timing ----------
     dt_ms = (time.perf_counter() - t0) * 1000.0
 
+    _log_turn(rid, message, model, explain_fuzzy, ctx, dt_ms)
+    finish_trace(trace, **(ctx.get("route") or {}))
+
     logger.debug(f"[{rid}] Reply length = {len(reply)} chars")
     logger.debug(f"[{rid}] Total time = {dt_ms:.2f} ms")
     logger.debug(f"[{rid}] CHATBOT REQUEST END")
@@ -92,6 +131,170 @@ def chat_api(request):
     return JsonResponse({"reply": reply})
 
 
+@csrf_exempt
+async def chat_api_async(request):
+    """
+    Bản async của chat_api (chạy tốt nhất dưới ASGI: uvicorn/daphne TMS_web.asgi)
+    POST /chatbot/async/   (payload + response giống /chatbot/)
+
+    Tra tool/holder song song, LLM chạy ở thread pool -> không giữ worker trong lúc chờ Ollama.
+    """
+    rid = uuid.uuid4().hex[:8]
+    t0 = time.perf_counter()
+
+    logger.debug("=" * 80)
+    logger.debug(f"[{rid}] CHATBOT ASYNC REQUEST START")
+
+    message, model, explain_fuzzy, error = _parse_chat_request(request, rid)
+    if error is not None:
+        return error
+
+    ctx = {
+        "model": model,
+        "explain_fuzzy": bool(explain_fuzzy),
+        "request_id": rid,
+    }
+
+    trace = start_trace(rid, model=model, path="async")
+
+    try:
+        result = await handle_message_async(request, message, ctx)
+    except Exception:
+        logger.exception(f"[{rid}] ERROR in handle_message_async")
+        finish_trace(trace, error=True)
+        return JsonResponse(
+            {"reply": "Có lỗi nội bộ khi xử lý yêu cầu. Xem terminal để debug."},
+            status=500,
+        )
+
+    reply = result.get("reply", "OK")
+    dt_ms = (time.perf_counter() - t0) * 1000.0
+
+    await sync_to_async(_log_turn, thread_sensitive=False)(
+        rid, message, model, explain_fuzzy, ctx, dt_ms, path="async",
+    )
+    finish_trace(trace, **(ctx.get("route") or {}))
+
+    logger.debug(f"[{rid}] Reply length = {len(reply)} chars")
+    logger.debug(f"[{rid}] CHATBOT ASYNC REQUEST END ({dt_ms:.2f} ms)")
+    return JsonResponse({"reply": reply})
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@csrf_exempt
+def chat_stream_api(request):
+    """
+    Bản stream của chat_api (Server-Sent Events)
+    POST /chatbot/stream/   (payload giống /chatbot/)
+
+    Routing + lookup/fuzzy chạy đồng bộ như cũ, chỉ phần LLM viết lại câu trả lời
+    được relay từng token về widget ngay khi Ollama sinh ra.
+    Events:
+      start   {rid}
+      token   {text}           mảnh text tiếp theo (nối vào bubble)
+      replace {reply}          thay toàn bộ bubble (reply static / LLM lỗi giữa chừng)
+      done    {ms, first_token_ms}
+    """
+    rid = uuid.uuid4().hex[:8]
+    t0 = time.perf_counter()
+
+    logger.debug("=" * 80)
+    logger.debug(f"[{rid}] CHATBOT STREAM REQUEST START")
+
+    message, model, explain_fuzzy, error = _parse_chat_request(request, rid)
+    if error is not None:
+        return error
+
+    ctx = {
+        "model": model,
+        "explain_fuzzy": bool(explain_fuzzy),
+        "request_id": rid,
+        "stream": True,   # orchestrator trả prompt thay vì tự gọi LLM
+    }
+
+    trace = start_trace(rid, model=model, path="stream")
+
+    try:
+        result = handle_message(request, message, ctx)
+    except Exception:
+        logger.exception(f"[{rid}] ERROR in handle_message")
+        finish_trace(trace, error=True)
+        return JsonResponse(
+            {"reply": "Có lỗi nội bộ khi xử lý yêu cầu. Xem terminal để debug."},
+            status=500,
+        )
+
+    fallback = result.get("reply", "OK")
+    stream = result.get("stream")
+    detach_trace(trace)   # phần LLM chạy trong generator, ghi span bằng trace.add
+
+    def events():
+        first_token_ms = None
+        streamed = []
+        yield _sse("start", {"rid": rid})
+        t_llm = time.perf_counter()
+        if stream:
+            try:
+                with get_admission().admit(stream["tag"].upper()):
+                    for chunk in ollama_chat_stream(stream["model"], stream["prompt"]):
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - t0) * 1000.0
+                            if trace:
+                                trace.add("llm.first_token", (time.perf_counter() - t_llm) * 1000.0)
+                            logger.debug(f"[{rid}] first token after {first_token_ms:.2f} ms")
+                        streamed.append(chunk)
+                        yield _sse("token", {"text": chunk})
+            except LLMUnavailable as e:
+                logger.warning(f"[{rid}] LLM stream unavailable ({e}) -> fallback static")
+                streamed = []
+            except Exception:
+                logger.exception(f"[{rid}] LLM stream failed -> fallback static")
+                streamed = []
+        full = "".join(streamed).strip()
+        if not full:
+            yield _sse("replace", {"reply": fallback})
+        elif stream.get("cache_key"):
+            get_response_cache().set(stream["cache_key"], full)
+        if trace and stream:
+            trace.add("llm.stream", (time.perf_counter() - t_llm) * 1000.0)
+
+        dt_ms = (time.perf_counter() - t0) * 1000.0
+        _log_turn(rid, message, model, explain_fuzzy, ctx, dt_ms, stream=True,
+                  first_token_ms=round(first_token_ms, 2) if first_token_ms is not None else None)
+        finish_trace(trace, **(ctx.get("route") or {}))
+        logger.debug(f"[{rid}] CHATBOT STREAM REQUEST END ({dt_ms:.2f} ms)")
+        yield _sse("done", {
+            "ms": round(dt_ms, 2),
+            "first_token_ms": round(first_token_ms, 2) if first_token_ms is not None else None,
+        })
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream; charset=utf-8")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # nginx: không buffer SSE
+    return response
+
+
+def chat_metrics_view(request):
+    """
+    GET /chatbot/metrics/?recent=20
+    p50/p95/p99 theo stage + theo model, kèm N trace gần nhất (cần CHATBOT_TRACING = True)
+    + trạng thái admission LLM (inflight, queue_depth, shed) luôn có
+    """
+    try:
+        recent = int(request.GET.get("recent", 20))
+    except ValueError:
+        recent = 20
+    data = {
+        "enabled": tracing_enabled(),
+        "admission": get_admission().snapshot(),
+        **recorder.snapshot(recent=recent),
+    }
+    return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+
+
 def fuzzy_last_view(request):
     """
     GET /chatbot/fuzzy/last/
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holder', '0005_holder_rfid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='holder',
+            index=models.Index(fields=['tu', 'ngan'], name='holder_hold_tu_86cf71_idx'),
+        ),
+    ]
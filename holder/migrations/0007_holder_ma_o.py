@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def _cell_code(tu, ngan):
+    # bản sao holder.models.cell_code tại thời điểm viết migration
+    tu_str = str(tu or "").strip().upper()
+    try:
+        ngan_num = int(str(ngan or "").strip())
+    except ValueError:
+        return ""
+    return f"{tu_str[0]}{ngan_num}" if tu_str else ""
+
+
+def fill_ma_o(apps, schema_editor):
+    Holder = apps.get_model("holder", "Holder")
+    batch = []
+    for h in Holder.objects.only("id", "tu", "ngan").iterator(chunk_size=1000):
+        h.ma_o = _cell_code(h.tu, h.ngan)
+        if h.ma_o:
+            batch.append(h)
+        if len(batch) >= 1000:
+            Holder.objects.bulk_update(batch, ["ma_o"])
+            batch = []
+    if batch:
+        Holder.objects.bulk_update(batch, ["ma_o"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holder', '0006_holder_tu_ngan_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='holder',
+            name='ma_o',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=10),
+        ),
+        migrations.RunPython(fill_ma_o, migrations.RunPython.noop),
+        # (tu, ngan) không tra được "ngan" dạng text ("3" / "03") -> thay bằng index ma_o
+        migrations.RemoveIndex(
+            model_name='holder',
+            name='holder_hold_tu_86cf71_idx',
+        ),
+    ]
@@ -1,5 +1,17 @@
 from django.db import models
 from django.core.validators import RegexValidator
+
+
+def cell_code(tu, ngan) -> str:
+    """ ("b", " 03") -> "B3"; thiếu / sai định dạng -> "" (cùng quy tắc build_code của sơ đồ tủ) """
+    tu_str = str(tu or "").strip().upper()
+    try:
+        ngan_num = int(str(ngan or "").strip())
+    except ValueError:
+        return ""
+    return f"{tu_str[0]}{ngan_num}" if tu_str else ""
+
+
 class Holder(models.Model):
     # THÔNG TIN CHUNG
     ten_thiet_bi = models.CharField(max_length=200)
@@ -51,6 +63,8 @@ class Holder(models.Model):
 
     tu = models.CharField(max_length=50, blank=True, null=True)
     ngan = models.CharField(max_length=50, blank=True, null=True)
+    # mã ô đã chuẩn hoá từ tu/ngan (vd "B3"), tự điền trong save() -> tra "ô B3 có gì" bằng 1 index
+    ma_o = models.CharField(max_length=10, blank=True, default="", db_index=True, editable=False)
     may_uu_tien = models.CharField(max_length=200, blank=True, null=True)
 
     ngay_nhap_kho = models.DateField(blank=True, null=True)
@@ -93,6 +107,16 @@ class Holder(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # đổi tên / thông số / vị trí qua save đầy đủ -> signature index tìm kiếm + kNN đổi theo
+    # (save(update_fields=["trang_thai_tai_san"]) của mqtt_worker không đụng tới)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.ma_noi_bo} - {self.ten_thiet_bi}"
+
+    def save(self, *args, **kwargs):
+        self.ma_o = cell_code(self.tu, self.ngan)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"tu", "ngan"}.intersection(update_fields):
+            kwargs["update_fields"] = {*update_fields, "ma_o"}
+        super().save(*args, **kwargs)
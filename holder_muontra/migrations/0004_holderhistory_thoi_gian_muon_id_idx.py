@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('holder_muontra', '0003_holderhistory_ly_do_fail_holderhistory_tx_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='holderhistory',
+            index=models.Index(fields=['thoi_gian_muon', 'id'], name='holder_muon_thoi_gi_f6e564_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from holder.models import Holder
+from lookup.services.shared.history_search import build_search_text
 
 
 class HolderHistory(models.Model):
@@ -123,10 +124,17 @@ class HolderHistory(models.Model):
         verbose_name="Cập nhật lúc",
     )
 
+    # chuỗi tìm kiếm đã bỏ dấu: snapshot mã + tên holder, dự án, mô tả
+    # (FTS5 trigram trên SQLite, xem lookup/services/shared/history_search.py)
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     class Meta:
         verbose_name = "Lịch sử mượn holder"
         verbose_name_plural = "Lịch sử mượn holder"
         ordering = ["-thoi_gian_muon"]
+        indexes = [
+            models.Index(fields=["thoi_gian_muon", "id"]),   # keyset lịch sử (history_holder)
+        ]
 
     def __str__(self):
         return f"{self.holder.ma_noi_bo} - {self.get_muc_dich_display()} - {self.trang_thai}"
@@ -148,4 +156,13 @@ class HolderHistory(models.Model):
                 else:
                     self.mon_truoc = 100
 
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"ma_noi_bo_snapshot", "ten_thiet_bi_snapshot", "du_an", "mo_ta"}.intersection(update_fields):
+            self.search_text = build_search_text(*self.search_parts())
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_text"}
+
         super().save(*args, **kwargs)
+
+    def search_parts(self):
+        return (self.ma_noi_bo_snapshot, self.ten_thiet_bi_snapshot, self.du_an, self.mo_ta)
@@ -5,6 +5,7 @@ app_name = "holder_muontra"
 
 urlpatterns = [
     path("history/", views.history_holder, name="history_holder"),
+    path("history/export/", views.export_holder_history, name="export_holder_history"),   # CSV stream
     path("borrow/<int:holder_id>/", views.borrow_for_holder, name="borrow_for_holder"),
     path("return/<int:holder_id>/", views.return_for_holder, name="return_for_holder"),
     path("api/borrow-tx/<int:tx_id>/", api_check_borrow_tx, name="api_check_borrow_tx"),
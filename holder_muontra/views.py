@@ -5,11 +5,14 @@ from __future__ import annotations
 import random
 
 from django.contrib import messages
-from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
 from iot_gateway.mqtt import send_holder_borrow, send_holder_return
 from holder.models import Holder
+from lookup.services.shared.csv_export import EXPORT_CHUNK_SIZE, date_range, fmt_dt, stream_csv
+from lookup.services.shared.history_search import filter_search
+from lookup.services.shared.keyset import keyset_page, page_url
 from .models import HolderHistory
 
 # ===================== CONFIG =====================
@@ -19,6 +22,15 @@ DEBUG_RFID = True  # bật log để soi RFID
 HOLDER_FREE = "san_sang"
 HOLDER_BUSY = "dang_duoc_muon"
 
+HISTORY_PER_PAGE = 100
+
+# chỉ các cột holder_history.html hiển thị
+HISTORY_FIELDS = (
+    "ma_noi_bo_snapshot", "ten_thiet_bi_snapshot", "muc_dich", "du_an",
+    "thoi_gian_muon", "thoi_gian_tra", "thoi_luong_phut", "mon_truoc", "mon_sau", "trang_thai",
+    "holder__ma_noi_bo", "holder__ten_thiet_bi", "nguoi_thuc_hien__username",
+)
+
 # Nếu UserProfile của bạn nằm ở app khác, sửa import này cho đúng.
 # Ví dụ: from accounts.models import UserProfile
 try:
@@ -86,18 +98,16 @@ def history_holder(request):
     muc_dich = request.GET.get("muc_dich", "")
     trang_thai = request.GET.get("trang_thai", "")
 
+    # phân trang keyset trên (thoi_gian_muon, id): ?cursor=...
     histories = (
         HolderHistory.objects
         .select_related("holder", "nguoi_thuc_hien")
-        .order_by("-thoi_gian_muon")
+        .only(*HISTORY_FIELDS)
     )
 
     if q:
-        histories = histories.filter(
-            Q(holder__ma_noi_bo__icontains=q)
-            | Q(holder__ten_thiet_bi__icontains=q)
-            | Q(du_an__icontains=q)
-        )
+        # search_text (snapshot mã / tên holder, dự án, mô tả) qua FTS5 trigram, không JOIN holder
+        histories = filter_search(histories, q)
 
     if muc_dich:
         histories = histories.filter(muc_dich=muc_dich)
@@ -105,8 +115,12 @@ def history_holder(request):
     if trang_thai:
         histories = histories.filter(trang_thai=trang_thai)
 
+    page = keyset_page(histories, "thoi_gian_muon", request.GET.get("cursor"), HISTORY_PER_PAGE)
+
     return render(request, "holder_history.html", {
-        "histories": histories,
+        "histories": page.rows,
+        "next_url": page_url(request, page.next_cursor) if page.has_next else None,
+        "first_url": None if page.is_first else page_url(request, None),
         "q": q,
         "muc_dich": muc_dich,
         "trang_thai": trang_thai,
@@ -115,6 +129,52 @@ def history_holder(request):
     })
 
 
+EXPORT_HEADER = [
+    "ID", "Mã nội bộ", "Tên thiết bị", "Mục đích", "Dự án", "Mô tả", "Thời gian mượn", "Thời gian trả",
+    "Thời lượng (phút)", "Độ bền trước (%)", "Độ bền sau (%)", "Trạng thái", "Người thực hiện", "Lý do fail", "TX ID",
+]
+EXPORT_FIELDS = (
+    "id", "ma_noi_bo_snapshot", "ten_thiet_bi_snapshot", "muc_dich", "du_an", "mo_ta", "thoi_gian_muon", "thoi_gian_tra",
+    "thoi_luong_phut", "mon_truoc", "mon_sau", "trang_thai", "nguoi_thuc_hien__username", "ly_do_fail", "tx_id",
+)
+
+
+def export_holder_history(request):
+    """
+    GET /holder_muontra/history/export/ -> CSV (stream)
+    Lọc: tu_ngay / den_ngay (theo thời gian mượn), muc_dich, trang_thai, du_an, q (như trang lịch sử).
+    """
+    qs = HolderHistory.objects.all()
+
+    start, end = date_range(request)
+    if start:
+        qs = qs.filter(thoi_gian_muon__gte=start)
+    if end:
+        qs = qs.filter(thoi_gian_muon__lt=end)
+
+    for param in ("muc_dich", "trang_thai", "du_an"):
+        value = request.GET.get(param, "").strip()
+        if value:
+            qs = qs.filter(**{param: value})
+    q = request.GET.get("q", "").strip()
+    if q:
+        qs = filter_search(qs, q)
+
+    muc_dich_label = dict(HolderHistory.MUC_DICH_CHOICES)
+    trang_thai_label = dict(HolderHistory.TRANG_THAI_CHOICES)
+    rows = (
+        (
+            pk, ma, ten, muc_dich_label.get(muc_dich, muc_dich), du_an, mo_ta, fmt_dt(muon), fmt_dt(tra),
+            phut, mon_truoc, mon_sau, trang_thai_label.get(trang_thai, trang_thai), *rest,
+        )
+        for pk, ma, ten, muc_dich, du_an, mo_ta, muon, tra, phut, mon_truoc, mon_sau, trang_thai, *rest in (
+            qs.order_by("thoi_gian_muon", "id").values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+    )
+    filename = f"lich_su_holder_{timezone.localdate():%Y%m%d}.csv"
+    return stream_csv(filename, EXPORT_HEADER, rows)
+
+
 # ======================================================
 #  MƯỢN HOLDER
 # ======================================================
@@ -12,7 +12,11 @@ from holder.models import Holder
 from holder_muontra.models import HolderHistory
 
 from tool.models import Tool
+from tool.services.low_stock import evaluate as evaluate_low_stock
 from tool_muontra.models import ToolTransaction
+from tool_muontra.services import stock_ledger, usage_rollup
+
+from khocongcu.services.locker_cells import adjust_tool_qty, move_holder_status
 
 from iot_gateway.mqtt import MQTT_SERVER, MQTT_PORT, TOPIC_UP
 
@@ -123,9 +127,11 @@ class Command(BaseCommand):
 
             holder: Holder = h.holder
 
-            # 1) cập nhật holder trạng thái đang được mượn
+            # 1) cập nhật holder trạng thái đang được mượn (+ tồn theo ô tủ)
+            trang_thai_cu = holder.trang_thai_tai_san
             holder.trang_thai_tai_san = "dang_duoc_muon"
             holder.save(update_fields=["trang_thai_tai_san"])
+            move_holder_status(holder, trang_thai_cu, holder.trang_thai_tai_san)
 
             # 2) cập nhật phiếu mượn
             h.trang_thai = "DANG_MUON"
@@ -190,9 +196,11 @@ class Command(BaseCommand):
             if mon_nhap_tay is not None:
                 holder.mon = mon_nhap_tay
 
-            # ✅ cập nhật trạng thái holder về "sẵn sàng"
+            # ✅ cập nhật trạng thái holder về "sẵn sàng" (+ tồn theo ô tủ)
+            trang_thai_cu = holder.trang_thai_tai_san
             holder.trang_thai_tai_san = "san_sang"
             holder.save(update_fields=["mon", "trang_thai_tai_san"])
+            move_holder_status(holder, trang_thai_cu, holder.trang_thai_tai_san)
 
             # ====== đóng phiếu mượn ======
             history_borrow.thoi_gian_tra = thoi_gian_tra
@@ -267,6 +275,8 @@ class Command(BaseCommand):
 
             tool.ton_kho = ton_sau
             tool.save(update_fields=["ton_kho"])
+            adjust_tool_qty(tool, ton_sau - ton_truoc)
+            evaluate_low_stock(tool)   # mở / đóng cảnh báo tồn thấp (sự kiện gửi sau commit)
 
             tx.ton_truoc = tx.ton_truoc if tx.ton_truoc is not None else ton_truoc
             tx.ton_sau = ton_sau
@@ -274,4 +284,8 @@ class Command(BaseCommand):
             tx.ly_do_fail = ""
             tx.save(update_fields=["ton_truoc", "ton_sau", "trang_thai", "ly_do_fail"])
 
+            # sổ cái tồn kho (chỉ ghi thêm) + rollup tiêu hao theo ngày, cùng transaction với cập nhật ton_kho
+            stock_ledger.record_transaction(tx, ton_truoc, ton_sau)
+            usage_rollup.record_transaction(tx)
+
             logger.info(f"[TOOL OK] tx={tx_id} {tx.loai} ton {ton_truoc} -> {ton_sau}")
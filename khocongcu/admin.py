@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import LockerCell
+
+
+@admin.register(LockerCell)
+class LockerCellAdmin(admin.ModelAdmin):
+    list_display = ("locker", "cell", "tool_count", "tool_qty", "holder_count", "holder_ready", "holder_on_loan", "updated_at")
+    list_filter = ("locker",)
+    ordering = ("locker", "cell")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KhocongcuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'khocongcu'
+
+    def ready(self):
+        # ghi LockerChange khi Tool / Holder đổi -> sơ đồ tủ vá incremental
+        from . import signals  # noqa: F401
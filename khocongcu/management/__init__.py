@@ -0,0 +1,2 @@
+# khocongcu/management/__init__.py
+# Để Django nhận đây là package Python
@@ -0,0 +1,2 @@
+# khocongcu/management/commands/__init__.py
+# Để Django load được các lệnh custom (rebuild_locker_cells)
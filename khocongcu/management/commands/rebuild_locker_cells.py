@@ -0,0 +1,15 @@
+# khocongcu/management/commands/rebuild_locker_cells.py
+
+from django.core.management.base import BaseCommand
+
+from khocongcu.services.locker_cells import occupancy, rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Đếm lại bảng LockerCell (tồn theo ô tủ) từ Tool / Holder. Chạy sau migrate hoặc khi nghi lệch số."
+
+    def handle(self, *args, **options):
+        n = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"[LOCKER] {n} ô đã đếm lại"))
+        for locker, o in occupancy().items():
+            self.stdout.write(f"  Tủ {locker}: {o['used']}/{o['cells']} ô có đồ ({o['rate']})")
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='LockerChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tool', 'Tool'), ('holder', 'Holder')], max_length=10)),
+                ('obj_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Thay đổi sơ đồ tủ',
+                'verbose_name_plural': 'Thay đổi sơ đồ tủ',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('khocongcu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LockerCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('locker', models.CharField(max_length=1, verbose_name='Tủ')),
+                ('cell', models.PositiveSmallIntegerField(verbose_name='Ngăn')),
+                ('tool_count', models.PositiveIntegerField(default=0, verbose_name='Số loại tool')),
+                ('tool_qty', models.PositiveIntegerField(default=0, verbose_name='Tổng tồn tool')),
+                ('holder_count', models.PositiveIntegerField(default=0, verbose_name='Số holder')),
+                ('holder_ready', models.PositiveIntegerField(default=0, verbose_name='Holder sẵn sàng')),
+                ('holder_on_loan', models.PositiveIntegerField(default=0, verbose_name='Holder đang mượn')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ô tủ',
+                'verbose_name_plural': 'Ô tủ',
+                'ordering': ['locker', 'cell'],
+                'constraints': [models.UniqueConstraint(fields=('locker', 'cell'), name='uniq_locker_cell')],
+            },
+        ),
+    ]
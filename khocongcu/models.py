@@ -1,3 +1,75 @@
 from django.db import models
 
-# Create your models here.
+
+class LockerChange(models.Model):
+    """
+    Change-log tối giản cho sơ đồ tủ (khocongcu/services/locker_map.py).
+
+    Mỗi lần Tool / Holder được lưu hoặc xoá -> 1 dòng (kind, obj_id).
+    Map đang cache trong từng process chỉ cần đọc các dòng id > id đã áp dụng
+    để vá đúng những ô thay đổi, kể cả khi thay đổi đến từ process khác (mqtt_worker).
+    """
+
+    KIND_TOOL = "tool"
+    KIND_HOLDER = "holder"
+    KIND_CHOICES = [
+        (KIND_TOOL, "Tool"),
+        (KIND_HOLDER, "Holder"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    obj_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Thay đổi sơ đồ tủ"
+        verbose_name_plural = "Thay đổi sơ đồ tủ"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind}:{self.obj_id}"
+
+
+class LockerCell(models.Model):
+    """
+    Tồn theo ô tủ (denormalized), 1 dòng / (locker, cell) — vd ("B", 3) = ô B3.
+
+    Tool (tu CharField + ngan số) và Holder (tu / ngan đều CharField) được chuẩn hoá về cùng khoá
+    (khocongcu/services/locker_cells.py::cell_key). "Ô B3 có gì", tìm ô trống, tỉ lệ lấp đầy
+    -> đọc bảng này thay vì quét toàn bộ Tool / Holder.
+
+    Cập nhật:
+      - mqtt_worker: cộng / trừ trong cùng transaction.atomic khi mượn / trả / xuất nhập thành công
+      - signals: Tool / Holder tạo / xoá / đổi vị trí (admin, form) -> đếm lại ô cũ + ô mới
+      - rebuild_locker_cells: đếm lại toàn bộ
+    """
+
+    locker = models.CharField(max_length=1, verbose_name="Tủ")
+    cell = models.PositiveSmallIntegerField(verbose_name="Ngăn")
+
+    tool_count = models.PositiveIntegerField(default=0, verbose_name="Số loại tool")
+    tool_qty = models.PositiveIntegerField(default=0, verbose_name="Tổng tồn tool")
+    holder_count = models.PositiveIntegerField(default=0, verbose_name="Số holder")
+    holder_ready = models.PositiveIntegerField(default=0, verbose_name="Holder sẵn sàng")
+    holder_on_loan = models.PositiveIntegerField(default=0, verbose_name="Holder đang mượn")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ô tủ"
+        verbose_name_plural = "Ô tủ"
+        ordering = ["locker", "cell"]
+        constraints = [
+            models.UniqueConstraint(fields=["locker", "cell"], name="uniq_locker_cell"),
+        ]
+
+    @property
+    def code(self) -> str:
+        return f"{self.locker}{self.cell}"
+
+    @property
+    def is_free(self) -> bool:
+        return self.tool_count == 0 and self.holder_count == 0
+
+    def __str__(self):
+        return f"{self.code} (tool {self.tool_count}/{self.tool_qty}, holder {self.holder_count})"
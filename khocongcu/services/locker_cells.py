@@ -0,0 +1,184 @@
+"""
+Bảng tồn theo ô tủ (LockerCell): chuẩn hoá vị trí, đếm lại, cộng / trừ delta, truy vấn.
+
+Khoá ô = (locker, cell), vd ("B", 3). Tool.tu/ngan (CharField + số) và Holder.tu/ngan (CharField,
+mã ô chuẩn hoá lưu sẵn ở Holder.ma_o để tra bằng index)
+đều đi qua cell_key() -> cùng 1 quy tắc với build_code() của sơ đồ tủ.
+
+- mqtt_worker (trong transaction.atomic của nó): adjust_tool_qty / move_holder_status
+  -> 1 UPDATE ... SET x = x + d theo unique (locker, cell)
+- signals: tạo / xoá / đổi vị trí -> recount_cells(ô cũ, ô mới)
+- rebuild_all(): đếm lại toàn bộ (command rebuild_locker_cells)
+
+Settings:
+  KHO_LOCKERS  {"A": 9, "B": 9, "C": 9}  tủ -> số ngăn (dùng cho lưới ô, ô trống, tỉ lệ lấp đầy)
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from holder.models import Holder
+from tool.models import Tool
+
+from ..models import LockerCell
+from .locker_map import build_code
+
+CellKey = Tuple[str, int]
+
+DEFAULT_LOCKERS = {"A": 9, "B": 9, "C": 9}
+
+# trạng thái holder -> cột đếm (trạng thái khác chỉ tính vào holder_count)
+HOLDER_STATUS_FIELD = {
+    "san_sang": "holder_ready",
+    "dang_duoc_muon": "holder_on_loan",
+}
+
+COUNT_FIELDS = ("tool_count", "tool_qty", "holder_count", "holder_ready", "holder_on_loan")
+
+
+def lockers() -> Dict[str, int]:
+    return getattr(settings, "KHO_LOCKERS", DEFAULT_LOCKERS)
+
+
+def grid() -> List[CellKey]:
+    return [(locker, i) for locker, n in sorted(lockers().items()) for i in range(1, n + 1)]
+
+
+def cell_key(tu, ngan) -> Optional[CellKey]:
+    code = build_code(tu, ngan)
+    if not code:
+        return None
+    try:
+        return code[0], int(code[1:])
+    except ValueError:
+        return None
+
+
+def parse_code(code: str) -> Optional[CellKey]:
+    """ "b3" / "B03" / "B 3" -> ("B", 3) """
+    code = (code or "").strip()
+    return cell_key(code[:1], code[1:]) if len(code) >= 2 else None
+
+
+# ===================== Đọc object trong 1 ô (index) =====================
+def tools_in(key: CellKey):
+    locker, cell = key
+    return Tool.objects.filter(tu__in=[locker, locker.lower()], ngan=cell)
+
+
+def holders_in(key: CellKey):
+    # Holder.ngan là text ("3", "03", ...) -> tra theo mã ô đã chuẩn hoá Holder.ma_o (index)
+    return Holder.objects.filter(ma_o=f"{key[0]}{key[1]}")
+
+
+# ===================== Đếm lại =====================
+def _count(tools: Iterable[Tuple[int]], holders: Iterable[str]) -> Dict[str, int]:
+    counts = dict.fromkeys(COUNT_FIELDS, 0)
+    for (qty,) in tools:
+        counts["tool_count"] += 1
+        counts["tool_qty"] += qty or 0
+    for status in holders:
+        counts["holder_count"] += 1
+        field = HOLDER_STATUS_FIELD.get(status)
+        if field:
+            counts[field] += 1
+    return counts
+
+
+def recount_cells(keys: Iterable[Optional[CellKey]]) -> None:
+    for key in sorted({k for k in keys if k}):
+        counts = _count(
+            tools_in(key).values_list("ton_kho"),
+            holders_in(key).values_list("trang_thai_tai_san", flat=True),
+        )
+        LockerCell.objects.update_or_create(locker=key[0], cell=key[1], defaults=counts)
+
+
+def rebuild_all() -> int:
+    """Đếm lại mọi ô (2 lượt quét Tool / Holder), tạo đủ lưới ô theo KHO_LOCKERS. return số ô."""
+    tools = defaultdict(list)
+    for tu, ngan, qty in Tool.objects.values_list("tu", "ngan", "ton_kho").iterator(chunk_size=2000):
+        key = cell_key(tu, ngan)
+        if key:
+            tools[key].append((qty,))
+    holders = defaultdict(list)
+    for tu, ngan, status in Holder.objects.values_list("tu", "ngan", "trang_thai_tai_san").iterator(chunk_size=2000):
+        key = cell_key(tu, ngan)
+        if key:
+            holders[key].append(status)
+
+    keys = set(grid()) | set(tools) | set(holders)
+    now = timezone.now()
+    rows = [
+        LockerCell(locker=k[0], cell=k[1], updated_at=now, **_count(tools.get(k, ()), holders.get(k, ())))
+        for k in sorted(keys)
+    ]
+    with transaction.atomic():
+        # ô ngoài lưới không còn object nào -> xoá
+        stale = [pk for pk, locker, cell in LockerCell.objects.values_list("id", "locker", "cell")
+                 if (locker, cell) not in keys]
+        if stale:
+            LockerCell.objects.filter(id__in=stale).delete()
+        LockerCell.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["locker", "cell"],
+            update_fields=[*COUNT_FIELDS, "updated_at"],
+        )
+    return len(rows)
+
+
+# ===================== Delta từ mqtt_worker =====================
+def _adjust(key: Optional[CellKey], **deltas: int) -> None:
+    if not key:
+        return
+    deltas = {f: d for f, d in deltas.items() if d}
+    if not deltas:
+        return
+    updated = LockerCell.objects.filter(locker=key[0], cell=key[1]).update(
+        updated_at=timezone.now(), **{f: F(f) + d for f, d in deltas.items()}
+    )
+    if not updated:
+        # ô chưa có dòng (chưa chạy rebuild_locker_cells) -> đếm thẳng từ dữ liệu đã lưu
+        recount_cells([key])
+
+
+def adjust_tool_qty(tool: Tool, delta: int) -> None:
+    """Gọi sau tool.save(update_fields=["ton_kho"]) trong cùng transaction."""
+    _adjust(cell_key(tool.tu, tool.ngan), tool_qty=delta)
+
+
+def move_holder_status(holder: Holder, old_status: str, new_status: str) -> None:
+    """Gọi sau holder.save(update_fields=[..., "trang_thai_tai_san"]) trong cùng transaction."""
+    if old_status == new_status:
+        return
+    deltas: Dict[str, int] = defaultdict(int)
+    if old_status in HOLDER_STATUS_FIELD:
+        deltas[HOLDER_STATUS_FIELD[old_status]] -= 1
+    if new_status in HOLDER_STATUS_FIELD:
+        deltas[HOLDER_STATUS_FIELD[new_status]] += 1
+    _adjust(cell_key(holder.tu, holder.ngan), **deltas)
+
+
+# ===================== Truy vấn =====================
+def free_cells(locker: Optional[str] = None):
+    qs = LockerCell.objects.filter(tool_count=0, holder_count=0)
+    if locker:
+        qs = qs.filter(locker=locker.upper())
+    return qs
+
+
+def occupancy() -> Dict[str, Dict[str, object]]:
+    """{tủ: {cells, used, rate}}; số ngăn lấy từ KHO_LOCKERS (ô chưa có dòng = trống)."""
+    used = defaultdict(int)
+    for locker, tool_count, holder_count in LockerCell.objects.values_list("locker", "tool_count", "holder_count"):
+        if tool_count or holder_count:
+            used[locker] += 1
+    out = {}
+    for locker, n in sorted(lockers().items()):
+        out[locker] = {"cells": n, "used": used[locker], "rate": round(used[locker] / n, 4) if n else None}
+    return out
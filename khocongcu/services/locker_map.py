@@ -0,0 +1,263 @@
+"""
+Sơ đồ tủ (kho_cong_cu_view): {mã ô: item | {"items": [...]}} build sẵn, cache trong process,
+vá từng ô khi Tool / Holder đổi (tồn kho, vị trí tu/ngan, trạng thái holder, tên).
+
+- Build: values() chỉ lấy cột cần, URL dựng từ 1 lần reverse() / loại
+- Vá: đọc LockerChange id > version (1 query nhỏ / lượt xem), load lại đúng các object đó
+- JSON: cache fragment theo ô -> chỉ serialize lại ô bị đổi
+- Vá / đọc / render đều trong _lock: view chỉ nhận kết quả đã dựng (get_locker_snapshot), không giữ map
+- Build lại toàn bộ khi quá nhiều thay đổi dồn lại hoặc map quá cũ (log cũ được dọn lúc đó)
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+
+from holder.models import Holder
+from tool.models import Tool
+
+from ..models import LockerChange
+
+TOOL_MAP_VALUES = ("id", "ten_tool", "ton_kho", "tu", "ngan")
+HOLDER_MAP_VALUES = ("id", "ten_thiet_bi", "trang_thai_tai_san", "tu", "ngan")
+
+# trạng thái holder -> màu ô (template: ok / loan / error)
+HOLDER_STATUS = {
+    "san_sang": "ok",
+    "dang_duoc_muon": "loan",
+    "dang_bao_tri": "error",
+    "ngung_su_dung": "error",
+}
+
+MAX_PATCH = 500                      # dồn quá nhiều thay đổi -> build lại cho nhanh
+REBUILD_EVERY = 3600                 # giây; build lại định kỳ cho chắc
+CHANGE_LOG_RETENTION = timedelta(days=1)
+DELTA_HISTORY = 1000                 # số lần vá nhớ lại để trả delta ?since=
+
+_URL_SENTINEL = 987654321
+
+Key = Tuple[str, int]
+
+
+def build_code(tu, ngan):
+    """
+    Chuẩn hóa về dạng A1..A9, B1..B9, C1..C9
+    """
+    if not tu or not ngan:
+        return None
+
+    tu_str = str(tu).strip().upper()
+    tu_char = tu_str[0]          # A / B / C
+
+    ngan_str = str(ngan).strip()
+    try:
+        ngan_num = int(ngan_str)  # tự bỏ 0 ở đầu
+    except ValueError:
+        return None
+
+    return f"{tu_char}{ngan_num}"  # vd: "A1"
+
+
+def _url_format(name: str) -> str:
+    return reverse(name, args=[_URL_SENTINEL]).replace(str(_URL_SENTINEL), "{}")
+
+
+def tool_item(row: Dict[str, Any], url_fmt: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    qty = row["ton_kho"] or 0
+    return build_code(row["tu"], row["ngan"]), {
+        "label": f"Tool: {row['ten_tool']}",
+        "name": row["ten_tool"],
+        "status": "ok" if qty > 0 else "error",
+        "qty": qty,
+        "url": url_fmt.format(row["id"]),
+    }
+
+
+def holder_item(row: Dict[str, Any], url_fmt: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    return build_code(row["tu"], row["ngan"]), {
+        "label": f"Holder: {row['ten_thiet_bi']}",
+        "name": row["ten_thiet_bi"],
+        "status": HOLDER_STATUS.get(row["trang_thai_tai_san"], "ok"),
+        "qty": "",
+        "url": url_fmt.format(row["id"]),
+    }
+
+
+class LockerMap:
+    def __init__(self):
+        self.version = 0                 # id LockerChange cuối cùng đã áp dụng
+        self.built_at = time.time()
+        # delta feed: [(version sau lần vá, các ô đổi)]; since < floor -> client phải lấy full
+        self.history: deque = deque(maxlen=DELTA_HISTORY)
+        self.history_floor = 0
+        self.placed: Dict[Key, str] = {}                  # (kind, id) -> mã ô
+        self.cells: Dict[str, Dict[Key, Dict[str, Any]]] = {}
+        self._cell_json: Dict[str, str] = {}
+        self._json: Optional[str] = None
+        self._urls = {
+            LockerChange.KIND_TOOL: _url_format("tool:tool_profile"),
+            LockerChange.KIND_HOLDER: _url_format("holder:holder_detail"),
+        }
+
+    # ---------- build / patch ----------
+    @classmethod
+    def build(cls) -> "LockerMap":
+        m = cls()
+        # lấy version TRƯỚC khi đọc dữ liệu: thay đổi chen giữa sẽ được vá lại lần sau (idempotent)
+        m.version = m.history_floor = LockerChange.objects.aggregate(v=Max("id"))["v"] or 0
+        for row in Tool.objects.values(*TOOL_MAP_VALUES):
+            m._put(LockerChange.KIND_TOOL, row)
+        for row in Holder.objects.values(*HOLDER_MAP_VALUES):
+            m._put(LockerChange.KIND_HOLDER, row)
+        return m
+
+    def apply(self, changes: Iterable[Tuple[int, str, int]]) -> List[str]:
+        """changes: [(change_id, kind, obj_id)] -> list mã ô bị đổi"""
+        ids: Dict[str, set] = {LockerChange.KIND_TOOL: set(), LockerChange.KIND_HOLDER: set()}
+        for change_id, kind, obj_id in changes:
+            ids.setdefault(kind, set()).add(obj_id)
+            self.version = max(self.version, change_id)
+
+        touched = set()
+        sources = {
+            LockerChange.KIND_TOOL: (Tool, TOOL_MAP_VALUES),
+            LockerChange.KIND_HOLDER: (Holder, HOLDER_MAP_VALUES),
+        }
+        for kind, obj_ids in ids.items():
+            if not obj_ids or kind not in sources:
+                continue
+            model, fields = sources[kind]
+            rows = {r["id"]: r for r in model.objects.filter(id__in=obj_ids).values(*fields)}
+            for obj_id in obj_ids:
+                touched.update(self._remove((kind, obj_id)))
+                if obj_id in rows:
+                    touched.update(self._put(kind, rows[obj_id]))
+
+        if len(self.history) == self.history.maxlen:
+            self.history_floor = self.history[0][0]
+        self.history.append((self.version, touched))
+        return sorted(touched)
+
+    def changed_since(self, since: int) -> Optional[List[str]]:
+        """Các ô đổi sau version `since`; None nếu không còn đủ lịch sử (-> gửi full)."""
+        if since < self.history_floor or since > self.version:
+            return None
+        codes = set()
+        for version, touched in reversed(self.history):
+            if version <= since:
+                break
+            codes.update(touched)
+        return sorted(codes)
+
+    def _put(self, kind: str, row: Dict[str, Any]) -> List[str]:
+        fn = tool_item if kind == LockerChange.KIND_TOOL else holder_item
+        code, item = fn(row, self._urls[kind])
+        if not code:
+            return []
+        key = (kind, row["id"])
+        self.placed[key] = code
+        self.cells.setdefault(code, {})[key] = item
+        self._dirty(code)
+        return [code]
+
+    def _remove(self, key: Key) -> List[str]:
+        code = self.placed.pop(key, None)
+        if code is None:
+            return []
+        cell = self.cells.get(code, {})
+        cell.pop(key, None)
+        if not cell:
+            self.cells.pop(code, None)
+        self._dirty(code)
+        return [code]
+
+    def _dirty(self, code: str) -> None:
+        self._cell_json.pop(code, None)
+        self._json = None
+
+    # ---------- output ----------
+    def cell(self, code: str) -> Optional[Dict[str, Any]]:
+        """Format template: 1 item -> giữ dạng cũ, nhiều item -> {"items": [...]} (nhánh dual của JS)."""
+        cell = self.cells.get(code)
+        if not cell:
+            return None
+        # tool trước holder, theo tên (như thứ tự cũ của view)
+        lst = [item for _, item in sorted(cell.items(), key=lambda kv: (kv[0][0] != "tool", kv[1]["name"] or ""))]
+        return lst[0] if len(lst) == 1 else {"items": lst}
+
+    def items(self) -> Dict[str, Any]:
+        return {code: self.cell(code) for code in sorted(self.cells)}
+
+    def items_json(self) -> str:
+        if self._json is None:
+            parts = []
+            for code in sorted(self.cells):
+                frag = self._cell_json.get(code)
+                if frag is None:
+                    frag = self._cell_json[code] = json.dumps(self.cell(code))
+                parts.append(f"{json.dumps(code)}: {frag}")
+            self._json = "{" + ", ".join(parts) + "}"
+        return self._json
+
+
+# ===================== Cache trong process =====================
+_lock = threading.Lock()
+_map: Optional[LockerMap] = None
+
+
+def _rebuild() -> LockerMap:
+    global _map
+    LockerChange.objects.filter(created_at__lt=timezone.now() - CHANGE_LOG_RETENTION).delete()
+    _map = LockerMap.build()
+    return _map
+
+
+def _current() -> LockerMap:
+    """Map hiện tại, đã vá tới LockerChange mới nhất (1 query nếu không có gì đổi). Gọi khi đang giữ _lock."""
+    if _map is None or time.time() - _map.built_at > REBUILD_EVERY:
+        return _rebuild()
+    changes = list(
+        LockerChange.objects.filter(id__gt=_map.version)
+        .order_by("id")
+        .values_list("id", "kind", "obj_id")[:MAX_PATCH + 1]
+    )
+    if len(changes) > MAX_PATCH:
+        return _rebuild()
+    if changes:
+        _map.apply(changes)
+    return _map
+
+
+def get_locker_snapshot() -> Tuple[int, str]:
+    """
+    (version, items_json) đọc cùng lúc trong _lock: view không giữ LockerMap (đang bị thread khác vá)
+    và version luôn khớp dữ liệu trả về.
+    """
+    with _lock:
+        m = _current()
+        return m.version, m.items_json()
+
+
+def delta(since: Optional[int]) -> Dict[str, Any]:
+    """
+    Payload /kho/delta/ dựng trọn trong _lock (version, history, cells cùng 1 thời điểm):
+      {version, full: false, cells: {mã ô: item | None}}; since thiếu / quá cũ -> full: true, toàn bộ map.
+    """
+    with _lock:
+        m = _current()
+        codes = m.changed_since(since) if since is not None else None
+        if codes is None:
+            return {"version": m.version, "full": True, "cells": m.items()}
+        return {"version": m.version, "full": False, "cells": {code: m.cell(code) for code in codes}}
+
+
+def reset_locker_map() -> None:
+    global _map
+    with _lock:
+        _map = None
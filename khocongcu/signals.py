@@ -0,0 +1,76 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from holder.models import Holder
+from tool.models import Tool
+
+from .models import LockerChange
+from .services.locker_cells import cell_key, recount_cells
+
+# field hiển thị trên sơ đồ tủ; save(update_fields=...) không đụng tới thì khỏi ghi log
+TOOL_MAP_FIELDS = {"ten_tool", "ton_kho", "tu", "ngan"}
+HOLDER_MAP_FIELDS = {"ten_thiet_bi", "trang_thai_tai_san", "tu", "ngan"}
+
+# LockerCell: save đầy đủ / đổi vị trí -> đếm lại ô cũ + ô mới.
+# save(update_fields=["ton_kho"] / ["trang_thai_tai_san"]) KHÔNG đếm lại: caller tự cộng delta
+# (mqtt_worker -> locker_cells.adjust_tool_qty / move_holder_status).
+CELL_FIELDS = {"tu", "ngan"}
+
+
+def _touches(update_fields, fields) -> bool:
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+def _remember_cell(sender, instance, update_fields, raw):
+    # vị trí trước khi lưu (đổi ô -> phải đếm lại cả ô cũ)
+    instance._locker_cell_before = None
+    if raw or instance.pk is None or not _touches(update_fields, CELL_FIELDS):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list("tu", "ngan").first()
+    if old:
+        instance._locker_cell_before = cell_key(*old)
+
+
+def _sync_cells(instance, update_fields):
+    if _touches(update_fields, CELL_FIELDS):
+        recount_cells([getattr(instance, "_locker_cell_before", None), cell_key(instance.tu, instance.ngan)])
+
+
+@receiver(pre_save, sender=Tool)
+def tool_before_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    _remember_cell(sender, instance, update_fields, raw)
+
+
+@receiver(post_save, sender=Tool)
+def tool_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    _sync_cells(instance, update_fields)
+    if _touches(update_fields, TOOL_MAP_FIELDS):
+        LockerChange.objects.create(kind=LockerChange.KIND_TOOL, obj_id=instance.pk)
+
+
+@receiver(post_delete, sender=Tool)
+def tool_deleted(sender, instance, **kwargs):
+    recount_cells([cell_key(instance.tu, instance.ngan)])
+    LockerChange.objects.create(kind=LockerChange.KIND_TOOL, obj_id=instance.pk)
+
+
+@receiver(pre_save, sender=Holder)
+def holder_before_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    _remember_cell(sender, instance, update_fields, raw)
+
+
+@receiver(post_save, sender=Holder)
+def holder_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    _sync_cells(instance, update_fields)
+    if _touches(update_fields, HOLDER_MAP_FIELDS):
+        LockerChange.objects.create(kind=LockerChange.KIND_HOLDER, obj_id=instance.pk)
+
+
+@receiver(post_delete, sender=Holder)
+def holder_deleted(sender, instance, **kwargs):
+    recount_cells([cell_key(instance.tu, instance.ngan)])
+    LockerChange.objects.create(kind=LockerChange.KIND_HOLDER, obj_id=instance.pk)
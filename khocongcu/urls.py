@@ -6,4 +6,7 @@ app_name = "khocongcu"
 urlpatterns = [
     # ...
     path("kho/", views.kho_cong_cu_view, name="kho_cong_cu"),
+    path("kho/delta/", views.kho_delta_view, name="kho_delta"),   # ?since=<version> (poll live)
+    path("kho/cells/", views.locker_cells_view, name="locker_cells"),            # ?locker=B&free=1
+    path("kho/cells/<str:code>/", views.locker_cell_detail_view, name="locker_cell_detail"),
 ]
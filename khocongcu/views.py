@@ -1,86 +1,84 @@
 # khocongcu/views.py
-import json
-from django.urls import reverse
-from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
 
-from tool.models import Tool
-from holder.models import Holder
-
-
-def build_code(tu, ngan):
-    """
-    Chuẩn hóa về dạng A1..A9, B1..B9, C1..C9
-    """
-    if not tu or not ngan:
-        return None
-
-    tu_str = str(tu).strip().upper()
-    tu_char = tu_str[0]          # A / B / C
-
-    ngan_str = str(ngan).strip()
-    try:
-        ngan_num = int(ngan_str)  # tự bỏ 0 ở đầu
-    except ValueError:
-        return None
-
-    return f"{tu_char}{ngan_num}"  # vd: "A1"
+from .models import LockerCell
+from .services.locker_cells import free_cells, holders_in, occupancy, parse_code, tools_in
+from .services.locker_map import delta, get_locker_snapshot
 
 
 def kho_cong_cu_view(request):
-    # bucket tạm: code -> list các item (tool/holder)
-    bucket = {}
-
-    # ===== TOOL =====
-    for t in Tool.objects.all():
-        code = build_code(t.tu, t.ngan)
-        if not code:
-            continue
-
-        bucket.setdefault(code, []).append({
-            "label": f"Tool: {t.ten_tool}",
-            "name": t.ten_tool,
-            "status": "ok" if (t.ton_kho or 0) > 0 else "error",
-            "qty": t.ton_kho or 0,
-            "url": reverse("tool:tool_profile", args=[t.pk]),
-        })
-
-    # ===== HOLDER =====
-    # ===== HOLDER =====
-    for h in Holder.objects.all():
-        code = build_code(h.tu, h.ngan)
-        if not code:
-            continue
-
-        bucket.setdefault(code, []).append({
-            "label": f"Holder: {h.ten_thiet_bi}",
-            "name": h.ten_thiet_bi,
-            "status": "ok",   # sau này cập nhật theo trạng_thai_tai_san
-            "qty": "",
-            "url": reverse("holder:holder_detail", args=[h.pk]),
-
-        })
-
-
-    # === Build cấu trúc items cho template ===
-    items = {}
-
-    for code, lst in bucket.items():
-        if len(lst) == 1:
-            # chỉ 1 loại → giữ format cũ để JS chạy nhánh 1 loại
-            items[code] = lst[0]
-        else:
-            # nhiều loại → dùng format mới, JS sẽ vào nhánh dual
-            items[code] = {
-                "items": lst
-            }
-
-    items_json = json.dumps(items, cls=DjangoJSONEncoder)
+    # map {mã ô: item | {"items": [...]}} cache sẵn, chỉ vá các ô vừa đổi (xem services/locker_map.py)
+    version, items_json = get_locker_snapshot()
 
     return render(
         request,
         "khocongcu.html",
         {
             "items_json": items_json,
+            "locker_version": version,
         },
     )
+
+
+def kho_delta_view(request):
+    """
+    GET /kho/delta/?since=<version>
+    Trả các ô đổi từ version client đang có (tồn kho / trạng thái / vị trí do mqtt_worker cập nhật).
+      { version, full: false, cells: {mã ô: item | {"items": [...]} | null (ô trống)} }
+    since thiếu / quá cũ -> full: true, cells = toàn bộ map.
+    """
+    try:
+        since = int(request.GET.get("since", ""))
+    except ValueError:
+        since = None
+    return JsonResponse(delta(since))
+
+
+def _cell_dict(c: LockerCell) -> dict:
+    return {
+        "code": c.code,
+        "locker": c.locker,
+        "cell": c.cell,
+        "tool_count": c.tool_count,
+        "tool_qty": c.tool_qty,
+        "holder_count": c.holder_count,
+        "holder_ready": c.holder_ready,
+        "holder_on_loan": c.holder_on_loan,
+        "free": c.is_free,
+    }
+
+
+def locker_cells_view(request):
+    """
+    GET /kho/cells/?locker=B&free=1
+    Tồn theo ô (bảng LockerCell) + tỉ lệ lấp đầy từng tủ.
+    """
+    locker = (request.GET.get("locker") or "").strip().upper()[:1]
+    if request.GET.get("free") in ("1", "true"):
+        qs = free_cells(locker or None)
+    else:
+        qs = LockerCell.objects.filter(locker=locker) if locker else LockerCell.objects.all()
+    return JsonResponse({
+        "cells": [_cell_dict(c) for c in qs],
+        "occupancy": occupancy(),
+    })
+
+
+def locker_cell_detail_view(request, code):
+    """GET /kho/cells/B3/ -> ô B3 có gì (tool + holder)."""
+    key = parse_code(code)
+    if not key:
+        raise Http404("Mã ô không hợp lệ")
+    cell = LockerCell.objects.filter(locker=key[0], cell=key[1]).first()
+    tools = tools_in(key).values("id", "ma_tool", "ten_tool", "ton_kho")
+    holders = [
+        {"id": h.id, "ma_noi_bo": h.ma_noi_bo, "ten_thiet_bi": h.ten_thiet_bi, "trang_thai_tai_san": h.trang_thai_tai_san}
+        for h in holders_in(key).only("id", "ma_noi_bo", "ten_thiet_bi", "trang_thai_tai_san")
+    ]
+    return JsonResponse({
+        "code": f"{key[0]}{key[1]}",
+        "summary": _cell_dict(cell) if cell else None,
+        "tools": list(tools),
+        "holders": holders,
+    })
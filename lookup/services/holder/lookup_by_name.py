@@ -1,13 +1,17 @@
-from django.db.models import Q
 from holder.models import Holder
 
 from ..shared.contracts import ok_reply, not_found_reply
+from ..shared.debug import with_query_debug
 from ..shared.rules import normalize, extract_code_candidate
-from .mapper import holder_to_card_dict, render_holder_reply
+from .mapper import HOLDER_CARD_FIELDS, holder_to_card_dict, render_holder_reply
+from .search import search_holders
+
+LOOKUP_TOP_N = 5
 
 def _holder_detail_url(h: Holder) -> str:
     return f"/holder/{h.id}/"
 
+@with_query_debug
 def lookup_holder_by_name(text: str) -> dict:
     qraw = normalize(text)
     if not qraw:
@@ -15,20 +19,9 @@ def lookup_holder_by_name(text: str) -> dict:
 
     code = extract_code_candidate(qraw)
 
-    obj = Holder.objects.filter(ma_noi_bo__iexact=code).first()
-    if not obj:
-        obj = (
-            Holder.objects.filter(
-                Q(ten_thiet_bi__icontains=qraw)
-                | Q(ma_noi_bo__icontains=qraw)
-                | Q(ma_nha_sx__icontains=qraw)
-                | Q(chuan_ga__icontains=qraw)
-                | Q(loai_kep__icontains=qraw)
-                | Q(nhom_thiet_bi__icontains=qraw)
-            )
-            .order_by("ten_thiet_bi")
-            .first()
-        )
+    # xếp hạng qua index: exact mã > prefix > token > substring > fuzzy (có trọng số field)
+    hits = search_holders(qraw, limit=LOOKUP_TOP_N, phrases=[code, qraw])
+    obj = Holder.objects.only(*HOLDER_CARD_FIELDS).filter(id=hits[0]["id"]).first() if hits else None
 
     if not obj:
         return not_found_reply(
@@ -39,4 +32,6 @@ def lookup_holder_by_name(text: str) -> dict:
 
     url = _holder_detail_url(obj)
     reply = render_holder_reply(obj, url)
-    return ok_reply("lookup_name", "holder", reply, item=holder_to_card_dict(obj), query=qraw)
+    data = ok_reply("lookup_name", "holder", reply, item=holder_to_card_dict(obj), query=qraw)
+    data["ranking"] = hits
+    return data
@@ -1,6 +1,13 @@
 from typing import Dict, Any
 from ..shared.utils import safe
 
+# Cột cần cho holder_to_card_dict / render_holder_reply -> dùng với .only() cho query gọn
+HOLDER_CARD_FIELDS = (
+    "id", "ma_noi_bo", "ten_thiet_bi", "nhom_thiet_bi", "loai_holder", "chuan_ga", "loai_kep",
+    "duong_kinh_kep_max", "chieu_dai_lam_viec", "cv", "dx", "mon", "tan_suat", "ld",
+    "gia_tri_mua", "trang_thai_tai_san", "tu", "ngan", "ma_nhom_tuong_thich",
+)
+
 def holder_to_card_dict(h) -> Dict[str, Any]:
     return {
         "id": h.id,
@@ -0,0 +1,31 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from holder.models import Holder
+
+from ..shared.search_index import SearchIndex
+from ..shared.vector_index import IndexCache
+from .vectors import index_signature
+
+# Trọng số field: mã (nội bộ / hãng / RFID) > tên > chuẩn gá/kẹp > nhóm
+HOLDER_SEARCH_FIELDS = {
+    "ma_noi_bo": 1.0,
+    "ma_nha_sx": 1.0,
+    "rfid": 0.9,
+    "ten_thiet_bi": 0.8,
+    "chuan_ga": 0.6,
+    "loai_kep": 0.5,
+    "nhom_thiet_bi": 0.4,
+}
+
+
+def _build() -> SearchIndex:
+    records = list(Holder.objects.values("id", *HOLDER_SEARCH_FIELDS))
+    return SearchIndex(records, "id", HOLDER_SEARCH_FIELDS)
+
+
+_cache = IndexCache(_build, signature=index_signature, ttl=120)
+
+
+def search_holders(text: str, limit: int = 10, phrases: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Xếp hạng holder theo mã/tên: [{id, score, matches}] (dùng chung chatbot + ô search trang chủ)."""
+    return _cache.get().search(text, limit=limit, phrases=phrases)
@@ -1,49 +1,61 @@
-from django.db.models import Q
+from django.db.models import Case, IntegerField, Value, When
 from holder.models import Holder
 
 from ..shared.contracts import ok_reply, not_found_reply
 from ..shared.rules import extract_code_candidate, normalize
+from ..shared.debug import with_query_debug
 from ..shared.utils import br, link_html, safe
-from .mapper import holder_to_card_dict
+from ..shared.vector_index import similarity
+from .mapper import HOLDER_CARD_FIELDS, holder_to_card_dict
+from .vectors import holder_vector_index
+
+SIMILAR_LIMIT = 8
 
 def _holder_detail_url(h: Holder) -> str:
     return f"/holder/{h.id}/"
 
+def _find_base(code: str):
+    # 1 query thay cho iexact rồi icontains: exact xếp trước
+    return (
+        Holder.objects.filter(ma_noi_bo__icontains=code)
+        .annotate(exact_rank=Case(When(ma_noi_bo__iexact=code, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .order_by("exact_rank", "id")
+        .only("id", "ma_noi_bo", "ma_nhom_tuong_thich")
+        .first()
+    )
+
+@with_query_debug
 def similar_holder_by_code(text: str) -> dict:
     qraw = normalize(text)
     code = extract_code_candidate(qraw)
     if not code:
         return not_found_reply("lookup_similar", "holder", "Bạn gửi mã holder cần tìm tương tự giúp mình nhé.", query=qraw)
 
-    base = Holder.objects.filter(ma_noi_bo__iexact=code).first()
-    if not base:
-        base = Holder.objects.filter(ma_noi_bo__icontains=code).first()
+    base = _find_base(code)
+
+    holders = []
+    scores = {}
+    cards_qs = Holder.objects.only(*HOLDER_CARD_FIELDS)
 
     # Strategy 1 (ưu tiên): ma_nhom_tuong_thich
     if base and base.ma_nhom_tuong_thich:
-        qs = Holder.objects.filter(ma_nhom_tuong_thich=base.ma_nhom_tuong_thich).exclude(id=base.id)[:8]
+        holders = list(cards_qs.filter(ma_nhom_tuong_thich=base.ma_nhom_tuong_thich).exclude(id=base.id)[:SIMILAR_LIMIT])
         strategy = f"ma_nhom_tuong_thich = {base.ma_nhom_tuong_thich}"
-    else:
-        # Strategy 2 fallback: chuan_ga + loai_kep + duong_kinh_kep_max
-        qs = Holder.objects.all()
-        strategy = "fallback"
-        if base:
-            if base.chuan_ga:
-                qs = qs.filter(chuan_ga=base.chuan_ga)
-                strategy = f"chuan_ga={base.chuan_ga}"
-            if base.loai_kep:
-                qs = qs.filter(loai_kep=base.loai_kep)
-                strategy += f", loai_kep={base.loai_kep}"
-            if base.duong_kinh_kep_max is not None:
-                qs = qs.filter(duong_kinh_kep_max=base.duong_kinh_kep_max)
-                strategy += f", Ømax={base.duong_kinh_kep_max}"
-            qs = qs.exclude(id=base.id)[:8]
-        else:
-            # nếu không có base, fallback theo prefix đơn giản
-            qs = Holder.objects.filter(ma_noi_bo__istartswith=code[:4]).order_by("ten_thiet_bi")[:8]
-            strategy = f"prefix={code[:4]}"
-
-    if qs.count() == 0:
+
+    # Strategy 2: k-NN theo chuan_ga / loai_kep / Ø kẹp max / cv / dx / mòn...
+    if base and not holders:
+        hits = holder_vector_index().nearest(base.id, k=SIMILAR_LIMIT)
+        objs = cards_qs.in_bulk([i for i, _ in hits])
+        holders = [objs[i] for i, _ in hits if i in objs]
+        scores = {i: similarity(d) for i, d in hits}
+        strategy = f"k-NN thông số quanh {base.ma_noi_bo}"
+
+    # nếu không có base, fallback theo prefix đơn giản
+    if not base:
+        holders = list(cards_qs.filter(ma_noi_bo__istartswith=code[:4]).order_by("ten_thiet_bi")[:SIMILAR_LIMIT])
+        strategy = f"prefix={code[:4]}"
+
+    if not holders:
         return not_found_reply(
             "lookup_similar", "holder",
             f"Không tìm thấy holder tương tự cho “<b>{safe(code)}</b>”.",
@@ -52,9 +64,14 @@ def similar_holder_by_code(text: str) -> dict:
 
     cards = []
     lines = [f"<b>Holder tương tự</b> cho mã: <b>{safe(code)}</b> (strategy: <b>{safe(strategy)}</b>)"]
-    for h in qs:
+    for h in holders:
         url = _holder_detail_url(h)
-        cards.append(holder_to_card_dict(h))
+        card = holder_to_card_dict(h)
+        if h.id in scores:
+            card["similarity"] = scores[h.id]
+        cards.append(card)
         lines.append(f"• {safe(h.ten_thiet_bi)} ({safe(h.ma_noi_bo)}) - {link_html('Xem', url)}")
 
-    return ok_reply("lookup_similar", "holder", br(lines), similar=cards, query=code)
+    data = ok_reply("lookup_similar", "holder", br(lines), similar=cards, query=code)
+    data["debug"] = {"strategy": strategy}
+    return data
@@ -0,0 +1,39 @@
+from django.db.models import Count, Max
+from holder.models import Holder
+
+from ..shared.vector_index import IndexCache, VectorIndex
+
+# Chuẩn gá + loại kẹp + Ø kẹp max là "khung" tương thích; cv/dx/mòn để xếp hạng trong nhóm
+HOLDER_NUMERIC_FEATURES = {
+    "duong_kinh_kep_max": 3.0,
+    "chieu_dai_lam_viec": 1.0,
+    "cv": 0.7,
+    "dx": 0.7,
+    "ld": 0.7,
+    "mon": 0.5,
+    "tan_suat": 0.3,
+}
+HOLDER_CATEGORICAL_FEATURES = {
+    "chuan_ga": 2.5,
+    "loai_kep": 2.0,
+    "nhom_thiet_bi": 1.0,
+}
+
+
+def _build() -> VectorIndex:
+    fields = ["id", *HOLDER_NUMERIC_FEATURES, *HOLDER_CATEGORICAL_FEATURES]
+    records = list(Holder.objects.values(*fields))
+    return VectorIndex(records, "id", HOLDER_NUMERIC_FEATURES, HOLDER_CATEGORICAL_FEATURES)
+
+
+def index_signature():
+    # count bắt thêm / xoá, max(updated_at) bắt sửa (tên, thông số, vị trí)
+    agg = Holder.objects.aggregate(n=Count("id"), last=Max("updated_at"))
+    return agg["n"], agg["last"]
+
+
+_cache = IndexCache(_build, signature=index_signature, ttl=120)
+
+
+def holder_vector_index() -> VectorIndex:
+    return _cache.get()
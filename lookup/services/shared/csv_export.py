@@ -0,0 +1,69 @@
+"""
+Xuất CSV dạng stream cho các trang lịch sử (ToolTransaction / HolderHistory).
+
+- csv.writer ghi vào Echo (trả thẳng chuỗi, không buffer) -> generator từng dòng
+- StreamingHttpResponse: byte đầu tiên đi ngay, RAM không tăng theo số dòng
+- Query nên dùng values_list(...).iterator(chunk_size=...) (không cache queryset)
+- BOM UTF-8 ở đầu file để Excel mở đúng tiếng Việt
+- Ô chữ bắt đầu bằng = + - @ (tab / CR) được thêm ' phía trước: Excel không chạy như công thức
+
+    return stream_csv("lich_su_tool.csv", HEADER, (row_of(r) for r in qs.iterator(chunk_size=2000)))
+"""
+import csv
+from datetime import datetime, time, timedelta
+from typing import Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+EXPORT_CHUNK_SIZE = 2000
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """File-like tối giản cho csv.writer: write() trả lại chính dòng đó."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def safe_cell(value: Any) -> Any:
+    """Chặn CSV injection: chỉ chữ (ghi chú, mô tả, dự án...) bị sửa, số giữ nguyên."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_rows(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield "\ufeff" + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([safe_cell(v) for v in row])
+
+
+def stream_csv(filename: str, header: Sequence[str], rows: Iterable[Sequence[Any]]) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(csv_rows(header, rows), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def date_range(request) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    ?tu_ngay=YYYY-MM-DD&den_ngay=YYYY-MM-DD (theo giờ địa phương, gồm cả ngày cuối)
+    -> (start, end) aware, lọc field >= start và field < end. Sai định dạng -> bỏ qua.
+    """
+    def _at(value: str, days: int = 0) -> Optional[datetime]:
+        try:
+            d = parse_date((value or "").strip())
+        except ValueError:
+            return None
+        if d is None:
+            return None
+        return timezone.make_aware(datetime.combine(d + timedelta(days=days), time.min))
+
+    return _at(request.GET.get("tu_ngay", "")), _at(request.GET.get("den_ngay", ""), days=1)
+
+
+def fmt_dt(value: Optional[datetime]) -> str:
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S") if value else ""
@@ -0,0 +1,40 @@
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from django.db import connection
+
+
+@contextmanager
+def count_queries() -> Iterator[Dict[str, int]]:
+    """
+    Đếm số query SQL chạy trong block (qua connection.execute_wrapper, không cần DEBUG=True).
+        with count_queries() as qc:
+            ...
+        qc["queries"]
+    """
+    box = {"queries": 0}
+
+    def _wrapper(execute, sql, params, many, context):
+        box["queries"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(_wrapper):
+        yield box
+
+
+def with_query_debug(fn: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """Gắn debug metadata {queries, ms} vào dict kết quả của 1 hàm lookup."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        with count_queries() as qc:
+            result = fn(*args, **kwargs)
+        debug = result.setdefault("debug", {})
+        debug["queries"] = qc["queries"]
+        debug["ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        return result
+
+    return wrapper
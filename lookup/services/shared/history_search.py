@@ -0,0 +1,70 @@
+"""
+Tìm kiếm lịch sử giao dịch (ToolTransaction / HolderHistory) trên 1 cột search_text
+đã chuẩn hoá (fold_text: lowercase, bỏ dấu), thay cho icontains OR trên nhiều bảng JOIN.
+
+- SQLite có FTS5 trigram: bảng ảo <table>_fts (external content = cột search_text,
+  trigger giữ đồng bộ) -> "id IN (SELECT rowid ... MATCH)" = tra index, không quét bảng
+- Không có FTS5 / token < 3 ký tự (trigram không tra được): LIKE trên search_text
+  (1 bảng, không JOIN)
+
+Bảng FTS + trigger được tạo trong migration (tool_muontra 0006, holder_muontra 0005);
+thiếu FTS5 thì migration bỏ qua, has_fts() -> False.
+"""
+from typing import Dict, List, Tuple
+
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+
+from .rules import fold_text
+
+SEARCH_FIELD = "search_text"
+
+_fts_tables: Dict[Tuple[str, str], bool] = {}
+
+
+def build_search_text(*parts) -> str:
+    return " ".join(fold_text(str(p)).strip() for p in parts if p)
+
+
+def search_terms(q: str) -> List[str]:
+    return [t for t in fold_text(q or "").split() if t]
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+# ===================== Query =====================
+def has_fts(alias: str, table: str) -> bool:
+    key = (alias, table)
+    if key not in _fts_tables:
+        conn = connections[alias]
+        ok = False
+        if conn.vendor == "sqlite":
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts_table(table)])
+                ok = cur.fetchone() is not None
+        _fts_tables[key] = ok
+    return _fts_tables[key]
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def filter_search(qs: QuerySet, q: str) -> QuerySet:
+    """Mọi từ trong q phải xuất hiện (AND) trong search_text; không phân biệt hoa thường / dấu."""
+    terms = search_terms(q)
+    if not terms:
+        return qs
+    table = qs.model._meta.db_table
+    fts_terms = [t for t in terms if len(t) >= 3] if has_fts(qs.db, table) else []
+    if fts_terms:
+        match = " ".join(_fts_phrase(t) for t in fts_terms)
+        qs = qs.filter(id__in=RawSQL(f"SELECT rowid FROM {fts_table(table)} WHERE {fts_table(table)} MATCH %s", [match]))
+    for t in terms:
+        if t not in fts_terms:
+            qs = qs.filter(**{f"{SEARCH_FIELD}__contains": t})
+    return qs
+
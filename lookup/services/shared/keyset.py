@@ -0,0 +1,70 @@
+"""
+Phân trang keyset (cursor) cho các trang lịch sử: ORDER BY <field> DESC, id DESC.
+
+OFFSET n bắt DB đọc bỏ n dòng -> trang càng sâu càng chậm. Keyset lọc thẳng
+"(field, id) < (cursor)" trên index (field, id) -> mọi trang tốn như trang đầu.
+
+    page = keyset_page(qs, "created_at", request.GET.get("cursor"), per_page=100)
+    page.rows, page.next_cursor, page.has_next
+"""
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+
+@dataclass
+class KeysetPage:
+    rows: List[Any]
+    next_cursor: Optional[str]
+    is_first: bool
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(value: datetime, pk: int) -> str:
+    raw = f"{value.isoformat()}|{pk}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Cursor hỏng / bị sửa tay -> None (về trang đầu) thay vì 500."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        value, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(qs: QuerySet, field: str, cursor: Optional[str], per_page: int = 100) -> KeysetPage:
+    """`field` phải NOT NULL và có index (field, id)."""
+    after = decode_cursor(cursor)
+    qs = qs.order_by(f"-{field}", "-id")
+    if after is not None:
+        value, pk = after
+        qs = qs.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk}))
+
+    rows = list(qs[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(rows=rows, next_cursor=next_cursor, is_first=after is None)
+
+
+def page_url(request, cursor: Optional[str]) -> str:
+    """Giữ nguyên bộ lọc GET hiện tại, chỉ đổi cursor."""
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    if cursor:
+        params["cursor"] = cursor
+    query = params.urlencode()
+    return f"{request.path}?{query}" if query else request.path
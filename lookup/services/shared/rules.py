@@ -1,4 +1,5 @@
 import re
+import unicodedata
 
 def extract_code_candidate(text: str) -> str:
     """
@@ -33,3 +34,12 @@ def tool_prefix(code: str) -> str:
 
 def normalize(s: str) -> str:
     return (s or "").strip()
+
+def fold_text(s: str) -> str:
+    """
+    Chuẩn hoá để so khớp: lowercase + bỏ dấu tiếng Việt (đ -> d).
+    "Mũi khoan Ø10" -> "mui khoan ø10"
+    """
+    t = (s or "").lower().replace("đ", "d")
+    t = unicodedata.normalize("NFD", t)
+    return "".join(ch for ch in t if unicodedata.category(ch) != "Mn")
@@ -0,0 +1,174 @@
+import bisect
+import difflib
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from .rules import fold_text
+
+# Điểm theo bậc khớp: exact code > prefix > token > substring > fuzzy
+TIER_EXACT = 100.0
+TIER_PREFIX = 70.0
+TIER_TOKEN = 50.0
+TIER_TOKEN_PREFIX = 35.0
+TIER_SUBSTRING = 30.0
+TIER_FUZZY = 25.0
+
+MIN_SCORE = 15.0
+FUZZY_CUTOFF = 0.8
+MAX_PREFIX_EXPAND = 50
+
+# Từ hay đi kèm câu hỏi, không mang nghĩa tra cứu (đã bỏ dấu)
+STOPWORDS = {
+    "la", "gi", "ma", "cua", "cho", "minh", "xem", "tim", "tra", "cuu", "thong", "tin", "so",
+    "tool", "holder", "nao", "co", "khong", "the", "va", "voi", "nay", "do", "ve",
+}
+
+_TOKEN_RE = re.compile(r"[0-9a-zø]+(?:[./\-_][0-9a-zø]+)*")
+
+
+def tokenize(folded: str) -> List[str]:
+    """Token gồm cả mã ghép (em12-abc) lẫn từng mảnh (em12, abc)."""
+    out = []
+    for tok in _TOKEN_RE.findall(folded):
+        out.append(tok)
+        parts = re.split(r"[./\-_]", tok)
+        if len(parts) > 1:
+            out.extend(p for p in parts if p)
+    return out
+
+
+def _trigrams(s: str) -> Set[str]:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class SearchIndex:
+    """
+    Index in-memory cho tra cứu theo mã/tên, xếp hạng nhiều field có trọng số.
+
+    search() trả về [{id, score, matches}] với matches = giải thích vì sao khớp,
+    vd: ["ma_tool: exact", "ten_tool: token 'khoan'"].
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], id_key: str, fields: Dict[str, float]):
+        self.fields = dict(fields)
+        self._values: Dict[Any, Dict[str, str]] = {}
+        self._exact: Dict[str, Dict[str, Set[Any]]] = {f: defaultdict(set) for f in self.fields}
+        self._sorted: Dict[str, List[tuple]] = {}
+        self._postings: Dict[str, Set[tuple]] = defaultdict(set)
+        self._trigrams: Dict[str, Set[Any]] = defaultdict(set)
+
+        for r in records:
+            rid = r[id_key]
+            vals = {}
+            for f in self.fields:
+                v = fold_text(str(r.get(f) or "")).strip()
+                if not v:
+                    continue
+                vals[f] = v
+                self._exact[f][v].add(rid)
+                for tok in tokenize(v):
+                    self._postings[tok].add((rid, f))
+                for tri in _trigrams(v):
+                    self._trigrams[tri].add(rid)
+            self._values[rid] = vals
+
+        for f in self.fields:
+            self._sorted[f] = sorted((vals[f], rid) for rid, vals in self._values.items() if f in vals)
+        self._vocab = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def search(self, text: str, limit: int = 10, phrases: Optional[Iterable[str]] = None,
+               min_score: float = MIN_SCORE) -> List[Dict[str, Any]]:
+        """
+        text: câu người dùng (dùng cho khớp từng token)
+        phrases: các cụm khớp nguyên giá trị field (mặc định = [text]); vd [mã bốc ra, câu gốc]
+        """
+        whole: Dict[Any, Dict[str, Any]] = {}
+        for phrase in (phrases or [text]):
+            q = fold_text(phrase).strip()
+            if q:
+                self._match_whole(q, whole)
+
+        tokens = [t for t in dict.fromkeys(tokenize(fold_text(text))) if t not in STOPWORDS]
+        per_token: Dict[Any, float] = defaultdict(float)
+        token_expl: Dict[Any, List[str]] = defaultdict(list)
+        for tok in tokens:
+            best = self._match_token(tok)
+            for rid, (score, expl) in best.items():
+                per_token[rid] += score / len(tokens)
+                token_expl[rid].append(expl)
+
+        hits = []
+        for rid in set(whole) | set(per_token):
+            w = whole.get(rid)
+            score = (w["score"] if w else 0.0) + per_token.get(rid, 0.0)
+            if score < min_score:
+                continue
+            matches = ([w["expl"]] if w else []) + token_expl.get(rid, [])
+            hits.append({"id": rid, "score": round(score, 2), "matches": matches})
+
+        hits.sort(key=lambda h: (-h["score"], str(h["id"])))
+        return hits[:limit]
+
+    # ---------- nội bộ ----------
+
+    def _match_whole(self, q: str, out: Dict[Any, Dict[str, Any]]) -> None:
+        def offer(rid, field, tier, label):
+            score = tier * self.fields[field]
+            cur = out.get(rid)
+            if cur is None or score > cur["score"]:
+                out[rid] = {"score": score, "expl": f"{field}: {label}"}
+
+        for f in self.fields:
+            for rid in self._exact[f].get(q, ()):
+                offer(rid, f, TIER_EXACT, "exact")
+
+            rows = self._sorted[f]
+            i = bisect.bisect_left(rows, (q,))
+            while i < len(rows) and rows[i][0].startswith(q):
+                offer(rows[i][1], f, TIER_PREFIX, "prefix")
+                i += 1
+
+        if len(q) < 3:
+            return
+        cands = None
+        for tri in _trigrams(q):
+            ids = self._trigrams.get(tri, set())
+            cands = set(ids) if cands is None else cands & ids
+            if not cands:
+                return
+        for rid in cands:
+            for f, v in self._values[rid].items():
+                if q in v:
+                    offer(rid, f, TIER_SUBSTRING, "substring")
+
+    def _match_token(self, tok: str) -> Dict[Any, tuple]:
+        best: Dict[Any, tuple] = {}
+
+        def offer(postings, tier, label):
+            for rid, f in postings:
+                score = tier * self.fields[f]
+                if rid not in best or score > best[rid][0]:
+                    best[rid] = (score, f"{f}: {label} '{tok}'")
+
+        if tok in self._postings:
+            offer(self._postings[tok], TIER_TOKEN, "token")
+
+        if len(tok) >= 3:
+            i = bisect.bisect_left(self._vocab, tok)
+            n = 0
+            while i < len(self._vocab) and self._vocab[i].startswith(tok) and n < MAX_PREFIX_EXPAND:
+                if self._vocab[i] != tok:
+                    offer(self._postings[self._vocab[i]], TIER_TOKEN_PREFIX, "prefix")
+                i += 1
+                n += 1
+
+        if not best and len(tok) >= 4:
+            for near in difflib.get_close_matches(tok, self._vocab, n=3, cutoff=FUZZY_CUTOFF):
+                ratio = difflib.SequenceMatcher(None, tok, near).ratio()
+                offer(self._postings[near], TIER_FUZZY * ratio, "fuzzy")
+
+        return best
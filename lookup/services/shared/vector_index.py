@@ -0,0 +1,128 @@
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy là optional: không có thì brute-force thuần Python (vẫn đủ nhanh vài nghìn dòng)
+    np = None
+
+
+class VectorIndex:
+    """
+    k-NN brute-force trên vector đặc trưng số (CPU-only).
+
+    - Cột số (numeric) được chuẩn hoá z-score, thiếu dữ liệu -> 0 (tức = trung bình).
+    - Cột phân loại (categorical) được one-hot.
+    - Mỗi cột nhân với trọng số -> khoảng cách Euclid bình phương.
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], id_key: str,
+                 numeric: Dict[str, float], categorical: Dict[str, float]):
+        self.ids: List[Hashable] = [r[id_key] for r in records]
+        self._pos = {rid: i for i, rid in enumerate(self.ids)}
+
+        columns: List[List[float]] = []
+
+        for field, weight in numeric.items():
+            raw = [_to_float(r.get(field)) for r in records]
+            present = [x for x in raw if x is not None]
+            if not present:
+                continue
+            mean = sum(present) / len(present)
+            var = sum((x - mean) ** 2 for x in present) / len(present)
+            std = math.sqrt(var) or 1.0
+            columns.append([0.0 if x is None else (x - mean) / std * weight for x in raw])
+
+        for field, weight in categorical.items():
+            values = [_norm_cat(r.get(field)) for r in records]
+            for cat in sorted({v for v in values if v}):
+                columns.append([weight if v == cat else 0.0 for v in values])
+
+        self.dim = len(columns)
+        rows = [list(col) for col in zip(*columns)] if columns else [[] for _ in self.ids]
+        self._rows = rows
+        self._matrix = np.asarray(rows, dtype=np.float32) if (np is not None and rows) else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nearest(self, item_id: Hashable, k: int = 8) -> List[Tuple[Hashable, float]]:
+        """Trả về k phần tử gần item_id nhất (không tính chính nó): [(id, distance)]."""
+        i = self._pos.get(item_id)
+        if i is None or self.dim == 0:
+            return []
+
+        if self._matrix is not None:
+            diff = self._matrix - self._matrix[i]
+            d2 = np.einsum("ij,ij->i", diff, diff)
+            d2[i] = np.inf
+            k = min(k, len(self.ids) - 1)
+            if k <= 0:
+                return []
+            top = np.argpartition(d2, k - 1)[:k]
+            top = top[np.argsort(d2[top])]
+            return [(self.ids[j], float(math.sqrt(d2[j]))) for j in top]
+
+        base = self._rows[i]
+        scored = []
+        for j, row in enumerate(self._rows):
+            if j == i:
+                continue
+            d2 = 0.0
+            for a, b in zip(row, base):
+                d2 += (a - b) * (a - b)
+            scored.append((d2, j))
+        scored.sort()
+        return [(self.ids[j], math.sqrt(d2)) for d2, j in scored[:k]]
+
+
+class IndexCache:
+    """
+    Cache in-process cho index build từ DB.
+    - signature(): query rẻ (count/max...) -> đổi thì build lại
+    - ttl: quá hạn thì build lại kể cả khi signature không đổi
+    """
+
+    def __init__(self, builder: Callable[[], Any],
+                 signature: Optional[Callable[[], Any]] = None, ttl: float = 300.0):
+        self._builder = builder
+        self._signature = signature
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._sig = None
+        self._built_at = 0.0
+
+    def get(self) -> Any:
+        sig = self._signature() if self._signature else None
+        with self._lock:
+            fresh = (time.monotonic() - self._built_at) < self._ttl
+            if self._value is None or not fresh or sig != self._sig:
+                self._value = self._builder()
+                self._sig = sig
+                self._built_at = time.monotonic()
+            return self._value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+
+def similarity(distance: float) -> float:
+    """distance -> 0..1 (1 = giống hệt) cho dễ hiển thị."""
+    return round(1.0 / (1.0 + distance), 3)
+
+
+def _to_float(v) -> Optional[float]:
+    if v is None or v == "":
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _norm_cat(v) -> str:
+    return str(v).strip().upper() if v not in (None, "") else ""
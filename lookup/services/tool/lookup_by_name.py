@@ -1,14 +1,18 @@
-from django.db.models import Q
 from tool.models import Tool
 
 from ..shared.contracts import ok_reply, not_found_reply
+from ..shared.debug import with_query_debug
 from ..shared.rules import normalize, extract_code_candidate
-from .mapper import tool_to_card_dict, render_tool_reply
+from .mapper import TOOL_CARD_FIELDS, tool_to_card_dict, render_tool_reply
+from .search import search_tools
+
+LOOKUP_TOP_N = 5
 
 def _tool_detail_url(t: Tool) -> str:
     # Best-effort: nếu bạn có URL detail khác, đổi 1 chỗ này là xong
     return f"/tool/{t.id}/"
 
+@with_query_debug
 def lookup_tool_by_name(text: str) -> dict:
     qraw = normalize(text)
     if not qraw:
@@ -16,22 +20,9 @@ def lookup_tool_by_name(text: str) -> dict:
 
     code = extract_code_candidate(qraw)
 
-    # ưu tiên match ma_tool exact
-    obj = Tool.objects.filter(ma_tool__iexact=code).first()
-    if not obj:
-        # fallback: search theo nhiều field
-        obj = (
-            Tool.objects.filter(
-                Q(ten_tool__icontains=qraw)
-                | Q(ma_tool__icontains=qraw)
-                | Q(model__icontains=qraw)
-                | Q(ma_nha_sx__icontains=qraw)
-                | Q(nhom_tool__icontains=qraw)
-                | Q(dong_tool__icontains=qraw)
-            )
-            .order_by("ten_tool")
-            .first()
-        )
+    # xếp hạng qua index: exact mã > prefix > token > substring > fuzzy (có trọng số field)
+    hits = search_tools(qraw, limit=LOOKUP_TOP_N, phrases=[code, qraw])
+    obj = Tool.objects.only(*TOOL_CARD_FIELDS).filter(id=hits[0]["id"]).first() if hits else None
 
     if not obj:
         return not_found_reply(
@@ -42,4 +33,6 @@ def lookup_tool_by_name(text: str) -> dict:
 
     url = _tool_detail_url(obj)
     reply = render_tool_reply(obj, url)
-    return ok_reply("lookup_name", "tool", reply, item=tool_to_card_dict(obj), query=qraw)
+    data = ok_reply("lookup_name", "tool", reply, item=tool_to_card_dict(obj), query=qraw)
+    data["ranking"] = hits
+    return data
@@ -1,6 +1,13 @@
 from typing import Dict, Any
 from ..shared.utils import safe
 
+# Cột cần cho tool_to_card_dict / render_tool_reply -> dùng với .only() cho query gọn
+TOOL_CARD_FIELDS = (
+    "id", "ma_tool", "ten_tool", "nhom_tool", "dong_tool", "nha_san_xuat", "model",
+    "duong_kinh", "chieu_dai_lam_viec", "loai_gia_cong", "nhom_vat_lieu_iso",
+    "gia_tri_mua", "ton_kho", "tu", "ngan", "ghi_chu",
+)
+
 def tool_to_card_dict(t) -> Dict[str, Any]:
     # t là instance Tool
     return {
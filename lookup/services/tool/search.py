@@ -0,0 +1,30 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from tool.models import Tool
+
+from ..shared.search_index import SearchIndex
+from ..shared.vector_index import IndexCache
+from .vectors import index_signature
+
+# Trọng số field: mã (nội bộ / hãng) > model > tên > dòng/nhóm
+TOOL_SEARCH_FIELDS = {
+    "ma_tool": 1.0,
+    "ma_nha_sx": 1.0,
+    "model": 0.9,
+    "ten_tool": 0.8,
+    "dong_tool": 0.5,
+    "nhom_tool": 0.4,
+}
+
+
+def _build() -> SearchIndex:
+    records = list(Tool.objects.values("id", *TOOL_SEARCH_FIELDS))
+    return SearchIndex(records, "id", TOOL_SEARCH_FIELDS)
+
+
+_cache = IndexCache(_build, signature=index_signature, ttl=600)
+
+
+def search_tools(text: str, limit: int = 10, phrases: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Xếp hạng tool theo mã/tên: [{id, score, matches}] (dùng chung chatbot + ô search trang chủ)."""
+    return _cache.get().search(text, limit=limit, phrases=phrases)
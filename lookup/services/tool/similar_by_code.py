@@ -1,14 +1,30 @@
-from django.db.models import Q
+from django.db.models import Case, IntegerField, Value, When
 from tool.models import Tool
 
 from ..shared.contracts import ok_reply, not_found_reply
 from ..shared.rules import extract_code_candidate, tool_prefix, normalize
+from ..shared.debug import with_query_debug
 from ..shared.utils import br, link_html, safe
-from .mapper import tool_to_card_dict
+from ..shared.vector_index import similarity
+from .mapper import TOOL_CARD_FIELDS, tool_to_card_dict
+from .vectors import tool_vector_index
+
+SIMILAR_LIMIT = 8
 
 def _tool_detail_url(t: Tool) -> str:
     return f"/tool/{t.id}/"
 
+def _find_base(code: str):
+    # 1 query thay cho iexact rồi icontains: exact xếp trước
+    return (
+        Tool.objects.filter(ma_tool__icontains=code)
+        .annotate(exact_rank=Case(When(ma_tool__iexact=code, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .order_by("exact_rank", "ten_tool", "ma_tool")
+        .only("id", "ma_tool")
+        .first()
+    )
+
+@with_query_debug
 def similar_tool_by_code(text: str) -> dict:
     qraw = normalize(text)
     code = extract_code_candidate(qraw)
@@ -16,19 +32,26 @@ def similar_tool_by_code(text: str) -> dict:
         return not_found_reply("lookup_similar", "tool", "Bạn gửi mã tool cần tìm tương tự giúp mình nhé.", query=qraw)
 
     prefix = tool_prefix(code)
+    scores = {}
 
-    # ưu tiên: same prefix ma_tool
-    qs = Tool.objects.filter(ma_tool__istartswith=prefix).order_by("ten_tool")[:8]
+    # ưu tiên: k-NN theo thông số (Ø, chiều dài, loại gia công, ISO, độ cứng, điểm fuzzy) của record match
+    base = _find_base(code)
+    tools = []
+    if base:
+        hits = tool_vector_index().nearest(base.id, k=SIMILAR_LIMIT)
+        objs = Tool.objects.only(*TOOL_CARD_FIELDS).in_bulk([i for i, _ in hits])
+        tools = [objs[i] for i, _ in hits if i in objs]
+        scores = {i: similarity(d) for i, d in hits}
+        strategy = f"k-NN thông số quanh <b>{safe(base.ma_tool)}</b>"
 
-    # fallback: nếu prefix ra ít quá thì thử cùng nhom_tool/dong_tool (dựa trên record match)
-    if qs.count() == 0:
-        base = Tool.objects.filter(ma_tool__icontains=code).first()
-        if base:
-            qs = Tool.objects.filter(
-                Q(nhom_tool=base.nhom_tool) | Q(dong_tool=base.dong_tool)
-            ).exclude(id=base.id).order_by("ten_tool")[:8]
+    # fallback: không có record gốc -> same prefix ma_tool
+    if not tools:
+        tools = list(
+            Tool.objects.filter(ma_tool__istartswith=prefix).only(*TOOL_CARD_FIELDS).order_by("ten_tool")[:SIMILAR_LIMIT]
+        )
+        strategy = f"prefix <b>{safe(prefix)}</b>"
 
-    if qs.count() == 0:
+    if not tools:
         return not_found_reply(
             "lookup_similar", "tool",
             f"Không tìm thấy mã tương tự cho “<b>{safe(code)}</b>”.",
@@ -36,10 +59,15 @@ def similar_tool_by_code(text: str) -> dict:
         )
 
     cards = []
-    lines = [f"<b>Tool tương tự</b> cho mã: <b>{safe(code)}</b> (strategy: prefix <b>{safe(prefix)}</b>)"]
-    for t in qs:
+    lines = [f"<b>Tool tương tự</b> cho mã: <b>{safe(code)}</b> (strategy: {strategy})"]
+    for t in tools:
         url = _tool_detail_url(t)
-        cards.append(tool_to_card_dict(t))
+        card = tool_to_card_dict(t)
+        if t.id in scores:
+            card["similarity"] = scores[t.id]
+        cards.append(card)
         lines.append(f"• {safe(t.ten_tool)} ({safe(t.ma_tool)}) - {link_html('Xem', url)}")
 
-    return ok_reply("lookup_similar", "tool", br(lines), similar=cards, query=code)
+    data = ok_reply("lookup_similar", "tool", br(lines), similar=cards, query=code)
+    data["debug"] = {"strategy": "knn" if scores else "prefix"}
+    return data
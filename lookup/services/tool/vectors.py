@@ -0,0 +1,41 @@
+from django.db.models import Count, Max
+from tool.models import Tool
+
+from ..shared.vector_index import IndexCache, VectorIndex
+
+# Trọng số đặc trưng cho "tool tương tự": đường kính + loại gia công quan trọng nhất
+TOOL_NUMERIC_FEATURES = {
+    "duong_kinh": 3.0,
+    "chieu_dai_lam_viec": 1.0,
+    "do_cung_min": 0.8,
+    "do_cung_max": 0.8,
+    "diem_gia": 0.4,
+    "diem_do_ben": 0.4,
+    "diem_on_dinh": 0.4,
+    "diem_chat_luong_be_mat": 0.4,
+    "diem_san_co": 0.3,
+}
+TOOL_CATEGORICAL_FEATURES = {
+    "loai_gia_cong": 2.0,
+    "nhom_vat_lieu_iso": 1.5,
+    "nhom_tool": 1.5,
+}
+
+
+def _build() -> VectorIndex:
+    fields = ["id", *TOOL_NUMERIC_FEATURES, *TOOL_CATEGORICAL_FEATURES]
+    records = list(Tool.objects.values(*fields))
+    return VectorIndex(records, "id", TOOL_NUMERIC_FEATURES, TOOL_CATEGORICAL_FEATURES)
+
+
+def index_signature():
+    # updated_at không đổi khi worker save(update_fields=["ton_kho"]) -> đúng ý, tồn kho không phải đặc trưng
+    agg = Tool.objects.aggregate(n=Count("id"), last=Max("updated_at"))
+    return agg["n"], agg["last"]
+
+
+_cache = IndexCache(_build, signature=index_signature, ttl=600)
+
+
+def tool_vector_index() -> VectorIndex:
+    return _cache.get()
@@ -1,5 +1,21 @@
 from django.contrib import admin
-from .models import Tool
+from .models import LowStockAlert, Tool
+
+
+class LowStockFilter(admin.SimpleListFilter):
+    """Lọc tồn thấp trong DB (Tool.objects.low_stock), không duyệt is_low_stock từng dòng."""
+    title = "Tồn kho"
+    parameter_name = "ton_thap"
+
+    def lookups(self, request, model_admin):
+        return [("1", "Dưới mức cảnh báo"), ("0", "Đủ hàng")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "1":
+            return queryset.low_stock()
+        if self.value() == "0":
+            return queryset.exclude(pk__in=queryset.low_stock().values("pk"))
+        return queryset
 
 
 @admin.register(Tool)
@@ -22,6 +38,7 @@ class ToolAdmin(admin.ModelAdmin):
 
     # ======== FILTER BÊN PHẢI =========
     list_filter = (
+        LowStockFilter,
         "nhom_tool",
         "loai_gia_cong",
         "nhom_vat_lieu_iso",
@@ -120,3 +137,15 @@ class ToolAdmin(admin.ModelAdmin):
 
     is_low_stock_color.short_description = "Tồn kho"
     is_low_stock_color.admin_order_field = "ton_kho"
+
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    list_display = ("tool", "ton_kho", "muc_canh_bao", "opened_at", "resolved_at", "ton_kho_resolved")
+    list_filter = (("resolved_at", admin.EmptyFieldListFilter), "opened_at")
+    search_fields = ("tool__ma_tool", "tool__ten_tool")
+    list_select_related = ("tool",)
+    readonly_fields = ("tool", "ton_kho", "muc_canh_bao", "opened_at", "resolved_at", "ton_kho_resolved")
+
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ToolConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tool'
+
+    def ready(self):
+        # mở / đóng LowStockAlert khi tồn / mức cảnh báo đổi qua admin, form
+        from . import signals  # noqa: F401
@@ -0,0 +1,2 @@
+# tool/management/__init__.py
+# Để Django nhận đây là package Python
@@ -0,0 +1,2 @@
+# tool/management/commands/__init__.py
+# Để Django load được các lệnh custom (check_low_stock)
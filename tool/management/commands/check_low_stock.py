@@ -0,0 +1,15 @@
+# tool/management/commands/check_low_stock.py
+
+from django.core.management.base import BaseCommand
+
+from tool.services.low_stock import breaches, evaluate_all
+
+
+class Command(BaseCommand):
+    help = "Đồng bộ LowStockAlert với tồn hiện tại (lần đầu / sau khi nhập dữ liệu hàng loạt) và in danh sách tồn thấp."
+
+    def handle(self, *args, **options):
+        res = evaluate_all()
+        self.stdout.write(f"[LOW_STOCK] mở {res['opened']}, đóng {res['resolved']} cảnh báo")
+        for t in breaches():
+            self.stdout.write(f"  {t.ma_tool:<20} {t.ton_kho:>5} / {t.muc_canh_bao:<5} {t.ten_tool}")
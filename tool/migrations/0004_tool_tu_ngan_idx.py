@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0003_alter_tool_ngan_alter_tool_tu'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tool',
+            index=models.Index(fields=['tu', 'ngan'], name='tool_tool_tu_f9243b_idx'),
+        ),
+    ]
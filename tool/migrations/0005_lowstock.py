@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0004_tool_tu_ngan_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tool',
+            index=models.Index(condition=models.Q(('ton_kho__lte', models.F('muc_canh_bao'))), fields=['ten_tool', 'ma_tool'], name='tool_low_stock_idx'),
+        ),
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ton_kho', models.PositiveIntegerField(verbose_name='Tồn lúc cảnh báo')),
+                ('muc_canh_bao', models.PositiveIntegerField(verbose_name='Mức cảnh báo lúc đó')),
+                ('opened_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('ton_kho_resolved', models.PositiveIntegerField(blank=True, null=True, verbose_name='Tồn lúc hết cảnh báo')),
+                ('tool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alerts', to='tool.tool')),
+            ],
+            options={
+                'verbose_name': 'Cảnh báo tồn thấp',
+                'verbose_name_plural': 'Cảnh báo tồn thấp',
+                'ordering': ['-opened_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('resolved_at__isnull', True)), fields=('tool',), name='uniq_open_low_stock_alert')],
+            },
+        ),
+    ]
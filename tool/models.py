@@ -1,4 +1,14 @@
 from django.db import models
+from django.db.models import F, Q
+
+# tồn <= mức cảnh báo (muc_canh_bao NULL -> so sánh NULL -> không tính)
+LOW_STOCK_Q = Q(ton_kho__lte=F("muc_canh_bao"))
+
+
+class ToolQuerySet(models.QuerySet):
+    def low_stock(self):
+        """Tool dưới mức cảnh báo, lọc trong DB (partial index tool_low_stock_idx)."""
+        return self.filter(LOW_STOCK_Q)
 
 
 class Tool(models.Model):
@@ -279,8 +289,13 @@ class Tool(models.Model):
             models.Index(fields=["ma_tool"]),
             models.Index(fields=["nhom_tool", "dong_tool"]),
             models.Index(fields=["loai_gia_cong", "nhom_vat_lieu_iso"]),
+            models.Index(fields=["tu", "ngan"]),     # tra theo ô tủ (LockerCell / khocongcu)
+            # chỉ chứa tool đang dưới mức cảnh báo -> low_stock() đọc index nhỏ, đúng thứ tự mặc định
+            models.Index(fields=["ten_tool", "ma_tool"], condition=LOW_STOCK_Q, name="tool_low_stock_idx"),
         ]
 
+    objects = ToolQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.ten_tool} ({self.ma_tool})" if self.ma_tool else self.ten_tool
 
@@ -304,3 +319,35 @@ class Tool(models.Model):
             "diem_san_co": self.diem_san_co,
             "diem_uu_tien_dung_truoc": self.diem_uu_tien_dung_truoc,
         }
+
+
+class LowStockAlert(models.Model):
+    """
+    Sự kiện cảnh báo tồn thấp: mở khi tool xuống <= muc_canh_bao, đóng (resolved_at) khi hồi lại.
+    Tối đa 1 cảnh báo đang mở / tool. Đánh giá trong tool/services/low_stock.py.
+    """
+
+    tool = models.ForeignKey(Tool, on_delete=models.CASCADE, related_name="low_stock_alerts")
+    ton_kho = models.PositiveIntegerField(verbose_name="Tồn lúc cảnh báo")
+    muc_canh_bao = models.PositiveIntegerField(verbose_name="Mức cảnh báo lúc đó")
+    opened_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    ton_kho_resolved = models.PositiveIntegerField(null=True, blank=True, verbose_name="Tồn lúc hết cảnh báo")
+
+    class Meta:
+        verbose_name = "Cảnh báo tồn thấp"
+        verbose_name_plural = "Cảnh báo tồn thấp"
+        ordering = ["-opened_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tool"], condition=Q(resolved_at__isnull=True), name="uniq_open_low_stock_alert",
+            ),
+        ]
+
+    @property
+    def is_open(self) -> bool:
+        return self.resolved_at is None
+
+    def __str__(self):
+        state = "mở" if self.is_open else "đã đóng"
+        return f"{self.tool_id}: {self.ton_kho}/{self.muc_canh_bao} ({state})"
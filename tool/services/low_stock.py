@@ -0,0 +1,89 @@
+"""
+Cảnh báo tồn thấp (ton_kho <= muc_canh_bao).
+
+- Danh sách vi phạm: Tool.objects.low_stock() -> lọc trong DB trên partial index, không duyệt từng tool
+- evaluate(tool): so trạng thái hiện tại với cảnh báo đang mở -> mở / đóng LowStockAlert
+  * mqtt_worker.process_tool_success gọi ngay sau khi đổi ton_kho (trong transaction.atomic)
+  * signal: save đầy đủ (admin / form) hoặc đổi muc_canh_bao
+- Sự kiện: signal low_stock_alert(sender=Tool, tool, alert, opened) gửi SAU commit
+  (receiver gửi MQTT / mail / ... không thấy dữ liệu chưa commit)
+- evaluate_all(): đồng bộ lại toàn bộ (command check_low_stock)
+"""
+import logging
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.dispatch import Signal
+from django.utils import timezone
+
+from ..models import LowStockAlert, Tool
+
+logger = logging.getLogger(__name__)
+
+# kwargs: tool, alert, opened (True = vừa xuống dưới mức, False = đã hồi)
+low_stock_alert = Signal()
+
+
+def _publish(tool: Tool, alert: LowStockAlert, opened: bool) -> None:
+    if opened:
+        logger.warning(f"[LOW_STOCK] {tool.ma_tool}: ton {alert.ton_kho} <= {alert.muc_canh_bao}")
+    else:
+        logger.info(f"[LOW_STOCK] {tool.ma_tool}: resolved, ton {alert.ton_kho_resolved}")
+    transaction.on_commit(lambda: low_stock_alert.send(sender=Tool, tool=tool, alert=alert, opened=opened))
+
+
+def evaluate(tool: Tool) -> Optional[LowStockAlert]:
+    """Mở / đóng cảnh báo cho 1 tool theo ton_kho, muc_canh_bao hiện tại. return alert vừa đổi (nếu có)."""
+    is_low = tool.is_low_stock
+    open_alert = LowStockAlert.objects.filter(tool=tool, resolved_at__isnull=True).first()
+
+    if is_low and open_alert is None:
+        try:
+            with transaction.atomic():
+                alert = LowStockAlert.objects.create(tool=tool, ton_kho=tool.ton_kho, muc_canh_bao=tool.muc_canh_bao)
+        except IntegrityError:
+            return None   # process khác vừa mở
+        _publish(tool, alert, opened=True)
+        return alert
+
+    if not is_low and open_alert is not None:
+        open_alert.resolved_at = timezone.now()
+        open_alert.ton_kho_resolved = tool.ton_kho
+        open_alert.save(update_fields=["resolved_at", "ton_kho_resolved"])
+        _publish(tool, open_alert, opened=False)
+        return open_alert
+
+    return None
+
+
+def breaches():
+    """Tool đang dưới mức cảnh báo + thời điểm mở cảnh báo (None nếu chưa evaluate)."""
+    opened = LowStockAlert.objects.filter(tool=OuterRef("pk"), resolved_at__isnull=True).values("opened_at")[:1]
+    return (
+        Tool.objects.low_stock()
+        .annotate(alert_opened_at=Subquery(opened))
+        .only("id", "ma_tool", "ten_tool", "ton_kho", "muc_canh_bao", "tu", "ngan", "may_uu_tien")
+    )
+
+
+def evaluate_all() -> dict:
+    """Mở cảnh báo cho tool thấp chưa có, đóng cảnh báo của tool đã hồi. Vài query, không duyệt toàn bộ tool."""
+    opened = resolved = 0
+    with transaction.atomic():
+        stale = (
+            LowStockAlert.objects
+            .filter(resolved_at__isnull=True)
+            .exclude(tool__in=Tool.objects.low_stock())
+            .select_related("tool")
+        )
+        for alert in stale:
+            if evaluate(alert.tool):
+                resolved += 1
+        missing = Tool.objects.low_stock().exclude(
+            id__in=LowStockAlert.objects.filter(resolved_at__isnull=True).values("tool_id")
+        )
+        for tool in missing:
+            if evaluate(tool):
+                opened += 1
+    return {"opened": opened, "resolved": resolved}
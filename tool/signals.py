@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Tool
+from .services.low_stock import evaluate
+
+# save(update_fields=["ton_kho"]) của mqtt_worker tự gọi evaluate() -> ở đây chỉ bắt save đầy đủ / đổi mức cảnh báo
+LOW_STOCK_FIELDS = {"muc_canh_bao"}
+
+
+@receiver(post_save, sender=Tool)
+def tool_low_stock_check(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is None or LOW_STOCK_FIELDS.intersection(update_fields):
+        evaluate(instance)
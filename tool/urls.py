@@ -12,4 +12,7 @@ urlpatterns = [
 
     # /tool/5/  -> profile chi tiết tool id=5
     path("<int:pk>/", views.tool_profile, name="tool_profile"),
+
+    # /tool/low-stock/  -> JSON tool dưới mức cảnh báo
+    path("low-stock/", views.low_stock_api, name="low_stock_api"),
 ]
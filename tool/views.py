@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from .models import Tool
+from .services.low_stock import breaches
 # nếu sau này có ToolIssueHistory thì import thêm ở đây:
 # from .models import ToolIssueHistory
 
@@ -137,3 +138,30 @@ def tool_create(request):
 def tool_list(request):
     tools = Tool.objects.all()
     return render(request, "tool_list.html", {"tools": tools})
+
+
+def low_stock_api(request):
+    """
+    GET /tool/low-stock/?may_uu_tien=...
+    Tool đang có ton_kho <= muc_canh_bao (lọc trong DB), kèm thời điểm mở cảnh báo.
+    """
+    qs = breaches()
+    line = request.GET.get("may_uu_tien", "").strip()
+    if line:
+        qs = qs.filter(may_uu_tien=line)
+    items = [
+        {
+            "id": t.id,
+            "ma_tool": t.ma_tool,
+            "ten_tool": t.ten_tool,
+            "ton_kho": t.ton_kho,
+            "muc_canh_bao": t.muc_canh_bao,
+            "thieu": t.muc_canh_bao - t.ton_kho,
+            "tu": t.tu,
+            "ngan": t.ngan,
+            "may_uu_tien": t.may_uu_tien,
+            "canh_bao_tu": t.alert_opened_at,
+        }
+        for t in qs
+    ]
+    return JsonResponse({"count": len(items), "items": items})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ToolTransaction
+from .models import StockMovement, StockSnapshot, ToolForecast, ToolTransaction, ToolUsageDaily
 
 
 @admin.register(ToolTransaction)
@@ -55,3 +55,62 @@ class ToolTransactionAdmin(admin.ModelAdmin):
     # (Tuỳ bạn) cho xoá hay không — mình khuyên là KHÔNG
     def has_delete_permission(self, request, obj=None):
         return True
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("id", "created_at", "tool", "loai", "delta", "ton_sau", "transaction")
+    list_filter = ("loai", "created_at")
+    search_fields = ("tool__ma_tool", "tool__ten_tool")
+    ordering = ("-created_at",)
+    list_select_related = ("tool",)
+
+    # sổ cái chỉ ghi thêm
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("taken_at", "tool", "ton_kho")
+    list_filter = ("taken_at",)
+    search_fields = ("tool__ma_tool", "tool__ten_tool")
+    list_select_related = ("tool",)
+
+
+@admin.register(ToolUsageDaily)
+class ToolUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ("day", "tool", "ma_du_an", "may_uu_tien", "qty_export", "qty_import", "qty_return", "tx_count")
+    list_filter = ("day", "may_uu_tien")
+    search_fields = ("tool__ma_tool", "ma_du_an")
+    list_select_related = ("tool",)
+    date_hierarchy = "day"
+
+    # bảng tính sẵn: sửa bằng rebuild_tool_usage
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ToolForecast)
+class ToolForecastAdmin(admin.ModelAdmin):
+    list_display = ("tool", "method", "weekly_demand", "sigma", "adi", "nonzero_weeks", "history_weeks",
+                    "suggested_muc_canh_bao", "computed_at")
+    list_filter = ("method",)
+    search_fields = ("tool__ma_tool", "tool__ten_tool")
+    list_select_related = ("tool",)
+
+    # bảng tính sẵn: sửa bằng forecast_demand
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ToolMuontraConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tool_muontra'
+
+    def ready(self):
+        # ghi OPENING vào sổ cái khi tạo Tool
+        from . import signals  # noqa: F401
@@ -0,0 +1,2 @@
+# tool_muontra/management/__init__.py
+# Để Django nhận đây là package Python
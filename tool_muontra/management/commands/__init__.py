@@ -0,0 +1,2 @@
+# tool_muontra/management/commands/__init__.py
+# Để Django load được các lệnh custom (snapshot_stock, rebuild_tool_usage, forecast_demand)
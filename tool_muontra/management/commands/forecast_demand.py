@@ -0,0 +1,35 @@
+# tool_muontra/management/commands/forecast_demand.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tool_muontra.services import forecast
+
+
+class Command(BaseCommand):
+    help = "Dự báo nhu cầu xuất tool theo tuần (SES / Croston) và tính mức cảnh báo đề xuất (ToolForecast)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--weeks", type=int, default=None, help="Số tuần lịch sử (mặc định FORECAST_WEEKS)")
+        parser.add_argument("--alpha", type=float, default=None, help="Hệ số san bằng 0..1 (mặc định FORECAST_ALPHA)")
+        parser.add_argument("--lead", type=float, default=None, help="Lead time (tuần, mặc định FORECAST_LEAD_TIME_WEEKS)")
+        parser.add_argument("--z", type=float, default=None, help="Hệ số an toàn (mặc định FORECAST_SERVICE_Z)")
+        parser.add_argument("--apply", action="store_true", help="Ghi mức đề xuất vào Tool.muc_canh_bao")
+
+    def handle(self, *args, **options):
+        if options["weeks"] is not None and options["weeks"] < forecast.MIN_HISTORY_WEEKS:
+            raise CommandError(f"--weeks phải >= {forecast.MIN_HISTORY_WEEKS}")
+        if options["alpha"] is not None and not 0 < options["alpha"] <= 1:
+            raise CommandError("--alpha phải trong (0, 1]")
+        if options["lead"] is not None and options["lead"] <= 0:
+            raise CommandError("--lead phải > 0")
+
+        r = forecast.run(n_weeks=options["weeks"], a=options["alpha"], lead=options["lead"], z=options["z"])
+        engine = "numpy" if forecast.np is not None else "python"
+        self.stdout.write(self.style.SUCCESS(
+            f"[FORECAST] {r['tools']} tool (SES {r['ses']}, Croston {r['croston']}) [{engine}]"
+        ))
+        if options["apply"]:
+            a = forecast.apply_suggestions()
+            self.stdout.write(self.style.SUCCESS(
+                f"[FORECAST] muc_canh_bao cập nhật {a['updated']} tool; cảnh báo mở {a['opened']}, đóng {a['resolved']}"
+            ))
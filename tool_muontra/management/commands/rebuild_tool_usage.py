@@ -0,0 +1,22 @@
+# tool_muontra/management/commands/rebuild_tool_usage.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from tool_muontra.services.usage_rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = "Tính lại rollup tiêu hao theo ngày (ToolUsageDaily) từ ToolTransaction SUCCESS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", default=None, help="Chỉ tính lại từ ngày này (YYYY-MM-DD); mặc định toàn bộ")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError(f"--since không hợp lệ: {options['since']}")
+        n = rebuild(since)
+        self.stdout.write(self.style.SUCCESS(f"[USAGE] {n} dòng rollup" + (f" từ {since}" if since else "")))
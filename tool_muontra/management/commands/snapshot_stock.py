@@ -0,0 +1,44 @@
+# tool_muontra/management/commands/snapshot_stock.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from tool_muontra.models import StockSnapshot
+from tool_muontra.services.stock_ledger import backfill_transactions, reconcile, take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Chốt tồn kho tool từ sổ cái StockMovement (chạy định kỳ, vd cron mỗi đêm). "
+        "Lần đầu: --backfill --reconcile để nạp giao dịch cũ + tồn đầu kỳ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", action="store_true",
+                            help="Nạp ToolTransaction SUCCESS cũ vào sổ cái (chỉ khi chưa có snapshot)")
+        parser.add_argument("--reconcile", action="store_true",
+                            help="Ghi OPENING / ADJUST cho khớp Tool.ton_kho hiện tại")
+        parser.add_argument("--at", default=None, help="Thời điểm chốt (ISO 8601, mặc định now - 1 phút)")
+        parser.add_argument("--no-snapshot", action="store_true", help="Chỉ backfill / reconcile, không chốt")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            if StockSnapshot.objects.exists():
+                raise CommandError("Đã có snapshot: backfill sẽ làm sai tồn quá khứ đã chốt. Xoá snapshot trước nếu thật sự cần.")
+            n = backfill_transactions()
+            self.stdout.write(f"[LEDGER] backfill {n} giao dịch")
+
+        if options["reconcile"]:
+            n = reconcile()
+            self.stdout.write(f"[LEDGER] reconcile: {n} dòng OPENING / ADJUST")
+
+        if options["no_snapshot"]:
+            return
+
+        at = None
+        if options["at"]:
+            at = parse_datetime(options["at"])
+            if at is None:
+                raise CommandError(f"--at không hợp lệ: {options['at']}")
+        n = take_snapshots(at)
+        self.stdout.write(self.style.SUCCESS(f"[LEDGER] snapshot {n} tool"))
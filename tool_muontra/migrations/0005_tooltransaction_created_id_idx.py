@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool_muontra', '0004_tooltransaction_ly_do_fail_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tooltransaction',
+            index=models.Index(fields=['created_at', 'id'], name='tool_muontr_created_a3063d_idx'),
+        ),
+    ]
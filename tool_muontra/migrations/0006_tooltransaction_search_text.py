@@ -0,0 +1,99 @@
+import logging
+import unicodedata
+
+from django.db import OperationalError, migrations, models
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'tool_muontra_tooltransaction'
+FTS = TABLE + '_fts'
+BATCH = 1000
+
+
+# ----- bản sao logic lúc viết migration (không import module runtime: sửa module sau này
+# không được làm đổi / hỏng migration cũ) -----
+def _fold(s):
+    t = (s or '').lower().replace('đ', 'd')
+    t = unicodedata.normalize('NFD', t)
+    return ''.join(ch for ch in t if unicodedata.category(ch) != 'Mn')
+
+
+def _search_text(*parts):
+    return ' '.join(_fold(str(p)).strip() for p in parts if p)
+
+
+def _drop_fts(connection):
+    with connection.cursor() as cur:
+        for suffix in ('ai', 'ad', 'au'):
+            cur.execute(f'DROP TRIGGER IF EXISTS {FTS}_{suffix}')
+        cur.execute(f'DROP TABLE IF EXISTS {FTS}')
+
+
+def add_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS} USING fts5("
+        f"search_text, content='{TABLE}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS}_ai AFTER INSERT ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS}(rowid, search_text) VALUES (new.id, new.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS}_ad AFTER DELETE ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS}({FTS}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS}_au AFTER UPDATE OF search_text ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS}({FTS}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+        f"INSERT INTO {FTS}(rowid, search_text) VALUES (new.id, new.search_text); END",
+        f"INSERT INTO {FTS}({FTS}) VALUES ('rebuild')",
+    ]
+    try:
+        with connection.cursor() as cur:
+            for sql in statements:
+                cur.execute(sql)
+    except OperationalError as e:
+        # SQLite < 3.34 (chưa có tokenizer trigram) / build không có FTS5 -> runtime dùng LIKE
+        logger.warning(f'[HISTORY_SEARCH] FTS5 trigram unavailable for {TABLE}: {e}')
+        _drop_fts(connection)
+
+
+def remove_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        _drop_fts(schema_editor.connection)
+
+
+def _backfill(model, qs, parts_of):
+    batch = []
+    for obj in qs.iterator(chunk_size=BATCH):
+        obj.search_text = _search_text(*parts_of(obj))
+        batch.append(obj)
+        if len(batch) >= BATCH:
+            model.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['search_text'])
+
+
+def fill_search_text(apps, schema_editor):
+    ToolTransaction = apps.get_model('tool_muontra', 'ToolTransaction')
+    _backfill(
+        ToolTransaction,
+        ToolTransaction.objects.select_related('tool'),
+        lambda t: (t.tool.ma_tool, t.tool.ten_tool, t.ma_du_an, t.ghi_chu),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0004_tool_tu_ngan_idx'),
+        ('tool_muontra', '0005_tooltransaction_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tooltransaction',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_fts, remove_fts),
+    ]
@@ -0,0 +1,47 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0004_tool_tu_ngan_idx'),
+        ('tool_muontra', '0006_tooltransaction_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('loai', models.CharField(choices=[('EXPORT', 'Xuất kho'), ('IMPORT', 'Nhập kho'), ('RETURN', 'Trả lại kho'), ('OPENING', 'Tồn đầu kỳ'), ('ADJUST', 'Điều chỉnh theo tồn thực tế')], max_length=20)),
+                ('delta', models.IntegerField(verbose_name='Thay đổi tồn (+ nhập / - xuất)')),
+                ('ton_sau', models.PositiveIntegerField(verbose_name='Tồn sau (Tool.ton_kho lúc ghi)')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='tool.tool')),
+                ('transaction', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movement', to='tool_muontra.tooltransaction')),
+            ],
+            options={
+                'verbose_name': 'Biến động tồn kho',
+                'verbose_name_plural': 'Biến động tồn kho',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['tool', 'created_at'], name='tool_muontr_tool_id_84c2b8_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('ton_kho', models.IntegerField()),
+                ('tool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='tool.tool')),
+            ],
+            options={
+                'verbose_name': 'Chốt tồn kho',
+                'verbose_name_plural': 'Chốt tồn kho',
+                'ordering': ['-taken_at'],
+                'constraints': [models.UniqueConstraint(fields=('tool', 'taken_at'), name='uniq_stock_snapshot_tool_taken_at')],
+            },
+        ),
+    ]
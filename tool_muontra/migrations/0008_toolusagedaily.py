@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0004_tool_tu_ngan_idx'),
+        ('tool_muontra', '0007_stockmovement_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ToolUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Ngày')),
+                ('ma_du_an', models.CharField(blank=True, default='', max_length=100)),
+                ('may_uu_tien', models.CharField(blank=True, default='', max_length=100)),
+                ('qty_export', models.PositiveIntegerField(default=0, verbose_name='SL xuất')),
+                ('qty_import', models.PositiveIntegerField(default=0, verbose_name='SL nhập')),
+                ('qty_return', models.PositiveIntegerField(default=0, verbose_name='SL trả')),
+                ('tx_count', models.PositiveIntegerField(default=0, verbose_name='Số giao dịch')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_daily', to='tool.tool')),
+            ],
+            options={
+                'verbose_name': 'Tiêu hao theo ngày',
+                'verbose_name_plural': 'Tiêu hao theo ngày',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'tool', 'ma_du_an'), name='uniq_tool_usage_daily')],
+                'indexes': [
+                    models.Index(fields=['tool', 'day'], name='tool_muontr_tool_id_00e89a_idx'),
+                    models.Index(fields=['ma_du_an', 'day'], name='tool_muontr_ma_du_a_e10b95_idx'),
+                    models.Index(fields=['may_uu_tien', 'day'], name='tool_muontr_may_uu__57bc64_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0005_lowstock'),
+        ('tool_muontra', '0008_toolusagedaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ToolForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('SES', 'San bằng mũ đơn (nhu cầu đều)'), ('CROSTON', 'Croston / SBA (nhu cầu gián đoạn)')], max_length=10)),
+                ('weekly_demand', models.FloatField(verbose_name='Nhu cầu dự báo / tuần')),
+                ('sigma', models.FloatField(verbose_name='Độ lệch sai số 1 tuần')),
+                ('adi', models.FloatField(blank=True, null=True, verbose_name='Khoảng cách TB giữa 2 tuần có xuất')),
+                ('history_weeks', models.PositiveIntegerField(verbose_name='Số tuần lịch sử')),
+                ('nonzero_weeks', models.PositiveIntegerField(verbose_name='Số tuần có xuất')),
+                ('suggested_muc_canh_bao', models.PositiveIntegerField(verbose_name='Mức cảnh báo đề xuất')),
+                ('computed_at', models.DateTimeField()),
+                ('tool', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='tool.tool')),
+            ],
+            options={
+                'verbose_name': 'Dự báo nhu cầu tool',
+                'verbose_name_plural': 'Dự báo nhu cầu tool',
+                'ordering': ['-weekly_demand'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_may_uu_tien(apps, schema_editor):
+    # giao dịch cũ không biết line lúc đó -> lấy line hiện tại của tool (chỉ 1 lần, lúc migrate)
+    Tool = apps.get_model('tool', 'Tool')
+    ToolTransaction = apps.get_model('tool_muontra', 'ToolTransaction')
+    line = Tool.objects.filter(pk=OuterRef('tool_id')).values('may_uu_tien')[:1]
+    ToolTransaction.objects.update(may_uu_tien=Coalesce(Subquery(line), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tool', '0005_lowstock'),
+        ('tool_muontra', '0009_toolforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tooltransaction',
+            name='may_uu_tien',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_may_uu_tien, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='toolusagedaily',
+            name='uniq_tool_usage_daily',
+        ),
+        migrations.AddConstraint(
+            model_name='toolusagedaily',
+            constraint=models.UniqueConstraint(fields=('day', 'tool', 'ma_du_an', 'may_uu_tien'), name='uniq_tool_usage_daily_line'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from lookup.services.shared.history_search import build_search_text
 from tool.models import Tool
 
 
@@ -40,6 +42,8 @@ class ToolTransaction(models.Model):
     # Các thông tin phụ
     ma_du_an = models.CharField(max_length=100, blank=True)
     ghi_chu = models.TextField(blank=True)
+    # line máy ưu tiên của tool lúc tạo giao dịch (chụp từ Tool.may_uu_tien, đổi line sau không ảnh hưởng)
+    may_uu_tien = models.CharField(max_length=100, blank=True, default="", editable=False)
 
     # Ai thực hiện
     nguoi_thuc_hien = models.ForeignKey(
@@ -74,6 +78,166 @@ class ToolTransaction(models.Model):
         help_text="ID giao dịch để map giữa Django và ESP32.",
     )
 
+    # chuỗi tìm kiếm đã bỏ dấu: mã + tên tool (chụp lúc tạo), mã dự án, ghi chú
+    # (FTS5 trigram trên SQLite, xem lookup/services/shared/history_search.py)
+    search_text = models.TextField(blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"]),   # keyset lịch sử (history_tool)
+        ]
+
     # -----------------------------
     def __str__(self):
         return f"{self.loai} - {self.tool.ma_tool} - SL: {self.so_luong}"
+
+    def search_parts(self):
+        return (self.tool.ma_tool, self.tool.ten_tool, self.ma_du_an, self.ghi_chu)
+
+    def save(self, *args, **kwargs):
+        # save(update_fields=...) của mqtt_worker không đụng field tìm kiếm -> khỏi tính lại
+        if self._state.adding and not self.may_uu_tien:
+            self.may_uu_tien = self.tool.may_uu_tien or ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"ma_du_an", "ghi_chu", "tool"}.intersection(update_fields):
+            self.search_text = build_search_text(*self.search_parts())
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+
+
+class StockMovement(models.Model):
+    """
+    Sổ cái tồn kho tool: CHỈ GHI THÊM, mỗi lần tồn đổi = 1 dòng (delta có dấu).
+
+    - mqtt_worker.process_tool_success: 1 dòng / ToolTransaction SUCCESS (cùng transaction.atomic)
+    - OPENING: tồn lúc tạo Tool (signal) / tồn đầu kỳ dữ liệu cũ; ADJUST: chênh lệch với Tool.ton_kho
+      (command snapshot_stock --reconcile)
+    Tồn tại thời điểm T = StockSnapshot gần nhất <= T + tổng delta sau đó (tool_muontra/services/stock_ledger.py).
+    """
+
+    OPENING = "OPENING"
+    ADJUST = "ADJUST"
+    LOAI_CHOICES = ToolTransaction.LOAI_CHOICES + [
+        (OPENING, "Tồn đầu kỳ"),
+        (ADJUST, "Điều chỉnh theo tồn thực tế"),
+    ]
+
+    tool = models.ForeignKey(Tool, on_delete=models.CASCADE, related_name="stock_movements")
+    transaction = models.OneToOneField(
+        ToolTransaction,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="stock_movement",
+    )
+    loai = models.CharField(max_length=20, choices=LOAI_CHOICES)
+    delta = models.IntegerField(verbose_name="Thay đổi tồn (+ nhập / - xuất)")
+    ton_sau = models.PositiveIntegerField(verbose_name="Tồn sau (Tool.ton_kho lúc ghi)")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Biến động tồn kho"
+        verbose_name_plural = "Biến động tồn kho"
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(fields=["tool", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.tool_id} {self.loai} {self.delta:+d} -> {self.ton_sau}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("StockMovement chỉ ghi thêm, không sửa dòng cũ.")
+        super().save(*args, **kwargs)
+
+
+class StockSnapshot(models.Model):
+    """Tồn của 1 tool tại taken_at (tính từ sổ cái), chụp định kỳ bằng command snapshot_stock."""
+
+    tool = models.ForeignKey(Tool, on_delete=models.CASCADE, related_name="stock_snapshots")
+    taken_at = models.DateTimeField()
+    ton_kho = models.IntegerField()
+
+    class Meta:
+        verbose_name = "Chốt tồn kho"
+        verbose_name_plural = "Chốt tồn kho"
+        ordering = ["-taken_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["tool", "taken_at"], name="uniq_stock_snapshot_tool_taken_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.tool_id} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.ton_kho}"
+
+
+class ToolUsageDaily(models.Model):
+    """
+    Rollup tiêu hao theo ngày: 1 dòng / (ngày, tool, mã dự án, line máy), chỉ tính giao dịch SUCCESS.
+
+    - mqtt_worker.process_tool_success cộng dồn ngay (tool_muontra/services/usage_rollup.py)
+    - command rebuild_tool_usage tính lại từ ToolTransaction khi cần
+    API thống kê (theo tool / dự án / line máy / tuần) đọc bảng này, không GROUP BY ToolTransaction.
+    """
+
+    day = models.DateField(verbose_name="Ngày")
+    tool = models.ForeignKey(Tool, on_delete=models.CASCADE, related_name="usage_daily")
+    ma_du_an = models.CharField(max_length=100, blank=True, default="")
+    # line máy ưu tiên của tool tại thời điểm giao dịch (ToolTransaction.may_uu_tien)
+    may_uu_tien = models.CharField(max_length=100, blank=True, default="")
+
+    qty_export = models.PositiveIntegerField(default=0, verbose_name="SL xuất")
+    qty_import = models.PositiveIntegerField(default=0, verbose_name="SL nhập")
+    qty_return = models.PositiveIntegerField(default=0, verbose_name="SL trả")
+    tx_count = models.PositiveIntegerField(default=0, verbose_name="Số giao dịch")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tiêu hao theo ngày"
+        verbose_name_plural = "Tiêu hao theo ngày"
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "tool", "ma_du_an", "may_uu_tien"], name="uniq_tool_usage_daily_line"),
+        ]
+        indexes = [
+            models.Index(fields=["tool", "day"]),
+            models.Index(fields=["ma_du_an", "day"]),
+            models.Index(fields=["may_uu_tien", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.tool_id} {self.ma_du_an or '-'}: -{self.qty_export} +{self.qty_import} +{self.qty_return}"
+
+
+class ToolForecast(models.Model):
+    """
+    Kết quả dự báo nhu cầu tuần (cache cho dashboard), 1 dòng / tool, ghi đè mỗi lần chạy
+    command forecast_demand (tool_muontra/services/forecast.py).
+    """
+
+    SES = "SES"
+    CROSTON = "CROSTON"
+    METHOD_CHOICES = [
+        (SES, "San bằng mũ đơn (nhu cầu đều)"),
+        (CROSTON, "Croston / SBA (nhu cầu gián đoạn)"),
+    ]
+
+    tool = models.OneToOneField(Tool, on_delete=models.CASCADE, related_name="forecast")
+    method = models.CharField(max_length=10, choices=METHOD_CHOICES)
+    weekly_demand = models.FloatField(verbose_name="Nhu cầu dự báo / tuần")
+    sigma = models.FloatField(verbose_name="Độ lệch sai số 1 tuần")
+    adi = models.FloatField(null=True, blank=True, verbose_name="Khoảng cách TB giữa 2 tuần có xuất")
+    history_weeks = models.PositiveIntegerField(verbose_name="Số tuần lịch sử")
+    nonzero_weeks = models.PositiveIntegerField(verbose_name="Số tuần có xuất")
+    suggested_muc_canh_bao = models.PositiveIntegerField(verbose_name="Mức cảnh báo đề xuất")
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Dự báo nhu cầu tool"
+        verbose_name_plural = "Dự báo nhu cầu tool"
+        ordering = ["-weekly_demand"]
+
+    def __str__(self):
+        return f"{self.tool_id} {self.method}: {self.weekly_demand:.2f}/tuần -> {self.suggested_muc_canh_bao}"
@@ -0,0 +1,221 @@
+"""
+Dự báo nhu cầu xuất tool theo tuần + đề xuất muc_canh_bao (cache trong ToolForecast).
+
+- Dữ liệu: rollup ToolUsageDaily (qty_export) GROUP BY tuần -> ma trận tool x tuần,
+  mỗi tool tính từ tuần đầu tiên có xuất (tool mới không bị kéo thấp bởi các tuần 0 trước đó)
+- Phân loại theo ADI (số tuần / số tuần có xuất):
+  * ADI <= 1.32: nhu cầu đều -> san bằng mũ đơn (SES)
+  * ADI >  1.32: nhu cầu gián đoạn -> Croston hiệu chỉnh SBA (cỡ xuất / khoảng cách, nhân 1 - alpha/2)
+- Có numpy: 1 vòng theo tuần, mỗi bước tính vector cho mọi tool cùng lúc;
+  không có numpy: cùng thuật toán, vòng theo từng tool (chậm hơn, kết quả như nhau)
+- Mức cảnh báo đề xuất = nhu cầu x L + z x sigma x sqrt(L)   (L = lead time tính bằng tuần)
+- apply_suggestions(): ghi đề xuất vào Tool.muc_canh_bao (1 UPDATE) rồi đồng bộ LowStockAlert
+
+Settings:
+  FORECAST_WEEKS            104   số tuần lịch sử đọc
+  FORECAST_ALPHA            0.1   hệ số san bằng
+  FORECAST_LEAD_TIME_WEEKS  2     thời gian bổ sung hàng
+  FORECAST_SERVICE_Z        1.65  hệ số an toàn (~95% không hết hàng trong lead time)
+"""
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from tool.models import Tool
+from tool.services.low_stock import evaluate_all
+
+from ..models import ToolForecast, ToolUsageDaily
+
+try:
+    import numpy as np
+except ImportError:  # numpy là optional: không có thì tính từng tool bằng Python thuần
+    np = None
+
+ADI_CUTOFF = 1.32          # ngưỡng Syntetos-Boylan: trên mức này coi là nhu cầu gián đoạn
+MIN_HISTORY_WEEKS = 4      # ít hơn -> chưa đủ dữ liệu, không dự báo
+
+# (ses, sigma_ses, sba, sigma_sba, số tuần lịch sử, số tuần có xuất)
+Fit = Tuple[float, float, float, float, int, int]
+
+
+def weeks() -> int:
+    return getattr(settings, "FORECAST_WEEKS", 104)
+
+
+def alpha() -> float:
+    return getattr(settings, "FORECAST_ALPHA", 0.1)
+
+
+def lead_time_weeks() -> float:
+    return getattr(settings, "FORECAST_LEAD_TIME_WEEKS", 2)
+
+
+def service_z() -> float:
+    return getattr(settings, "FORECAST_SERVICE_Z", 1.65)
+
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+# ===================== Dữ liệu =====================
+def weekly_series(n_weeks: int, today: Optional[date] = None) -> Tuple[List[int], Dict[int, Dict[int, float]], int]:
+    """
+    Tổng xuất theo tuần (chỉ các tuần đã trọn, bỏ tuần hiện tại) trong n_weeks tuần gần nhất.
+    return (tool_ids, {tool_id: {chỉ số tuần: SL}}, số tuần)
+    """
+    end = week_start(today or timezone.localdate())
+    start = end - timedelta(weeks=n_weeks)
+    rows = (
+        ToolUsageDaily.objects
+        .filter(day__gte=start, day__lt=end, qty_export__gt=0)
+        .annotate(week=TruncWeek("day"))
+        .values_list("tool_id", "week")
+        .annotate(qty=Sum("qty_export"))
+        .order_by()
+    )
+    series: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for tool_id, week, qty in rows.iterator(chunk_size=5000):
+        series[tool_id][(week - start).days // 7] = float(qty)
+    return sorted(series), series, n_weeks
+
+
+# ===================== Mô hình =====================
+def _fit_row(ys: Sequence[float], a: float) -> Fit:
+    """SES + Croston/SBA cho 1 chuỗi, bắt đầu từ tuần có xuất đầu tiên."""
+    first = next(i for i, y in enumerate(ys) if y > 0)
+    ys = ys[first:]
+    nonzero = [y for y in ys if y > 0]
+    n, k = len(ys), len(nonzero)
+
+    # khởi tạo bằng trung bình cả chuỗi (tránh lệch theo tuần đầu)
+    level = sum(ys) / n
+    size, interval = sum(nonzero) / k, n / k
+    sse_ses = sse_sba = 0.0
+    since = 0
+    for y in ys:
+        sba = (1 - a / 2) * size / interval
+        sse_ses += (y - level) ** 2
+        sse_sba += (y - sba) ** 2
+        level += a * (y - level)
+        since += 1
+        if y > 0:
+            size += a * (y - size)
+            interval += a * (since - interval)
+            since = 0
+    sba = (1 - a / 2) * size / interval
+    return level, math.sqrt(sse_ses / n), sba, math.sqrt(sse_sba / n), n, k
+
+
+def _fit_matrix(Y, a: float) -> List[Fit]:
+    """Như _fit_row cho mọi dòng của Y (tool x tuần) cùng lúc; mỗi dòng có ít nhất 1 tuần > 0."""
+    T, W = Y.shape
+    has = Y > 0
+    first = has.argmax(axis=1)
+    n = W - first
+    k = has.sum(axis=1)
+    total = Y.sum(axis=1)
+
+    level = total / n
+    size = total / k
+    interval = n / k
+    sse_ses = np.zeros(T)
+    sse_sba = np.zeros(T)
+    since = np.zeros(T)
+    for t in range(W):
+        active = first <= t
+        y = Y[:, t]
+        nz = has[:, t]
+        sba = (1 - a / 2) * size / interval
+        sse_ses += np.where(active, (y - level) ** 2, 0.0)
+        sse_sba += np.where(active, (y - sba) ** 2, 0.0)
+        level = np.where(active, level + a * (y - level), level)
+        since = since + active
+        size = np.where(nz, size + a * (y - size), size)
+        interval = np.where(nz, interval + a * (since - interval), interval)
+        since = np.where(nz, 0, since)
+    sba = (1 - a / 2) * size / interval
+    return list(zip(
+        level.tolist(), np.sqrt(sse_ses / n).tolist(), sba.tolist(), np.sqrt(sse_sba / n).tolist(),
+        n.tolist(), k.tolist(),
+    ))
+
+
+def fit(tool_ids: List[int], series: Dict[int, Dict[int, float]], n_weeks: int, a: float) -> List[Fit]:
+    if np is not None:
+        Y = np.zeros((len(tool_ids), n_weeks))
+        for row, tool_id in enumerate(tool_ids):
+            cols = series[tool_id]
+            Y[row, list(cols)] = list(cols.values())
+        return _fit_matrix(Y, a)
+
+    fits = []
+    for tool_id in tool_ids:
+        ys = [0.0] * n_weeks
+        for col, qty in series[tool_id].items():
+            ys[col] = qty
+        fits.append(_fit_row(ys, a))
+    return fits
+
+
+def reorder_level(demand: float, sigma: float, lead: float, z: float) -> int:
+    return max(0, math.ceil(demand * lead + z * sigma * math.sqrt(lead)))
+
+
+# ===================== Chạy / ghi cache =====================
+def run(n_weeks: Optional[int] = None, a: Optional[float] = None,
+        lead: Optional[float] = None, z: Optional[float] = None) -> Dict[str, int]:
+    """Tính lại ToolForecast cho mọi tool có xuất trong cửa sổ; tool không còn đủ dữ liệu bị xoá khỏi cache."""
+    n_weeks = n_weeks or weeks()
+    a = alpha() if a is None else a
+    lead = lead_time_weeks() if lead is None else lead
+    z = service_z() if z is None else z
+
+    tool_ids, series, n_weeks = weekly_series(n_weeks)
+    now = timezone.now()
+    rows = []
+    for tool_id, (ses, sigma_ses, sba, sigma_sba, n, k) in zip(tool_ids, fit(tool_ids, series, n_weeks, a)):
+        if n < MIN_HISTORY_WEEKS:
+            continue
+        adi = n / k
+        if adi > ADI_CUTOFF:
+            method, demand, sigma = ToolForecast.CROSTON, sba, sigma_sba
+        else:
+            method, demand, sigma = ToolForecast.SES, ses, sigma_ses
+        rows.append(ToolForecast(
+            tool_id=tool_id, method=method, weekly_demand=round(demand, 4), sigma=round(sigma, 4),
+            adi=round(adi, 4), history_weeks=n, nonzero_weeks=k,
+            suggested_muc_canh_bao=reorder_level(demand, sigma, lead, z), computed_at=now,
+        ))
+
+    with transaction.atomic():
+        ToolForecast.objects.exclude(tool_id__in=[r.tool_id for r in rows]).delete()
+        ToolForecast.objects.bulk_create(
+            rows,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=["tool"],
+            update_fields=["method", "weekly_demand", "sigma", "adi", "history_weeks",
+                           "nonzero_weeks", "suggested_muc_canh_bao", "computed_at"],
+        )
+    counts = defaultdict(int)
+    for r in rows:
+        counts[r.method] += 1
+    return {"tools": len(rows), "ses": counts[ToolForecast.SES], "croston": counts[ToolForecast.CROSTON]}
+
+
+def apply_suggestions() -> Dict[str, int]:
+    """muc_canh_bao := mức đề xuất cho mọi tool có dự báo (1 UPDATE), rồi mở / đóng cảnh báo tồn thấp."""
+    suggested = ToolForecast.objects.filter(tool=OuterRef("pk")).values("suggested_muc_canh_bao")[:1]
+    with transaction.atomic():
+        updated = Tool.objects.filter(forecast__isnull=False).update(muc_canh_bao=Subquery(suggested))
+        # update() không qua signal -> đồng bộ LowStockAlert 1 lượt
+        alerts = evaluate_all()
+    return {"updated": updated, **alerts}
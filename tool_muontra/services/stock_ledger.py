@@ -0,0 +1,182 @@
+"""
+Sổ cái tồn kho tool (StockMovement, chỉ ghi thêm) + chốt tồn định kỳ (StockSnapshot).
+
+    stock_at(tool_id, T)      = snapshot gần nhất <= T  +  Σ delta trong (snapshot.taken_at, T]
+    consumption(tool_id, a, b) = Σ |delta| của EXPORT trong [a, b)
+Cả hai đọc theo index (tool, created_at) / unique (tool, taken_at): không cộng dồn bảng ToolTransaction.
+
+- record_transaction(): gọi trong transaction.atomic của mqtt_worker.process_tool_success
+- open_tool(): OPENING khi tạo Tool mới (tool_muontra/signals.py)
+- take_snapshots(): command snapshot_stock (cron, vd mỗi đêm); chụp tại now - SNAPSHOT_LAG
+  để giao dịch đang commit dở không bị bỏ sót
+- reconcile(): ghi OPENING / ADJUST cho phần chênh giữa sổ cái và Tool.ton_kho
+  (tồn nhập tay trong admin, dữ liệu có trước sổ cái)
+- backfill_transactions(): nạp các ToolTransaction SUCCESS cũ chưa có trong sổ cái
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Min, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from tool.models import Tool
+
+from ..models import StockMovement, StockSnapshot, ToolTransaction
+
+SNAPSHOT_LAG = timedelta(minutes=1)
+
+
+def record_transaction(tx: ToolTransaction, ton_truoc: int, ton_sau: int) -> StockMovement:
+    return StockMovement.objects.create(
+        tool_id=tx.tool_id,
+        transaction=tx,
+        loai=tx.loai,
+        delta=ton_sau - ton_truoc,
+        ton_sau=ton_sau,
+    )
+
+
+# ===================== Đọc =====================
+def _latest_snapshot(tool_id: int, at: datetime) -> Optional[StockSnapshot]:
+    return (
+        StockSnapshot.objects
+        .filter(tool_id=tool_id, taken_at__lte=at)
+        .order_by("-taken_at")
+        .only("taken_at", "ton_kho")
+        .first()
+    )
+
+
+def stock_at(tool_id: int, at: datetime) -> int:
+    snap = _latest_snapshot(tool_id, at)
+    moves = StockMovement.objects.filter(tool_id=tool_id, created_at__lte=at)
+    if snap is not None:
+        moves = moves.filter(created_at__gt=snap.taken_at)
+    base = snap.ton_kho if snap is not None else 0
+    return base + (moves.aggregate(s=Sum("delta"))["s"] or 0)
+
+
+def consumption(tool_id: int, start: datetime, end: datetime) -> int:
+    """Số lượng đã xuất (EXPORT) trong [start, end)."""
+    total = (
+        StockMovement.objects
+        .filter(tool_id=tool_id, loai=ToolTransaction.EXPORT, created_at__gte=start, created_at__lt=end)
+        .aggregate(s=Sum("delta"))["s"]
+    )
+    return -(total or 0)
+
+
+def ledger_balances(at: Optional[datetime] = None) -> Dict[int, int]:
+    """Tồn theo sổ cái của mọi tool có dữ liệu, tại `at` (mặc định: bây giờ)."""
+    at = at or timezone.now()
+    latest = (
+        StockSnapshot.objects
+        .filter(tool_id=OuterRef("tool_id"), taken_at__lte=at)
+        .order_by("-taken_at")
+    )
+    snaps = {
+        tool_id: (taken_at, ton_kho)
+        for tool_id, taken_at, ton_kho in (
+            StockSnapshot.objects
+            .filter(taken_at__lte=at, id=Subquery(latest.values("id")[:1]))
+            .values_list("tool_id", "taken_at", "ton_kho")
+        )
+    }
+    balances = {tool_id: ton for tool_id, (_, ton) in snaps.items()}
+    moves = StockMovement.objects.filter(created_at__lte=at)
+    if snaps:
+        # chỉ quét delta sau snapshot cũ nhất (+ toàn bộ tool chưa có snapshot)
+        oldest = min(taken_at for taken_at, _ in snaps.values())
+        moves = moves.filter(Q(created_at__gt=oldest) | ~Q(tool_id__in=list(snaps)))
+    for tool_id, created_at, delta in moves.values_list("tool_id", "created_at", "delta").iterator(chunk_size=5000):
+        snap = snaps.get(tool_id)
+        if snap is not None and created_at <= snap[0]:
+            continue
+        balances[tool_id] = balances.get(tool_id, 0) + delta
+    return balances
+
+
+# ===================== Ghi định kỳ =====================
+def take_snapshots(at: Optional[datetime] = None) -> int:
+    at = at or (timezone.now() - SNAPSHOT_LAG)
+    balances = ledger_balances(at)
+    StockSnapshot.objects.bulk_create(
+        [StockSnapshot(tool_id=tool_id, taken_at=at, ton_kho=ton) for tool_id, ton in balances.items()],
+        ignore_conflicts=True,
+    )
+    return len(balances)
+
+
+def open_tool(tool: Tool) -> StockMovement:
+    """OPENING = tồn lúc tạo tool (signal post_save created) -> reconcile() không phải đoán tồn đầu kỳ."""
+    ton = tool.ton_kho or 0
+    return StockMovement.objects.create(tool_id=tool.id, loai=StockMovement.OPENING, delta=ton, ton_sau=ton)
+
+
+def reconcile() -> int:
+    """
+    Ghi OPENING (tool chưa có sổ cái) / ADJUST (lệch) cho khớp Tool.ton_kho. return số dòng ghi.
+    OPENING đặt ngay trước biến động đầu tiên của tool -> stock_at() quá khứ vẫn đúng sau backfill.
+    Snapshot đã chụp sau thời điểm dòng mới được cộng thêm delta (nếu không stock_at() đọc
+    snapshot rồi bỏ qua dòng ghi lùi ngày, và mọi snapshot sau đó mang theo sai số).
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        balances = ledger_balances(now)
+        first_move = dict(
+            StockMovement.objects.order_by().values("tool_id").annotate(t=Min("created_at")).values_list("tool_id", "t")
+        )
+        has_opening = set(
+            StockMovement.objects.filter(loai=StockMovement.OPENING).values_list("tool_id", flat=True)
+        )
+        rows = []
+        for tool_id, ton_kho in Tool.objects.values_list("id", "ton_kho"):
+            diff = (ton_kho or 0) - balances.get(tool_id, 0)
+            if tool_id in has_opening:
+                if diff:
+                    rows.append(StockMovement(tool_id=tool_id, loai=StockMovement.ADJUST, delta=diff,
+                                              ton_sau=ton_kho or 0, created_at=now))
+                continue
+            first = first_move.get(tool_id)
+            rows.append(StockMovement(
+                tool_id=tool_id, loai=StockMovement.OPENING, delta=diff, ton_sau=ton_kho or 0,
+                created_at=first - timedelta(microseconds=1) if first else now,
+            ))
+        StockMovement.objects.bulk_create(rows)
+
+        snapped = set(StockSnapshot.objects.filter(tool_id__in=[r.tool_id for r in rows if r.delta])
+                      .values_list("tool_id", flat=True).distinct())
+        for r in rows:
+            if r.delta and r.tool_id in snapped:
+                StockSnapshot.objects.filter(tool_id=r.tool_id, taken_at__gte=r.created_at).update(
+                    ton_kho=F("ton_kho") + r.delta
+                )
+    return len(rows)
+
+
+def backfill_transactions() -> int:
+    """
+    ToolTransaction SUCCESS cũ (có ton_truoc / ton_sau) chưa có trong sổ cái -> StockMovement cùng thời điểm.
+    Chạy 1 lần TRƯỚC snapshot / reconcile đầu tiên (snapshot đã chụp không tính lại được delta quá khứ).
+    """
+    done = StockMovement.objects.filter(transaction__isnull=False).values("transaction_id")
+    qs = (
+        ToolTransaction.objects
+        .filter(trang_thai="SUCCESS")
+        .exclude(id__in=done)
+        .order_by("created_at", "id")
+        .values_list("id", "tool_id", "loai", "ton_truoc", "ton_sau", "created_at")
+    )
+    batch, n = [], 0
+    for tx_id, tool_id, loai, ton_truoc, ton_sau, created_at in qs.iterator(chunk_size=2000):
+        batch.append(StockMovement(
+            tool_id=tool_id, transaction_id=tx_id, loai=loai,
+            delta=ton_sau - ton_truoc, ton_sau=ton_sau, created_at=created_at,
+        ))
+        if len(batch) >= 2000:
+            n += len(StockMovement.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        n += len(StockMovement.objects.bulk_create(batch))
+    return n
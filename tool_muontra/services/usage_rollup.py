@@ -0,0 +1,122 @@
+"""
+Rollup tiêu hao tool theo ngày (ToolUsageDaily) + truy vấn thống kê.
+
+- record_transaction(): cộng dồn 1 giao dịch SUCCESS vào dòng (ngày, tool, dự án, line máy),
+  gọi trong transaction.atomic của mqtt_worker -> 1 UPDATE theo unique index (hoặc 1 INSERT)
+- rebuild(since): tính lại từ ToolTransaction (command rebuild_tool_usage)
+- usage(): GROUP BY trên bảng rollup (nhỏ hơn ToolTransaction hàng trăm lần),
+  nhóm theo tool / dự án / line máy / ngày / tuần
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from ..models import ToolTransaction, ToolUsageDaily
+
+QTY_FIELD = {
+    ToolTransaction.EXPORT: "qty_export",
+    ToolTransaction.IMPORT: "qty_import",
+    ToolTransaction.RETURN: "qty_return",
+}
+QTY_FIELDS = ("qty_export", "qty_import", "qty_return", "tx_count")
+# tên cột kết quả usage() (annotate không được trùng tên field của model)
+TOTALS = {"xuat": "qty_export", "nhap": "qty_import", "tra": "qty_return", "so_giao_dich": "tx_count"}
+
+GROUPS = {
+    "tool": ("tool_id", "tool__ma_tool", "tool__ten_tool"),
+    "project": ("ma_du_an",),
+    "line": ("may_uu_tien",),
+    "day": ("day",),
+    "week": ("week",),
+}
+
+
+def record_transaction(tx: ToolTransaction) -> None:
+    field = QTY_FIELD.get(tx.loai)
+    if field is None:
+        return
+    key = {
+        "day": timezone.localdate(tx.created_at),
+        "tool_id": tx.tool_id,
+        "ma_du_an": (tx.ma_du_an or "").strip(),
+        # line chụp lúc tạo giao dịch: tool đổi line sau đó không ghi đè số liệu cũ
+        "may_uu_tien": tx.may_uu_tien or "",
+    }
+    changes = {field: F(field) + tx.so_luong, "tx_count": F("tx_count") + 1, "updated_at": timezone.now()}
+    if ToolUsageDaily.objects.filter(**key).update(**changes):
+        return
+    try:
+        with db_transaction.atomic():
+            ToolUsageDaily.objects.create(**key, tx_count=1, **{field: tx.so_luong})
+    except IntegrityError:
+        # process khác vừa tạo cùng dòng
+        ToolUsageDaily.objects.filter(**key).update(**changes)
+
+
+def rebuild(since: Optional[date] = None) -> int:
+    """Xoá + tính lại rollup từ ngày `since` (None = toàn bộ). return số dòng rollup."""
+    tz = timezone.get_current_timezone()
+    qs = ToolTransaction.objects.filter(trang_thai="SUCCESS", loai__in=list(QTY_FIELD))
+    rollups = ToolUsageDaily.objects.all()
+    if since:
+        qs = qs.filter(created_at__date__gte=since)
+        rollups = rollups.filter(day__gte=since)
+
+    rows = (
+        qs.annotate(d=TruncDate("created_at", tzinfo=tz))
+        .values("d", "tool_id", "ma_du_an", "may_uu_tien")
+        .annotate(
+            tx_count=Count("id"),
+            **{f: Sum("so_luong", filter=Q(loai=loai)) for loai, f in QTY_FIELD.items()},
+        )
+        .order_by()
+    )
+    # ma_du_an có khoảng trắng thừa -> gộp lại theo key đã strip như record_transaction
+    merged: Dict[tuple, ToolUsageDaily] = {}
+    for r in rows.iterator(chunk_size=5000):
+        key = (r["d"], r["tool_id"], (r["ma_du_an"] or "").strip(), r["may_uu_tien"] or "")
+        obj = merged.get(key)
+        if obj is None:
+            obj = merged[key] = ToolUsageDaily(day=key[0], tool_id=key[1], ma_du_an=key[2], may_uu_tien=key[3])
+        for f in QTY_FIELDS:
+            setattr(obj, f, getattr(obj, f) + (r[f] or 0))
+
+    with db_transaction.atomic():
+        rollups.delete()
+        ToolUsageDaily.objects.bulk_create(merged.values(), batch_size=2000)
+    return len(merged)
+
+
+def usage(group: str, start: Optional[date] = None, end: Optional[date] = None,
+          tool_id: Optional[int] = None, project: str = "", line: str = "",
+          limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Tổng tiêu hao trong [start, end] theo `group` (tool / project / line / day / week).
+    tool / project / line: xếp theo SL xuất giảm dần; day / week: theo thời gian.
+    """
+    if group not in GROUPS:
+        raise ValueError(f"group phải là 1 trong {sorted(GROUPS)}")
+    qs = ToolUsageDaily.objects.all()
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if tool_id:
+        qs = qs.filter(tool_id=tool_id)
+    if project:
+        qs = qs.filter(ma_du_an=project)
+    if line:
+        qs = qs.filter(may_uu_tien=line)
+    if group == "week":
+        qs = qs.annotate(week=TruncWeek("day"))
+
+    qs = qs.values(*GROUPS[group]).annotate(**{name: Sum(f) for name, f in TOTALS.items()})
+    if group in ("day", "week"):
+        qs = qs.order_by(group)
+    else:
+        qs = qs.order_by("-xuat", *GROUPS[group])
+    return list(qs[:limit]) if limit else list(qs)
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from tool.models import Tool
+
+from .services.stock_ledger import open_tool
+
+
+# tool mới -> OPENING = tồn lúc tạo, sổ cái khớp ngay từ đầu (không chờ snapshot_stock --reconcile)
+@receiver(post_save, sender=Tool)
+def tool_opening_stock(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    open_tool(instance)
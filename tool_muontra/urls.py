@@ -7,6 +7,7 @@ app_name = "tool_muontra"
 urlpatterns = [
     # ===== UI =====
     path("history/", views.history_tool, name="history_tool"),
+    path("history/export/", views.export_tool_history, name="export_tool_history"),   # CSV stream
     path("transaction/<int:tool_id>/", views.tool_transaction_create, name="tool_transaction_create"),
 
     # ===== API =====
@@ -14,5 +15,8 @@ urlpatterns = [
     path("api/tool/<int:tool_id>/import/", views_api.api_tool_import, name="api_tool_import"),
     path("api/tool/<int:tool_id>/return/", views_api.api_tool_return, name="api_tool_return"),
     path("api/tool/tx/<int:tx_id>/", views_api.api_check_tool_tx, name="api_check_tool_tx"),
+    path("api/tool/<int:tool_id>/stock/", views_api.api_tool_stock, name="api_tool_stock"),   # ?at=&tu=&den=
+    path("api/analytics/usage/", views_api.api_tool_usage, name="api_tool_usage"),           # ?group=&tu=&den=
+    path("api/analytics/forecast/", views_api.api_tool_forecast, name="api_tool_forecast"),  # ?method=&lech=1
     path("tx/<int:tx_id>/wait/", views.tool_transaction_wait, name="tool_transaction_wait"),
 ]
@@ -6,16 +6,26 @@ import re
 
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Q
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
 from iot_gateway.mqtt import send_tool_borrow, send_tool_return
+from lookup.services.shared.csv_export import EXPORT_CHUNK_SIZE, date_range, fmt_dt, stream_csv
+from lookup.services.shared.history_search import filter_search
+from lookup.services.shared.keyset import keyset_page, page_url
 from tool.models import Tool
 from .models import ToolTransaction
 
 # ===================== CONFIG =====================
 DEBUG_RFID = True  # bật log để soi RFID
+HISTORY_PER_PAGE = 100
+
+# chỉ các cột tool_history.html hiển thị
+HISTORY_FIELDS = (
+    "created_at", "loai", "so_luong", "ton_truoc", "ton_sau", "ma_du_an",
+    "tool__ma_tool", "tool__ten_tool", "nguoi_thuc_hien__username",
+)
 
 # SỬA IMPORT NÀY cho đúng app/model UserProfile của bạn
 # Ví dụ: from users.models import UserProfile
@@ -96,28 +106,26 @@ def _resolve_user_rfid(request) -> tuple[str, str]:
 # =========================================================
 def history_tool(request):
     """
-    Lịch sử giao dịch tool.
+    Lịch sử giao dịch tool, phân trang keyset trên (created_at, id): ?cursor=...
     """
     q = request.GET.get("q", "").strip()
     loai = request.GET.get("loai", "").strip()
 
-    transactions = ToolTransaction.objects.select_related("tool", "nguoi_thuc_hien")
+    transactions = ToolTransaction.objects.select_related("tool", "nguoi_thuc_hien").only(*HISTORY_FIELDS)
 
     if q:
-        transactions = transactions.filter(
-            Q(tool__ma_tool__icontains=q)
-            | Q(tool__ten_tool__icontains=q)
-            | Q(ma_du_an__icontains=q)
-            | Q(ghi_chu__icontains=q)
-        )
+        # search_text (mã / tên tool, dự án, ghi chú) qua FTS5 trigram, không JOIN tool
+        transactions = filter_search(transactions, q)
 
     if loai:
         transactions = transactions.filter(loai=loai)
 
-    transactions = transactions.order_by("-created_at")[:500]
+    page = keyset_page(transactions, "created_at", request.GET.get("cursor"), HISTORY_PER_PAGE)
 
     context = {
-        "transactions": transactions,
+        "transactions": page.rows,
+        "next_url": page_url(request, page.next_cursor) if page.has_next else None,
+        "first_url": None if page.is_first else page_url(request, None),
         "q": q,
         "loai": loai,
         "loai_choices": ToolTransaction.LOAI_CHOICES,
@@ -125,6 +133,53 @@ def history_tool(request):
     return render(request, "tool_history.html", context)
 
 
+EXPORT_HEADER = [
+    "ID", "Thời gian", "Mã tool", "Tên tool", "Loại", "Số lượng", "Tồn trước", "Tồn sau",
+    "Mã dự án", "Ghi chú", "Người thực hiện", "Trạng thái", "Lý do fail", "TX ID",
+]
+EXPORT_FIELDS = (
+    "id", "created_at", "tool__ma_tool", "tool__ten_tool", "loai", "so_luong", "ton_truoc", "ton_sau",
+    "ma_du_an", "ghi_chu", "nguoi_thuc_hien__username", "trang_thai", "ly_do_fail", "tx_id",
+)
+
+
+def export_tool_history(request):
+    """
+    GET /tool_muontra/history/export/ -> CSV (stream)
+    Lọc: tu_ngay / den_ngay (YYYY-MM-DD), loai, trang_thai, du_an (mã dự án), q (như trang lịch sử).
+    """
+    qs = ToolTransaction.objects.all()
+
+    start, end = date_range(request)
+    if start:
+        qs = qs.filter(created_at__gte=start)
+    if end:
+        qs = qs.filter(created_at__lt=end)
+
+    loai = request.GET.get("loai", "").strip()
+    if loai:
+        qs = qs.filter(loai=loai)
+    trang_thai = request.GET.get("trang_thai", "").strip()
+    if trang_thai:
+        qs = qs.filter(trang_thai=trang_thai)
+    du_an = request.GET.get("du_an", "").strip()
+    if du_an:
+        qs = qs.filter(ma_du_an=du_an)
+    q = request.GET.get("q", "").strip()
+    if q:
+        qs = filter_search(qs, q)
+
+    loai_label = dict(ToolTransaction.LOAI_CHOICES)
+    rows = (
+        (pk, fmt_dt(created_at), ma_tool, ten_tool, loai_label.get(loai_v, loai_v), *rest)
+        for pk, created_at, ma_tool, ten_tool, loai_v, *rest in (
+            qs.order_by("created_at", "id").values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+    )
+    filename = f"lich_su_tool_{timezone.localdate():%Y%m%d}.csv"
+    return stream_csv(filename, EXPORT_HEADER, rows)
+
+
 def tool_transaction_create(request, tool_id):
     """
     Tạo giao dịch TOOL theo hệ thống mới:
@@ -1,16 +1,21 @@
 # tool_muontra/views_api.py
 import json, random, re
+from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.db import transaction
+from django.db.models import F
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views.decorators.http import require_POST
 
 from iot_gateway.mqtt import send_tool_borrow, send_tool_return
 from tool.models import Tool
-from .models import ToolTransaction
+from .models import ToolForecast, ToolTransaction
+from .services.stock_ledger import consumption, stock_at
+from .services.usage_rollup import GROUPS, usage
 
 MQTT_TX_TIMEOUT_SECONDS = getattr(settings, "MQTT_TX_TIMEOUT_SECONDS", 60)
 
@@ -214,3 +219,109 @@ def api_check_tool_tx(request, tx_id):
         "ton_sau": tx.ton_sau,
         "tool_id": tx.tool_id,
     })
+
+
+def _parse_dt(value, default=None):
+    if not value:
+        return default
+    try:
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            dt = datetime.combine(d, datetime.min.time()) if d else None
+    except ValueError:
+        return None
+    if dt is not None and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def api_tool_stock(request, tool_id):
+    """
+    GET api/tool/<id>/stock/?at=<ISO>&tu=<ISO>&den=<ISO>
+    Tồn tại thời điểm `at` (mặc định now) + lượng xuất trong [tu, den) từ sổ cái StockMovement.
+    """
+    tool = get_object_or_404(Tool.objects.only("id", "ton_kho"), pk=tool_id)
+    now = timezone.now()
+    at = _parse_dt(request.GET.get("at"), now)
+    den = _parse_dt(request.GET.get("den"), now)
+    tu = _parse_dt(request.GET.get("tu"), den - timedelta(days=30) if den else None)
+    if at is None or tu is None or den is None:
+        return JsonResponse({"ok": False, "error": "Thời điểm không hợp lệ (ISO 8601)."}, status=400)
+
+    return JsonResponse({
+        "ok": True,
+        "tool_id": tool.id,
+        "ton_kho_hien_tai": tool.ton_kho,
+        "at": at.isoformat(),
+        "ton_tai_thoi_diem": stock_at(tool.id, at),
+        "tu": tu.isoformat(),
+        "den": den.isoformat(),
+        "da_xuat": consumption(tool.id, tu, den),
+    })
+
+
+def api_tool_usage(request):
+    """
+    GET api/analytics/usage/?group=tool|project|line|day|week&tu=YYYY-MM-DD&den=YYYY-MM-DD
+        [&tool=<id>&du_an=<mã>&line=<máy>&limit=50]
+    Tiêu hao (xuất / nhập / trả) từ rollup ToolUsageDaily, mặc định 30 ngày gần nhất.
+    """
+    group = request.GET.get("group", "tool")
+    if group not in GROUPS:
+        return JsonResponse({"ok": False, "error": f"group phải là 1 trong {sorted(GROUPS)}"}, status=400)
+
+    try:
+        den = parse_date(request.GET.get("den", "")) or timezone.localdate()
+        tu = parse_date(request.GET.get("tu", "")) or den - timedelta(days=30)
+        tool_id = int(request.GET.get("tool") or 0) or None
+        limit = max(int(request.GET.get("limit") or 50), 0)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Tham số không hợp lệ."}, status=400)
+
+    rows = usage(
+        group, start=tu, end=den, tool_id=tool_id,
+        project=request.GET.get("du_an", "").strip(), line=request.GET.get("line", "").strip(),
+        limit=limit,
+    )
+    return JsonResponse({"ok": True, "group": group, "tu": tu, "den": den, "rows": rows})
+
+
+def api_tool_forecast(request):
+    """
+    GET api/analytics/forecast/?method=SES|CROSTON&lech=1&limit=50
+    Dự báo nhu cầu / tuần + mức cảnh báo đề xuất (cache ToolForecast, command forecast_demand).
+    lech=1: chỉ tool có muc_canh_bao khác mức đề xuất.
+    """
+    try:
+        limit = max(int(request.GET.get("limit") or 50), 0)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Tham số không hợp lệ."}, status=400)
+
+    qs = ToolForecast.objects.select_related("tool").only(
+        "method", "weekly_demand", "sigma", "adi", "suggested_muc_canh_bao", "computed_at",
+        "tool__ma_tool", "tool__ten_tool", "tool__ton_kho", "tool__muc_canh_bao",
+    )
+    method = request.GET.get("method", "").strip().upper()
+    if method:
+        qs = qs.filter(method=method)
+    if request.GET.get("lech") == "1":
+        qs = qs.exclude(suggested_muc_canh_bao=F("tool__muc_canh_bao"))
+    if limit:
+        qs = qs[:limit]
+
+    rows = [{
+        "tool_id": f.tool_id,
+        "ma_tool": f.tool.ma_tool,
+        "ten_tool": f.tool.ten_tool,
+        "method": f.method,
+        "nhu_cau_tuan": f.weekly_demand,
+        "sigma": f.sigma,
+        "adi": f.adi,
+        "ton_kho": f.tool.ton_kho,
+        "so_tuan_du_ton": round(f.tool.ton_kho / f.weekly_demand, 1) if f.weekly_demand else None,
+        "muc_canh_bao": f.tool.muc_canh_bao,
+        "muc_canh_bao_de_xuat": f.suggested_muc_canh_bao,
+        "computed_at": f.computed_at.isoformat(),
+    } for f in qs]
+    return JsonResponse({"ok": True, "rows": rows})